@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import authentication  # noqa: F401 connects the user cache signals
+        from . import timing  # noqa: F401 connects the query timer signal
+        from .nltk_chatbot import start_rulebook_watcher
+        from .session_sweeper import start_session_sweeper
+
+        request_started.connect(start_session_sweeper, dispatch_uid='api.start_session_sweeper')
+        request_started.connect(start_rulebook_watcher, dispatch_uid='api.start_rulebook_watcher')
@@ -0,0 +1,217 @@
+import glob
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import groupby, islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .export import FIELDS, gzip_chunks, ndjson_lines
+from .models import Log, Step
+
+logger = logging.getLogger(__name__)
+
+SHARD_SUFFIX = '.ndjson.gz'
+
+
+def retention_cutoff(days, now=None):
+    """
+    Get the time before which logs are archived: the start of the UTC day `days` days ago,
+    so that only whole days are archived.
+
+    Parameters:
+    - days (int): The days of logs kept in the database, besides the current one.
+    - now (datetime, optional): The current time, defaults to timezone.now().
+
+    Returns:
+    - datetime: The cutoff, in UTC.
+    """
+    now = now or timezone.now()
+    day = (now.astimezone(dt_timezone.utc) - timedelta(days=days)).date()
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def shard_paths(directory, day):
+    """
+    Get the archive shards of a UTC day, in the order they were written.
+
+    A day is archived in one shard, <directory>/<year>/<date>.ndjson.gz, and in further
+    parts, <date>.<n>.ndjson.gz, if logs of that day are archived again, e.g. after a restore.
+
+    Parameters:
+    - directory (str): The archive directory.
+    - day (date): The day.
+
+    Returns:
+    - list: The paths of the existing shards.
+    """
+    pattern = os.path.join(directory, f"{day:%Y}", f"{day.isoformat()}*{SHARD_SUFFIX}")
+    return sorted(glob.glob(pattern), key=_part)
+
+
+def archive_logs(days, directory, batch_size=1000, now=None):
+    """
+    Move the logs older than a number of days into gzip-compressed NDJSON shards, one per UTC day.
+
+    The logs are streamed in primary key order, i.e. the order they were saved, and written a
+    day at a time with the encoders of the exports. Each shard is written to a temporary file and
+    renamed once complete, and the logs are only deleted once every shard is on disk, so an
+    interrupted run loses nothing: it leaves at worst logs archived twice, which read_archive()
+    skips. The logs are then deleted in batches of at most batch_size rows, see delete_logs().
+
+    Parameters:
+    - days (int): The days of logs kept in the database, besides the current one.
+    - directory (str): The archive directory.
+    - batch_size (int, optional): The rows fetched per query and deleted per DELETE.
+    - now (datetime, optional): The current time, defaults to timezone.now().
+
+    Returns:
+    - tuple: The number of logs archived and the list of the shards written.
+    """
+    cutoff = retention_cutoff(days, now)
+    rows = (Log.objects.filter(created_at__lt=cutoff).order_by('pk')
+            .values_list(*FIELDS['logs']).iterator(chunk_size=batch_size))
+    archived = 0
+    last_id = None
+
+    def counted(group):
+        nonlocal archived, last_id
+        for row in group:
+            archived += 1
+            last_id = row[0] if last_id is None else max(last_id, row[0])
+            yield row
+
+    shards = [_write_shard(directory, day, counted(group))
+              for day, group in groupby(rows, key=lambda row: _utc_date(row[1]))]
+    if last_id is not None:
+        delete_logs(cutoff, last_id, batch_size)
+        logger.info("Archived %d logs created before %s into %d shards", archived, cutoff.date(), len(shards))
+    return archived, shards
+
+
+def delete_logs(cutoff, last_id, batch_size=1000):
+    """
+    Delete the logs created before a cutoff, up to a primary key, in batches.
+
+    Each batch is a SELECT of at most batch_size ids and a DELETE of those rows, so no
+    statement locks many rows or runs for long, and other writes go on between batches.
+
+    Parameters:
+    - cutoff (datetime): Only delete logs created before this time.
+    - last_id (int): Only delete logs up to this id, e.g. the last one archived.
+    - batch_size (int, optional): The most logs deleted by one DELETE.
+
+    Returns:
+    - int: The number of logs deleted.
+    """
+    old = Log.objects.filter(created_at__lt=cutoff, id__lte=last_id).order_by()
+    deleted = 0
+    while True:
+        ids = list(old.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Log.objects.filter(id__in=ids).delete()[0]
+        if len(ids) < batch_size:
+            return deleted
+
+
+def read_archive(directory, start, end=None, user_id=None):
+    """
+    Stream the archived logs of a range of UTC days.
+
+    Parameters:
+    - directory (str): The archive directory.
+    - start (date): The first day.
+    - end (date, optional): The last day, included, defaults to start.
+    - user_id (int, optional): Only read the logs of this user.
+
+    Returns:
+    - iterator: A dict of the export FIELDS['logs'] per log, with datetimes, in the order they were saved.
+    """
+    day = start
+    while day <= (end or start):
+        seen = set()
+        for path in shard_paths(directory, day):
+            with gzip.open(path, 'rt', encoding='utf-8') as file:
+                for line in file:
+                    row = json.loads(line)
+                    if (user_id is not None and row['user_id'] != user_id) or row['id'] in seen:
+                        continue
+                    seen.add(row['id'])
+                    row['created_at'] = parse_datetime(row['created_at'])
+                    row['updated_at'] = parse_datetime(row['updated_at'])
+                    yield row
+        day += timedelta(days=1)
+
+
+def restore_logs(directory, start, end=None, user_id=None, batch_size=1000):
+    """
+    Insert archived logs back into the Log table, with their ids and timestamps.
+
+    Logs already in the table are skipped, as are logs whose step has since been deleted.
+    Restored logs stay in the archive.
+
+    Parameters:
+    - directory (str): The archive directory.
+    - start (date): The first UTC day.
+    - end (date, optional): The last UTC day, included, defaults to start.
+    - user_id (int, optional): Only restore the logs of this user.
+    - batch_size (int, optional): The most logs inserted per query.
+
+    Returns:
+    - int: The number of logs restored.
+    """
+    rows = read_archive(directory, start, end, user_id)
+    restored = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return restored
+        existing = set(Log.objects.filter(id__in=[row['id'] for row in batch]).values_list('id', flat=True))
+        steps = set(Step.objects.filter(id__in={row['step_id'] for row in batch}).values_list('id', flat=True))
+        logs = [Log(**row) for row in batch if row['id'] not in existing and row['step_id'] in steps]
+        if logs:
+            times = [(log.created_at, log.updated_at) for log in logs]
+            with transaction.atomic():
+                # bulk_create sets the auto_now_add and auto_now timestamps to the current time
+                Log.objects.bulk_create(logs)
+                for log, (created_at, updated_at) in zip(logs, times):
+                    log.created_at, log.updated_at = created_at, updated_at
+                Log.objects.bulk_update(logs, ['created_at', 'updated_at'], batch_size=batch_size)
+            restored += len(logs)
+
+
+def _write_shard(directory, day, rows):
+    """
+    Internal function to write the logs of a day to a new shard.
+    """
+    paths = shard_paths(directory, day)
+    name = day.isoformat() + (f".{_part(paths[-1]) + 1}" if paths else '') + SHARD_SUFFIX
+    path = os.path.join(directory, f"{day:%Y}", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as file:
+        for chunk in gzip_chunks(ndjson_lines(rows, FIELDS['logs'])):
+            file.write(chunk)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def _part(path):
+    """
+    Internal function to get the part number of a shard, 0 for the first shard of a day.
+    """
+    parts = os.path.basename(path)[:-len(SHARD_SUFFIX)].split('.')
+    return int(parts[1]) if len(parts) > 1 else 0
+
+
+def _utc_date(value):
+    """
+    Internal function to get the UTC day of a datetime.
+    """
+    return value.astimezone(dt_timezone.utc).date()
@@ -0,0 +1,132 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import timing
+from .conf import get_setting
+
+
+class UserCache(object):
+    """
+    A bounded, thread-safe in-process cache of users by id, whose entries expire after ttl seconds.
+
+    Methods:
+    - get(user_id): Get a copy of the cached user, or None if it is missing or expired.
+    - set(user): Cache a user.
+    - invalidate(user_id): Remove a user from the cache.
+    - clear(): Remove all users from the cache.
+    """
+
+    def __init__(self, ttl=60, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._users[user_id]
+                return None
+        # each request gets its own copy, so it can't change the cached user
+        return copy.copy(user)
+
+    def set(self, user):
+        with self._lock:
+            self._users[user.pk] = (time.monotonic() + self.ttl, copy.copy(user))
+            self._users.move_to_end(user.pk)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(get_setting('AUTH_USER_CACHE_TTL'))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    A JWTAuthentication that resolves the user of a token without a database query
+    on most requests.
+
+    By default users are resolved from a short-lived in-process cache, which is
+    invalidated when a user is saved or deleted in the same process. Other processes
+    may see a change to a user, e.g. a deactivation, only once their entry expires
+    after CHATBOT['AUTH_USER_CACHE_TTL'] seconds.
+
+    When CHATBOT['AUTH_STATELESS'] is enabled, the database is never queried. The user
+    is built from the token claims as an unsaved User instance with only its id set,
+    so deactivated users remain authenticated until their access token expires. Such a
+    user has from_token_claims set, and is_staff unset, see api.permissions.IsAdminUser.
+    """
+
+    def authenticate(self, request):
+        with timing.measure('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        """
+        Get the user of a validated token.
+
+        Parameters:
+        - validated_token (Token): The validated access token.
+
+        Returns:
+        - User: The user identified by the token.
+        """
+        if get_setting('AUTH_STATELESS'):
+            return self._get_stateless_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id) if api_settings.USER_ID_FIELD == 'id' else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user)
+        elif api_settings.CHECK_REVOKE_TOKEN and \
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    def _get_stateless_user(self, validated_token):
+        """
+        Internal method to build a lightweight user from the token claims.
+        """
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        user = self.user_model(**{api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM]})
+        user.is_active = True
+        user.from_token_claims = True
+        return user
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Remove a saved, deactivated or deleted user from the user cache.
+    """
+    user_cache.invalidate(instance.pk)
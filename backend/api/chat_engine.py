@@ -0,0 +1,371 @@
+import hashlib
+import heapq
+import random
+import re
+import time
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+WORD = re.compile(r"\w+", re.ASCII)
+
+
+def _literal_runs(pattern):
+    """
+    Get the runs of literal text that any match of the pattern must contain, in order.
+
+    Only ASCII literals are collected. Groups are walked into, while any other construct
+    (repeats, alternations, character classes, ...) ends the current run.
+
+    Parameters:
+    - pattern (str): The regex pattern.
+
+    Returns:
+    - list: The lowercased literal runs. The first run is anchored at the start of the input.
+    """
+    runs = [[]]
+
+    def walk(items):
+        for op, av in items:
+            if op is sre_parse.LITERAL and av < 128:
+                runs[-1].append(chr(av).lower())
+            elif op is sre_parse.SUBPATTERN:
+                walk(av[-1])
+            elif op is sre_parse.AT and av is sre_parse.AT_BEGINNING:
+                continue
+            elif runs[-1] or len(runs) == 1:
+                runs.append([])
+
+    walk(sre_parse.parse(pattern))
+    return [''.join(run) for run in runs]
+
+
+def _keywords(runs):
+    """
+    Get the words that are guaranteed to appear as whole words in any matching input.
+    """
+    keywords = []
+    for i, run in enumerate(runs):
+        for word in WORD.finditer(run):
+            if (word.start() > 0 or i == 0) and word.end() < len(run):
+                keywords.append(word.group())
+    return keywords
+
+
+def _compile(pattern, regex_engine):
+    """
+    Compile a case-insensitive pattern with the given regex engine.
+
+    Parameters:
+    - pattern (str): The regex pattern.
+    - regex_engine (str): 're' for Python's backtracking engine, or 're2' for RE2,
+                          which matches in time linear in the length of the input.
+
+    Returns:
+    - The compiled pattern.
+    """
+    if regex_engine == 're':
+        return re.compile(pattern, re.IGNORECASE)
+    if regex_engine != 're2':
+        raise ValueError(f"Unknown regex engine {regex_engine!r}, expected 're' or 're2'.")
+    if re2 is None:
+        raise ImportError("The 're2' regex engine requires the google-re2 package.")
+    try:
+        return re2.compile(f"(?i){pattern}")
+    except re2.error as exc:
+        raise ValueError(f"Rule {pattern!r} is not supported by RE2: {exc}") from exc
+
+
+def compile_template(response):
+    """
+    Parse a response into a template of literal text and %1-style placeholders.
+
+    Parameters:
+    - response (str): The response, e.g. "Hello %1, how are you?".
+
+    Returns:
+    - tuple: The parts of the response, a str for literal text and an int for the number
+             of the group whose reflected text replaces a placeholder, e.g. ("Hello ", 1, ", how are you?").
+             A '%' not followed by a digit is literal text.
+    """
+    parts = []
+    literal = []
+    i = 0
+    while i < len(response):
+        char = response[i]
+        if char == '%' and response[i + 1:i + 2].isdigit() and response[i + 1].isascii():
+            if literal:
+                parts.append(''.join(literal))
+                literal = []
+            parts.append(int(response[i + 1]))
+            i += 2
+        else:
+            literal.append(char)
+            i += 1
+    if literal:
+        parts.append(''.join(literal))
+    return tuple(parts)
+
+
+def analyze(pairs):
+    """
+    Analyze the patterns of a rulebook for the keyword index of a ChatEngine.
+
+    The analysis depends on the patterns alone, so it can be computed once and stored
+    with the rulebook, e.g. by api.rulebook.compile_rulebook().
+
+    Parameters:
+    - pairs (list): A list of [pattern, responses] rules.
+
+    Returns:
+    - list: A [needle, keyword] pair per rule, where needle is the longest literal text
+            any matching input contains, and keyword is the longest word it contains as
+            a whole word, or None if there is none.
+    """
+    analysis = []
+    for pattern, _ in pairs:
+        runs = _literal_runs(pattern)
+        keywords = _keywords(runs)
+        analysis.append([max(runs, key=len), max(keywords, key=len) if keywords else None])
+    return analysis
+
+
+class ChatEngine(object):
+    """
+    A compiled, read-only rulebook used to generate chatbot responses.
+
+    The engine compiles every pattern in the rulebook once, when it is constructed, and
+    parses every response into a template of literal text and placeholders, so it can be
+    shared by every request handled by a process. It holds no per-request state, which
+    makes it safe to use from multiple threads at the same time.
+
+    Rules are indexed by a keyword that any matching input must contain as a whole word,
+    so a single scan over the words of the input selects the candidate rules, and most
+    rules are rejected before any regex runs. Candidates are tried in rulebook order,
+    which keeps the first-match-wins semantics of nltk's Chat.
+
+    To bound the cost of a single message, inputs longer than max_input_length are not
+    matched, matching gives up once time_budget is spent, and the 're2' regex engine
+    can be used to guarantee matching in linear time.
+
+    Attributes:
+    - pairs (tuple): The rulebook as a tuple of (pattern, responses) tuples.
+    - reflections (dict): A mapping between first and second person expressions.
+    - version (str): A hash of the rulebook and reflections, which changes whenever they do.
+    - max_input_length (int): The longest input that is matched, or None for no limit.
+    - time_budget (float): The seconds allowed for matching a message, or None for no limit.
+
+    Methods:
+    - respond(text): Get the response for the input text, or None if no rule matches.
+    - match(text): Get the index and the match object of the first matching rule.
+    - trace(text): Get the rules tried to find the first matching rule, and their regex time.
+    - reply(index, match): Get a response of a rule for its match.
+    - is_static(index): Check whether the responses of a rule use no captured text.
+    """
+
+    def __init__(self, pairs, reflections, regex_engine='re', max_input_length=None, time_budget=None,
+                 analysis=None):
+        """
+        Initialize the ChatEngine instance.
+
+        Parameters:
+        - pairs (list): A list of [pattern, responses] rules, tried in order.
+        - reflections (dict): A mapping between first and second person expressions.
+        - regex_engine (str, optional): 're' (default) or 're2' for linear-time matching.
+        - max_input_length (int, optional): The longest input that is matched.
+        - time_budget (float, optional): The seconds allowed for matching a message.
+        - analysis (list, optional): The result of analyze(pairs) for these pairs, e.g. loaded
+                                     from a compiled rulebook, to skip parsing the patterns.
+        """
+        self.pairs = tuple((pattern, tuple(responses)) for pattern, responses in pairs)
+        self.reflections = dict(reflections)
+        self.max_input_length = max_input_length
+        self.time_budget = time_budget
+        self.version = hashlib.sha1(repr((self.pairs, sorted(self.reflections.items()))).encode()).hexdigest()
+        self._regex_engine = regex_engine
+        if analysis is None:
+            analysis = analyze(self.pairs)
+        elif len(analysis) != len(self.pairs):
+            raise ValueError(f"Expected the analysis of {len(self.pairs)} rules, got {len(analysis)}.")
+        self._rules, self._index, self._unindexed = self._compile_rules(analysis)
+        self._templates = tuple(tuple(compile_template(response) for response in responses)
+                                for _, responses in self.pairs)
+        self._static = tuple(not any(isinstance(part, int) for template in templates for part in template)
+                             for templates in self._templates)
+        self._reflections_regex, self._ascii_reflections_regex = self._compile_reflections()
+
+    def _compile_rules(self, analysis):
+        """
+        Internal method to compile the patterns and build the keyword index.
+
+        Each rule is compiled to a (regex, needle) tuple, and indexed under its keyword,
+        or kept in the unindexed rules if it has none.
+        """
+        rules = []
+        index = {}
+        unindexed = []
+        for i, ((pattern, _), (needle, keyword)) in enumerate(zip(self.pairs, analysis)):
+            rules.append((_compile(pattern, self._regex_engine), needle))
+            if keyword:
+                index.setdefault(keyword, []).append(i)
+            else:
+                unindexed.append(i)
+        index = {keyword: tuple(indexes) for keyword, indexes in index.items()}
+        return tuple(rules), index, tuple(unindexed)
+
+    def _compile_reflections(self):
+        """
+        Internal method to compile the reflections into a single regex, and a faster one for ASCII text.
+
+        The regex matches the reflections longest first between word boundaries, ignoring case,
+        as nltk's does. Lowered ASCII text only matches reflections that are lowercase ASCII text,
+        which the second regex matches without case folding, or it is None if some are not.
+        """
+        words = sorted(self.reflections, key=len, reverse=True)
+        alternation = "|".join(map(re.escape, words))
+        regex = re.compile(r"\b({})\b".format(alternation), re.IGNORECASE)
+        if not all(word.isascii() and word == word.lower() for word in words):
+            return regex, None
+        return regex, re.compile(r"\b({})\b".format(alternation), re.ASCII)
+
+    def _candidates(self, text):
+        """
+        Internal method to get the indexes of the rules that may match the input, in order.
+        """
+        if not text.isascii():
+            # case-insensitive matching of non-ASCII text does not agree with str.lower()
+            return range(len(self._rules)), None
+
+        lowered = text.lower()
+        found = [self._index[word] for word in set(WORD.findall(lowered)) if word in self._index]
+        if not found:
+            return self._unindexed, lowered
+        return heapq.merge(self._unindexed, *found), lowered
+
+    def match(self, text):
+        """
+        Find the first rule matching the input text.
+
+        Parameters:
+        - text (str): The input text.
+
+        Returns:
+        - tuple: The rule index and the match object, or None if no rule matches,
+                 the input is too long or the time budget is spent.
+        """
+        if self.max_input_length is not None and len(text) > self.max_input_length:
+            return None
+
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        candidates, lowered = self._candidates(text)
+        for i in candidates:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            regex, needle = self._rules[i]
+            if lowered is not None and needle not in lowered:
+                continue
+            match = regex.match(text)
+            if match:
+                return i, match
+        return None
+
+    def trace(self, text):
+        """
+        Find the first rule matching the input text, timing each regex tried on the way.
+
+        Rules are tried as match() tries them, without its input length and time limits.
+
+        Parameters:
+        - text (str): The input text.
+
+        Returns:
+        - list: An (index, seconds, match) tuple for each rule whose regex ran, in order.
+                Only the last one can have a match.
+        """
+        tried = []
+        candidates, lowered = self._candidates(text)
+        for i in candidates:
+            regex, needle = self._rules[i]
+            if lowered is not None and needle not in lowered:
+                continue
+            start = time.perf_counter()
+            match = regex.match(text)
+            tried.append((i, time.perf_counter() - start, match))
+            if match:
+                break
+        return tried
+
+    def respond(self, text):
+        """
+        Get the response for the input text.
+
+        Parameters:
+        - text (str): The input text.
+
+        Returns:
+        - str: The response of the first matching rule, or None if no rule matches.
+        """
+        found = self.match(text)
+        if not found:
+            return None
+        return self.reply(*found)
+
+    def is_static(self, index):
+        """
+        Check whether the responses of a rule use no captured text, so any of them
+        can be given without matching the input again.
+
+        Parameters:
+        - index (int): The index of the rule.
+
+        Returns:
+        - bool: True if no response of the rule has a %1-style placeholder.
+        """
+        return self._static[index]
+
+    def reply(self, index, match=None):
+        """
+        Get a randomly chosen response of a rule.
+
+        Parameters:
+        - index (int): The index of the rule.
+        - match (optional): The match object of the rule, required unless the rule is static.
+
+        Returns:
+        - str: The response with its placeholders replaced by the reflected group text.
+        """
+        template = random.choice(self._templates[index])
+        if self._static[index]:
+            response = template[0] if template else ''
+        else:
+            response = ''.join(part if isinstance(part, str) else self._substitute(match.group(part))
+                               for part in template)
+
+        # fix munged punctuation at the end, as nltk does
+        if response[-2:] == "?.":
+            response = response[:-2] + "."
+        if response[-2:] == "??":
+            response = response[:-2] + "?"
+        return response
+
+    def _substitute(self, text):
+        """
+        Internal method to swap first and second person words, e.g. "I'm" -> "you are".
+
+        The text is split on the reflections in a single pass, and the reflected words are
+        looked up all at once, rather than through a callback per word.
+        """
+        text = text.lower()
+        regex = self._ascii_reflections_regex
+        if regex is None or not text.isascii():
+            regex = self._reflections_regex
+        parts = regex.split(text)
+        parts[1::2] = [self.reflections[word] for word in parts[1::2]]
+        return ''.join(parts)
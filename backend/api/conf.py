@@ -0,0 +1,46 @@
+from django.conf import settings
+
+DEFAULTS = {
+    'MAX_INPUT_LENGTH': 1000,
+    'REGEX_ENGINE': 're',
+    'MATCH_TIME_BUDGET': 0.05,
+    'BATCH_MAX_SIZE': 1000,
+    'INTENTS': None,
+    'RESPONSE_CACHE_SIZE': 1024,
+    'RESPONSE_CACHE_POLICY': 'lru',
+    'LOG_BUFFER_ENABLED': False,
+    'LOG_BUFFER_SIZE': 500,
+    'LOG_BUFFER_INTERVAL': 1.0,
+    'ASYNC_VIEWS': False,
+    'AUTH_USER_CACHE_TTL': 60,
+    'AUTH_STATELESS': False,
+    'RULEBOOK_PATH': None,
+    'RULEBOOK_CACHE_DIR': None,
+    'RULEBOOK_RELOAD_INTERVAL': 0,
+    'FAQ_PATH': None,
+    'FAQ_INDEX_DIR': None,
+    'FAQ_THRESHOLD': 0.5,
+    'TIMING_SAMPLE_RATE': 0.0,
+    'METRICS_TOKEN': None,
+    'HISTORY_PAGE_SIZE': 50,
+    'HISTORY_MAX_PAGE_SIZE': 200,
+    'SESSION_TTL': 24 * 60 * 60,
+    'SESSION_SWEEP_INTERVAL': 0,
+    'SESSION_SWEEP_BATCH_SIZE': 1000,
+    'LOG_RETENTION_DAYS': 90,
+    'LOG_ARCHIVE_DIR': None,
+    'LOG_ARCHIVE_BATCH_SIZE': 1000,
+}
+
+
+def get_setting(name):
+    """
+    Get a chatbot setting from the CHATBOT dict in the Django settings.
+
+    Parameters:
+    - name (str): The name of the setting, e.g. 'MAX_INPUT_LENGTH'.
+
+    Returns:
+    - The configured value, or the default value if it is not configured.
+    """
+    return getattr(settings, 'CHATBOT', {}).get(name, DEFAULTS[name])
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.db import close_old_connections
+from rest_framework import exceptions
+
+from .authentication import CachedJWTAuthentication
+from .conf import get_setting
+from .nltk_chatbot import NltkChatBot
+from .repositories.buffered_log_repository import BufferedLogRepository
+from .repositories.cached_step_repository import CachedStepRepository, StaleStepError
+from .repositories.log_repository import LogRepository
+from .repositories.step_repository import StepRepository
+from .serializers import ChatSerializer
+from .services.async_chatbot_service import AsyncChatBotService
+
+UNAUTHORIZED = 4401
+
+# The WebSocket subprotocol carrying the access token, offered by clients as ['bearer', <token>].
+TOKEN_PROTOCOL = 'bearer'
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket consumer for long-lived chat conversations with a ChatBot.
+
+    The connection is authenticated once with a simplejwt access token passed in the
+    Sec-WebSocket-Protocol header, as the subprotocols ['bearer', <token>], rather than
+    in the URL, which proxies and servers log. It is closed when the token expires, and
+    keeps the user's session in memory, so each message only pays for matching and
+    persisting the turn.
+
+    Messages:
+    - Client: {"text": "Hello, how are you?"}
+    - Server: {"text": "<response>"}, or {"errors": {...}} if the message is invalid.
+
+    Example Usage:
+    ```javascript
+    const socket = new WebSocket("ws://your-api-domain/ws/chat/", ["bearer", "<your_access_token>"]);
+    socket.onmessage = (event) => console.log(JSON.parse(event.data).text);
+    socket.send(JSON.stringify({text: "hello"}));
+    ```
+
+    Note:
+    - Connections without a valid access token, and connections whose token has
+      expired, are closed with code 4401.
+    """
+    expiry = None
+
+    async def connect(self):
+        self.user, expires_at = await self._authenticate()
+        if self.user is None:
+            await self.close(code=UNAUTHORIZED)
+            return
+
+        self.step_repository = CachedStepRepository(StepRepository(self.user))
+        self.log_repository = BufferedLogRepository() if get_setting('LOG_BUFFER_ENABLED') else LogRepository()
+        await self.accept(subprotocol=TOKEN_PROTOCOL)
+        self.expiry = asyncio.create_task(self._close_at(expires_at))
+
+    async def disconnect(self, code):
+        if self.expiry is not None:
+            self.expiry.cancel()
+
+    async def _authenticate(self):
+        """
+        Internal method to get the active user of the access token in the subprotocols,
+        and the time the token expires.
+        """
+        subprotocols = self.scope.get('subprotocols') or []
+        if len(subprotocols) != 2 or subprotocols[0] != TOKEN_PROTOCOL:
+            return None, None
+
+        authentication = CachedJWTAuthentication()
+        try:
+            validated_token = authentication.get_validated_token(subprotocols[1])
+            user = await database_sync_to_async(authentication.get_user)(validated_token)
+        except exceptions.APIException:
+            return None, None
+        return (user, validated_token['exp']) if user.is_active else (None, None)
+
+    async def _close_at(self, expires_at):
+        """
+        Internal method to close the connection once its access token expires.
+        """
+        await asyncio.sleep(max(expires_at - time.time(), 0))
+        await self.close(code=UNAUTHORIZED)
+
+    async def receive_json(self, content, **kwargs):
+        serializer = ChatSerializer(data=content if isinstance(content, dict) else {})
+        if not serializer.is_valid():
+            await self.send_json({"errors": serializer.errors})
+            return
+
+        try:
+            response = await self._get_response(serializer.validated_data)
+        except StaleStepError:
+            # the session was changed by another writer, e.g. ended by the session sweeper,
+            # so handle the message again with the session as it is now
+            response = await self._get_response(serializer.validated_data)
+        await database_sync_to_async(close_old_connections)()
+        await self.send_json({'text': response})
+
+    async def _get_response(self, data):
+        """
+        Internal method to get the response to a valid message and save the turn.
+        """
+        chat_bot = NltkChatBot.from_json(data)
+        chatbot_service = AsyncChatBotService(chat_bot, self.log_repository, self.step_repository)
+        return await chatbot_service.get_response()
+
+    @classmethod
+    async def decode_json(cls, text_data):
+        try:
+            return await super().decode_json(text_data)
+        except ValueError:
+            return None
@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+import zlib
+
+from .models import Log, Step
+
+# the exported columns of each table
+FIELDS = {
+    'logs': ('id', 'created_at', 'updated_at', 'text', 'sender', 'step_id', 'user_id'),
+    'steps': ('id', 'created_at', 'updated_at', 'name', 'user_id'),
+}
+MODELS = {'logs': Log, 'steps': Step}
+FORMATS = ('ndjson', 'csv')
+# the uncompressed bytes gathered before they are compressed and yielded
+FLUSH_SIZE = 64 * 1024
+
+
+def export_rows(kind, start=None, end=None, user_id=None, chunk_size=2000):
+    """
+    Stream the rows of the Log or Step table, in the order they were saved.
+
+    The rows are read with a server-side cursor where the database supports it, a chunk at a
+    time, so the memory used does not grow with the number of rows.
+
+    Parameters:
+    - kind (str): 'logs' or 'steps'.
+    - start (datetime, optional): Only export rows created at or after this time.
+    - end (datetime, optional): Only export rows created before this time.
+    - user_id (int, optional): Only export the rows of this user.
+    - chunk_size (int, optional): The rows fetched per database round trip.
+
+    Returns:
+    - iterator: A tuple of the FIELDS[kind] values per row.
+    """
+    queryset = MODELS[kind].objects.all()
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=end)
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    return queryset.order_by('pk').values_list(*FIELDS[kind]).iterator(chunk_size=chunk_size)
+
+
+def ndjson_lines(rows, fields):
+    """
+    Encode rows as NDJSON, an object per line.
+    """
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), default=_isoformat, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows, fields):
+    """
+    Encode rows as CSV, with a header line.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in _with_header(rows, fields):
+        writer.writerow([_isoformat(value) if hasattr(value, 'isoformat') else value for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def gzip_chunks(lines, flush_size=FLUSH_SIZE):
+    """
+    Compress text lines into a gzip stream.
+
+    Parameters:
+    - lines (iterable): The text lines.
+    - flush_size (int, optional): The uncompressed bytes gathered before they are compressed.
+
+    Returns:
+    - iterator: The bytes of the gzip stream, in chunks of varying size.
+    """
+    compressor = zlib.compressobj(wbits=31)  # 31 writes a gzip header and trailer
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= flush_size:
+            chunk = compressor.compress(b''.join(pending))
+            pending.clear()
+            size = 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b''.join(pending)) + compressor.flush()
+
+
+def export(kind, format='ndjson', **filters):
+    """
+    Stream a gzip-compressed export of the Log or Step table.
+
+    Parameters:
+    - kind (str): 'logs' or 'steps'.
+    - format (str, optional): 'ndjson' or 'csv'.
+    - **filters: The start, end, user_id and chunk_size arguments of export_rows().
+
+    Returns:
+    - iterator: The bytes of the gzip stream.
+
+    Usage Example:
+    ```
+    with open('logs.ndjson.gz', 'wb') as file:
+        for chunk in export('logs', user_id=1):
+            file.write(chunk)
+    ```
+    """
+    encode = ndjson_lines if format == 'ndjson' else csv_lines
+    return gzip_chunks(encode(export_rows(kind, **filters), FIELDS[kind]))
+
+
+def _with_header(rows, fields):
+    """
+    Internal function to prepend the field names to rows.
+    """
+    yield fields
+    yield from rows
+
+
+def _isoformat(value):
+    """
+    Internal function to encode the datetimes of a row.
+    """
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# bump when the layout of saved indexes or the weighting of the terms changes
+INDEX_FORMAT = 1
+
+TERM = re.compile(r"\w+")
+
+ARRAYS = ('idf', 'postings_ptr', 'postings_doc', 'postings_weight')
+
+
+def tokenize(text):
+    """
+    Split the text into lowercased terms.
+    """
+    return TERM.findall(text.lower())
+
+
+def read_corpus(path):
+    """
+    Read a FAQ corpus, a JSON file with a list of {"question": ..., "answer": ...} "faqs".
+
+    Parameters:
+    - path (str): The path of the corpus file.
+
+    Returns:
+    - tuple: The content hash of the corpus, and its list of (question, answer) tuples.
+    """
+    with open(path, 'rb') as file:
+        content = file.read()
+    try:
+        faqs = json.loads(content)['faqs']
+        entries = [(faq['question'], faq['answer']) for faq in faqs]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError(f"The FAQ corpus {path} must have a list of 'faqs' with a question and an answer.") from exc
+    if not all(isinstance(question, str) and isinstance(answer, str) for question, answer in entries):
+        raise ValueError(f"The questions and answers of the FAQ corpus {path} must be strings.")
+    return hashlib.sha256(b'%d:' % INDEX_FORMAT + content).hexdigest(), entries
+
+
+class TfidfIndex(object):
+    """
+    A read-only TF-IDF index of FAQ questions, used to answer messages no rule matches.
+
+    Questions are L2-normalized TF-IDF vectors stored term by term: for each term, the
+    questions it appears in and its weight in each of them. Scoring a message reads only
+    the postings of its terms, and sums them into the cosine similarity of every question
+    with one vectorized bincount, so a lookup costs the number of postings of its terms,
+    not the size of the corpus.
+
+    A saved index is a directory of .npy arrays, loaded memory-mapped, so processes share
+    the pages of the index and only the postings that lookups read are paged in.
+
+    Requires NumPy.
+
+    Attributes:
+    - threshold (float): The minimum cosine similarity of an answered question.
+
+    Methods:
+    - build(entries): Index a list of (question, answer) tuples.
+    - load(directory): Load a saved index, memory-mapped.
+    - save(directory): Save the index.
+    - search(text): Get the most similar question and its similarity.
+    - respond(text): Get the answer of the most similar question above the threshold.
+    """
+
+    def __init__(self, vocabulary, answers, arrays, threshold=0.5):
+        """
+        Initialize the TfidfIndex instance. Use build() or load() to create an index.
+
+        Parameters:
+        - vocabulary (dict): A mapping of terms to their column.
+        - answers (list): The answers of the questions, in index order.
+        - arrays (dict): The idf, postings_ptr, postings_doc and postings_weight arrays.
+        - threshold (float, optional): The minimum cosine similarity of an answered question.
+        """
+        if np is None:
+            raise ImportError("The FAQ index requires the numpy package.")
+        self.threshold = threshold
+        self._vocabulary = vocabulary
+        self._answers = answers
+        self._idf = arrays['idf']
+        self._ptr = arrays['postings_ptr']
+        self._doc = arrays['postings_doc']
+        self._weight = arrays['postings_weight']
+
+    def __len__(self):
+        return len(self._answers)
+
+    @classmethod
+    def build(cls, entries, threshold=0.5):
+        """
+        Index a list of (question, answer) tuples.
+
+        Terms are weighted by tf * idf, with the smoothed idf log((1 + n) / (1 + df)) + 1.
+
+        Parameters:
+        - entries (list): The (question, answer) tuples.
+        - threshold (float, optional): The minimum cosine similarity of an answered question.
+
+        Returns:
+        - TfidfIndex: The index.
+        """
+        if np is None:
+            raise ImportError("The FAQ index requires the numpy package.")
+        vocabulary = {}
+        counts = []
+        for question, _ in entries:
+            counts.append(Counter(vocabulary.setdefault(term, len(vocabulary)) for term in tokenize(question)))
+
+        df = np.zeros(len(vocabulary), dtype=np.int64)
+        for terms in counts:
+            df[list(terms)] += 1
+        idf = (np.log((1 + len(entries)) / (1 + df)) + 1).astype(np.float32)
+
+        # the postings of term t are postings_doc/weight[postings_ptr[t]:postings_ptr[t + 1]]
+        ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(df, out=ptr[1:])
+        doc = np.empty(ptr[-1], dtype=np.int32)
+        weight = np.empty(ptr[-1], dtype=np.float32)
+        fill = ptr[:-1].copy()
+        for i, terms in enumerate(counts):
+            if not terms:
+                continue
+            cols = np.fromiter(terms.keys(), dtype=np.int64, count=len(terms))
+            tfidf = np.fromiter(terms.values(), dtype=np.float32, count=len(terms)) * idf[cols]
+            pos = fill[cols]
+            doc[pos] = i
+            weight[pos] = tfidf / np.linalg.norm(tfidf)
+            fill[cols] += 1
+
+        arrays = {'idf': idf, 'postings_ptr': ptr, 'postings_doc': doc, 'postings_weight': weight}
+        return cls(vocabulary, [answer for _, answer in entries], arrays, threshold)
+
+    @classmethod
+    def load(cls, directory, threshold=0.5):
+        """
+        Load a saved index, with its arrays memory-mapped read-only.
+
+        Parameters:
+        - directory (str): The directory the index was saved in.
+        - threshold (float, optional): The minimum cosine similarity of an answered question.
+
+        Returns:
+        - TfidfIndex: The index.
+        """
+        if np is None:
+            raise ImportError("The FAQ index requires the numpy package.")
+        with open(os.path.join(directory, 'index.json'), encoding='utf-8') as file:
+            meta = json.load(file)
+        if meta.get('format') != INDEX_FORMAT:
+            raise ValueError(f"The FAQ index in {directory} has an unsupported format.")
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r') for name in ARRAYS}
+        return cls(meta['vocabulary'], meta['answers'], arrays, threshold)
+
+    def save(self, directory):
+        """
+        Save the index to a directory, replacing it atomically if it exists.
+
+        The index is written to a temporary directory, which is then renamed, after moving any
+        existing index aside. If another process saves an index to the same directory meanwhile,
+        e.g. another worker building the same missing index, the first one renamed is kept.
+
+        Parameters:
+        - directory (str): The directory to save the index in.
+        """
+        parent = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent, prefix='.faq-')
+        old = None
+        try:
+            with open(os.path.join(tmp, 'index.json'), 'w', encoding='utf-8') as file:
+                json.dump({'format': INDEX_FORMAT, 'vocabulary': self._vocabulary, 'answers': self._answers},
+                          file, ensure_ascii=False)
+            for name, array in zip(ARRAYS, (self._idf, self._ptr, self._doc, self._weight)):
+                np.save(os.path.join(tmp, f"{name}.npy"), array)
+            if os.path.isdir(directory):
+                old = tempfile.mkdtemp(dir=parent, prefix='.faq-old-')
+                try:
+                    os.replace(directory, old)
+                except FileNotFoundError:
+                    pass  # moved aside by another process
+            try:
+                os.replace(tmp, directory)
+            except OSError:
+                # the rename fails when another process saved a non-empty directory first
+                if not is_saved_index(directory):
+                    raise
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        finally:
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def search(self, text):
+        """
+        Find the question most similar to the text.
+
+        Parameters:
+        - text (str): The message.
+
+        Returns:
+        - tuple: The index of the question and its cosine similarity with the text,
+                 or None if the text has no indexed term.
+        """
+        terms = Counter(self._vocabulary[term] for term in tokenize(text) if term in self._vocabulary)
+        if not terms:
+            return None
+        cols = np.fromiter(terms.keys(), dtype=np.int64, count=len(terms))
+        query = np.fromiter(terms.values(), dtype=np.float32, count=len(terms)) * self._idf[cols]
+        query /= math.sqrt(float(query @ query))
+
+        docs = []
+        weights = []
+        for col, q in zip(cols, query):
+            start, end = self._ptr[col], self._ptr[col + 1]
+            docs.append(self._doc[start:end])
+            weights.append(self._weight[start:end] * q)
+        scores = np.bincount(np.concatenate(docs), weights=np.concatenate(weights), minlength=len(self._answers))
+        best = int(scores.argmax())
+        return best, float(scores[best])
+
+    def respond(self, text):
+        """
+        Get the answer of the question most similar to the text.
+
+        Parameters:
+        - text (str): The message.
+
+        Returns:
+        - str: The answer, or None if no question is at least threshold similar to the text.
+        """
+        found = self.search(text)
+        if found is None or found[1] < self.threshold:
+            return None
+        return self._answers[found[0]]
+
+
+def is_saved_index(directory):
+    """
+    Check that a directory holds a complete index of the current format.
+
+    Parameters:
+    - directory (str): The directory.
+
+    Returns:
+    - bool: True if the directory has the files of an index saved by TfidfIndex.save().
+    """
+    try:
+        with open(os.path.join(directory, 'index.json'), encoding='utf-8') as file:
+            if json.load(file).get('format') != INDEX_FORMAT:
+                return False
+    except (OSError, ValueError):
+        return False
+    return all(os.path.isfile(os.path.join(directory, f"{name}.npy")) for name in ARRAYS)
@@ -0,0 +1,129 @@
+import threading
+from collections import deque
+
+from .conf import get_setting
+
+GREETING = 'greeting'
+GOODBYE = 'goodbye'
+
+DEFAULT_INTENTS = {
+    GREETING: ("hello", "hi", "greetings", "sup", "what’s up", "hey", "yo"),
+    GOODBYE: ("goodbye", "bye", "farewell", "see you", "adios", "see ya"),
+}
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+class IntentClassifier(object):
+    """
+    A compiled, read-only classifier that finds intents such as greetings and goodbyes
+    in a message.
+
+    Phrases are lowercased and split on whitespace. Single-word phrases are looked up in
+    a dict, and multi-word phrases are matched by an Aho-Corasick automaton over words,
+    so a message is classified in one pass over its words, whatever the number of phrases.
+
+    Methods:
+    - classify(text): Get the intents of the phrases found in the text.
+    """
+
+    def __init__(self, intents):
+        """
+        Initialize the IntentClassifier instance.
+
+        Parameters:
+        - intents (dict): A mapping of intent names to the phrases that signal them.
+        """
+        self._words = {}
+        # the automaton: goto transitions, failure links and outputs per state
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = None
+
+        outputs = [set()]
+        for intent, phrases in intents.items():
+            for phrase in phrases:
+                words = self.tokenize(phrase)
+                if len(words) == 1:
+                    self._words.setdefault(words[0], set()).add(intent)
+                elif words:
+                    state = self._add_phrase(words, outputs)
+                    outputs[state].add(intent)
+        self._words = {word: frozenset(found) for word, found in self._words.items()}
+        self._build_failure_links(outputs)
+
+    @staticmethod
+    def tokenize(text):
+        """
+        Split the text into lowercased words.
+        """
+        return text.lower().split()
+
+    def _add_phrase(self, words, outputs):
+        """
+        Internal method to add the words of a phrase to the trie, returning its final state.
+        """
+        state = 0
+        for word in words:
+            if word not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                outputs.append(set())
+                self._goto[state][word] = len(self._goto) - 1
+            state = self._goto[state][word]
+        return state
+
+    def _build_failure_links(self, outputs):
+        """
+        Internal method to link each state to its longest proper suffix in the trie.
+        """
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                outputs[child] |= outputs[self._fail[child]]
+        self._output = [frozenset(found) for found in outputs]
+
+    def classify(self, text):
+        """
+        Get the intents of the phrases found in the text.
+
+        Parameters:
+        - text (str): The message.
+
+        Returns:
+        - set: The names of the intents found, e.g. {'greeting'}.
+        """
+        found = set()
+        state = 0
+        for word in self.tokenize(text):
+            intents = self._words.get(word)
+            if intents:
+                found |= intents
+            while state and word not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(word, 0)
+            if self._output[state]:
+                found |= self._output[state]
+        return found
+
+
+def get_intent_classifier():
+    """
+    Get the process-wide IntentClassifier, built from CHATBOT['INTENTS'] or the default phrases.
+
+    Returns:
+    - IntentClassifier: The shared IntentClassifier instance.
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier(get_setting('INTENTS') or DEFAULT_INTENTS)
+    return _classifier
@@ -5,3 +5,7 @@ class LogInterface(ABC):
     @abstractmethod
     def create(self, *args, **kwargs):
         raise NotImplementedError
+
+    @abstractmethod
+    def bulk_create(self, *args, **kwargs):
+        raise NotImplementedError
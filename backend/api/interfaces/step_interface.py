@@ -10,6 +10,34 @@ class StepInterface(ABC):
     def create(self, *args, **kwargs):
         raise NotImplementedError
 
+    @abstractmethod
+    def build(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    def bulk_create(self, *args, **kwargs):
+        raise NotImplementedError
+
     @abstractmethod
     def update(self, *args, **kwargs):
         raise NotImplementedError
+
+    @abstractmethod
+    def update_if_unchanged(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    def bulk_update(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    def atomic(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def aget(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def acreate(self, *args, **kwargs):
+        raise NotImplementedError
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import archive_logs, retention_cutoff
+from api.conf import get_setting
+
+
+class Command(BaseCommand):
+    help = ("Move the chat logs older than a number of days into gzip-compressed NDJSON files, one per day, "
+            "and delete them from the database in batches, e.g. from cron. See restore_logs to restore them.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="The days of logs kept in the database, besides the current "
+                                                     "one. Defaults to CHATBOT['LOG_RETENTION_DAYS'].")
+        parser.add_argument('--directory', help="The archive directory. Defaults to CHATBOT['LOG_ARCHIVE_DIR'].")
+        parser.add_argument('--batch-size', type=int, help="The most logs deleted by one DELETE. "
+                                                           "Defaults to CHATBOT['LOG_ARCHIVE_BATCH_SIZE'].")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_setting('LOG_RETENTION_DAYS')
+        directory = options['directory'] or get_setting('LOG_ARCHIVE_DIR')
+        if not directory:
+            raise CommandError("Set --directory or CHATBOT['LOG_ARCHIVE_DIR'].")
+        batch_size = options['batch_size'] or get_setting('LOG_ARCHIVE_BATCH_SIZE')
+        if days < 0 or batch_size < 1:
+            raise CommandError("The days must not be negative and the batch size must be positive.")
+        archived, shards = archive_logs(days, directory, batch_size)
+        self.stdout.write(f"Archived {archived} logs created before {retention_cutoff(days).date()} "
+                          f"into {len(shards)} files in {directory}.")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.chat_engine import ChatEngine, analyze
+from api.conf import get_setting
+from api.rulebook import (DEFAULT_RULEBOOK, RulebookError, artifact_path, compile_rulebook, content_hash,
+                          read_artifact, read_source)
+
+
+class Command(BaseCommand):
+    help = "Validate a rulebook, compile it into the rulebook cache and verify the compiled artifact."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="The rulebook file. Defaults to CHATBOT['RULEBOOK_PATH'].")
+        parser.add_argument('--cache-dir', help="The directory of the compiled rulebooks. "
+                                                "Defaults to CHATBOT['RULEBOOK_CACHE_DIR'].")
+        parser.add_argument('--force', action='store_true',
+                            help="Compile the rulebook even if its compiled artifact is cached.")
+
+    def handle(self, *args, **options):
+        path = str(options['path'] or get_setting('RULEBOOK_PATH') or DEFAULT_RULEBOOK)
+        cache_dir = options['cache_dir'] or get_setting('RULEBOOK_CACHE_DIR')
+        try:
+            artifact = compile_rulebook(path, cache_dir, force=options['force'])
+            self.verify(artifact, path, cache_dir)
+        except RulebookError as exc:
+            raise CommandError(str(exc)) from exc
+
+        location = artifact_path(cache_dir, artifact['hash']) if cache_dir else "memory (no cache directory)"
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {len(artifact['pairs'])} rules from {path} into {location}."))
+
+    def verify(self, artifact, path, cache_dir):
+        """
+        Check that the artifact matches its source, and that the configured engine can load it.
+        """
+        digest = content_hash(read_source(path))
+        if artifact['hash'] != digest:
+            raise CommandError(f"The rulebook {path} changed while it was compiled, run the command again.")
+        if cache_dir and read_artifact(artifact_path(cache_dir, digest), digest) != artifact:
+            raise CommandError(f"The compiled rulebook in {cache_dir} does not match {path}.")
+        if artifact['analysis'] != analyze(artifact['pairs']):
+            raise CommandError(f"The compiled rulebook of {path} is stale, run the command with --force.")
+        try:
+            ChatEngine(artifact['pairs'], artifact['reflections'], regex_engine=get_setting('REGEX_ENGINE'),
+                       analysis=artifact['analysis'])
+        except (ValueError, ImportError) as exc:
+            raise CommandError(f"The rulebook {path} cannot be loaded: {exc}") from exc
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.conf import get_setting
+from api.session_sweeper import close_idle_steps
+
+
+class Command(BaseCommand):
+    help = ("End the chat sessions idle for longer than a TTL, in batches, e.g. from cron. "
+            "Set CHATBOT_SESSION_SWEEP_INTERVAL to run the sweep in the server processes instead.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=float, help="The seconds since its last message after which a session "
+                                                      "is idle. Defaults to CHATBOT['SESSION_TTL'].")
+        parser.add_argument('--batch-size', type=int, help="The most sessions ended by one UPDATE. "
+                                                           "Defaults to CHATBOT['SESSION_SWEEP_BATCH_SIZE'].")
+
+    def handle(self, *args, **options):
+        ttl = options['ttl'] if options['ttl'] is not None else get_setting('SESSION_TTL')
+        batch_size = options['batch_size'] or get_setting('SESSION_SWEEP_BATCH_SIZE')
+        if ttl < 0 or batch_size < 1:
+            raise CommandError("The TTL must not be negative and the batch size must be positive.")
+        closed = close_idle_steps(ttl, batch_size)
+        self.stdout.write(f"Ended {closed} sessions idle for over {ttl:g} seconds.")
@@ -0,0 +1,58 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.export import FIELDS, FORMATS, export
+
+
+class Command(BaseCommand):
+    help = ("Stream the Log or Step table as a gzip-compressed NDJSON or CSV file, optionally "
+            "filtered by creation date and user, for offline analysis.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=list(FIELDS), default='logs', help="The table to export.")
+        parser.add_argument('--format', choices=FORMATS, default='ndjson', help="The file format.")
+        parser.add_argument('--start', help="Only export rows created at or after this ISO 8601 date or time.")
+        parser.add_argument('--end', help="Only export rows created before this ISO 8601 date or time.")
+        parser.add_argument('--user', help="Only export the rows of the user with this username.")
+        parser.add_argument('--output', default='-', help="The file to write, or - for stdout (default).")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="The rows fetched per database query.")
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['user']:
+            user_id = User.objects.filter(username=options['user']).values_list('id', flat=True).first()
+            if user_id is None:
+                raise CommandError(f"Unknown user {options['user']!r}.")
+
+        chunks = export(options['kind'], options['format'], start=self.parse_time(options['start']),
+                        end=self.parse_time(options['end']), user_id=user_id, chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            self.write(chunks, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as file:
+                self.write(chunks, file)
+
+    @staticmethod
+    def write(chunks, file):
+        for chunk in chunks:
+            file.write(chunk)
+        file.flush()
+
+    @staticmethod
+    def parse_time(value):
+        """
+        Parse an ISO 8601 date or time, in the current time zone unless it has an offset.
+        """
+        if value is None:
+            return None
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"{value!r} is not an ISO 8601 date or time.")
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
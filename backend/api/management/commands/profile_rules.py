@@ -0,0 +1,108 @@
+import gzip
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.conf import get_setting
+from api.models import Log
+from api.rule_profiler import RuleProfiler
+from api.rulebook import DEFAULT_RULEBOOK, RulebookError, load_engine
+
+
+class Command(BaseCommand):
+    help = ("Replay user messages from the Log table or an NDJSON file through the rulebook, and report "
+            "the matching cost of each rule and the rules shadowed by earlier rules.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help="An NDJSON file of messages, optionally gzipped, or - for stdin. "
+                                           "Each line is a JSON string or an object with a 'text', and an "
+                                           "optional 'sender' ('U' lines are replayed). Defaults to the Log table.")
+        parser.add_argument('--rulebook', help="The rulebook file. Defaults to CHATBOT['RULEBOOK_PATH'].")
+        parser.add_argument('--limit', type=int, help="Replay at most this many messages.")
+        parser.add_argument('--top', type=int, default=20, help="The number of rules to list by regex time.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="The rows fetched per database query.")
+        parser.add_argument('--json', action='store_true', help="Write the full report as JSON.")
+
+    def handle(self, *args, **options):
+        path = options['rulebook'] or get_setting('RULEBOOK_PATH') or DEFAULT_RULEBOOK
+        try:
+            engine = load_engine(path, get_setting('RULEBOOK_CACHE_DIR'), regex_engine=get_setting('REGEX_ENGINE'))
+        except RulebookError as exc:
+            raise CommandError(str(exc)) from exc
+
+        profiler = RuleProfiler(engine)
+        texts = self.read_file(options['file']) if options['file'] else self.read_logs(options['chunk_size'])
+        if options['limit'] is not None:
+            texts = (text for _, text in zip(range(options['limit']), texts))
+        profiler.replay(texts)
+
+        report = profiler.report()
+        report['shadowed'] = profiler.shadowed()
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.write_report(report, options['top'])
+
+    @staticmethod
+    def read_logs(chunk_size):
+        """
+        Stream the user messages of the Log table, in the order they were saved.
+        """
+        return Log.objects.filter(sender='U').order_by('pk').values_list('text', flat=True).iterator(chunk_size)
+
+    @staticmethod
+    def read_file(path):
+        """
+        Stream the user messages of an NDJSON file.
+        """
+        if path == '-':
+            lines = sys.stdin
+        elif path.endswith('.gz'):
+            lines = gzip.open(path, 'rt', encoding='utf-8')
+        else:
+            lines = open(path, encoding='utf-8')
+        with lines:
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as exc:
+                    raise CommandError(f"Line {number} of {path} is not valid JSON: {exc}") from exc
+                if isinstance(entry, str):
+                    yield entry
+                elif isinstance(entry, dict) and isinstance(entry.get('text'), str):
+                    if entry.get('sender', 'U') == 'U':
+                        yield entry['text']
+                else:
+                    raise CommandError(f"Line {number} of {path} has no message text.")
+
+    def write_report(self, report, top):
+        rules = report['rules']
+        matched = report['messages'] - report['unmatched']
+        total_ms = sum(rule['total_ms'] for rule in rules)
+        self.stdout.write(f"Replayed {report['messages']} messages: {matched} matched, {report['unmatched']} "
+                          f"unmatched, {report['regexes_per_message']:.2f} regexes per message, "
+                          f"{total_ms:.2f} ms in regexes.")
+
+        self.stdout.write(f"\nRules by regex time (top {top}):")
+        self.stdout.write(f"{'rule':>6} {'hits':>8} {'attempts':>9} {'total ms':>9} {'avg us':>8} {'max us':>8} "
+                          f"{'tried before hit':>17}  pattern")
+        for rule in sorted(rules, key=lambda rule: rule['total_ms'], reverse=True)[:top]:
+            tried = rule['avg_tried_before_hit']
+            self.stdout.write(f"{rule['index']:>6} {rule['hits']:>8} {rule['attempts']:>9} {rule['total_ms']:>9.2f} "
+                              f"{rule['avg_us']:>8.1f} {rule['max_us']:>8.1f} "
+                              f"{'-' if tried is None else f'{tried:.1f}':>17}  {rule['pattern']}")
+
+        never = [rule for rule in rules if not rule['hits']]
+        self.stdout.write(f"\nRules that matched no message: {len(never)} of {len(rules)}")
+
+        shadowed = report['shadowed']
+        if shadowed:
+            self.stdout.write(self.style.WARNING(f"\nRules shadowed by earlier rules: {len(shadowed)}"))
+            for rule in shadowed:
+                by = ", ".join(f"{i} {rules[i]['pattern']!r}" for i in rule['shadowed_by'])
+                self.stdout.write(f"{rule['index']:>6} {rule['pattern']!r} is shadowed by {by}")
+        else:
+            self.stdout.write("\nNo rule is shadowed by earlier rules.")
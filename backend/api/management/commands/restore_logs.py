@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.archive import restore_logs
+from api.conf import get_setting
+
+
+class Command(BaseCommand):
+    help = "Restore the archived chat logs of a range of days, optionally of a single user, into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help="The first UTC day, as YYYY-MM-DD.")
+        parser.add_argument('--end', help="The last UTC day, included, as YYYY-MM-DD. Defaults to --start.")
+        parser.add_argument('--user', help="Only restore the logs of the user with this username.")
+        parser.add_argument('--directory', help="The archive directory. Defaults to CHATBOT['LOG_ARCHIVE_DIR'].")
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['user']:
+            user_id = User.objects.filter(username=options['user']).values_list('id', flat=True).first()
+            if user_id is None:
+                raise CommandError(f"Unknown user {options['user']!r}.")
+
+        start = self.parse_day(options['start'])
+        end = self.parse_day(options['end']) if options['end'] else start
+        directory = options['directory'] or get_setting('LOG_ARCHIVE_DIR')
+        if not directory:
+            raise CommandError("Set --directory or CHATBOT['LOG_ARCHIVE_DIR'].")
+        restored = restore_logs(directory, start, end, user_id, get_setting('LOG_ARCHIVE_BATCH_SIZE'))
+        self.stdout.write(f"Restored {restored} logs.")
+
+    @staticmethod
+    def parse_day(value):
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"{value!r} is not a YYYY-MM-DD date.")
+        return parsed
@@ -0,0 +1,122 @@
+import hmac
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from . import timing
+from .conf import get_setting
+
+# The metrics of each worker process are written to files in PROMETHEUS_MULTIPROC_DIR
+# when it is set, and summed across processes when they are collected, see gunicorn.conf.py.
+MULTIPROCESS_DIR = 'PROMETHEUS_MULTIPROC_DIR'
+
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+REQUEST_LATENCY = Histogram('chatbot_request_duration_seconds', 'Request latency by view.', ['view', 'method'])
+REQUESTS = Counter('chatbot_requests', 'Requests by view and response status.', ['view', 'method', 'status'])
+DB_QUERIES = Histogram('chatbot_db_queries_per_request', 'Database queries per request by view.', ['view'],
+                       buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, float('inf')))
+DB_DURATION = Histogram('chatbot_db_duration_seconds', 'Time spent in database queries per request by view.',
+                        ['view'])
+RULE_MATCHES = Counter('chatbot_rule_matches', 'Messages answered by each rule of the rulebook, '
+                                                  'by the index of the rule.', ['rule'])
+FALLBACK_REPLIES = Counter('chatbot_fallback_replies', 'Messages no rule matched, by the reply given: '
+                                                       'a FAQ answer or the default reply.', ['reply'])
+INTENTS = Counter('chatbot_intents', 'Greetings and goodbyes detected in messages.', ['intent'])
+
+
+def get_registry():
+    """
+    Get the registry to collect the metrics from: the metrics of all worker processes
+    in multiprocess mode, or the metrics of this process otherwise.
+
+    Returns:
+    - CollectorRegistry: The registry.
+    """
+    path = os.environ.get(MULTIPROCESS_DIR)
+    if not path:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return registry
+
+
+def metrics_view(request):
+    """
+    Expose the metrics in the Prometheus text format.
+
+    When CHATBOT['METRICS_TOKEN'] is set, scrapers must send it as a bearer token.
+    Otherwise the metrics are only served to clients on the loopback interface.
+    """
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def _may_scrape(request):
+    """
+    Internal function to check whether a request may read the metrics.
+    """
+    token = get_setting('METRICS_TOKEN')
+    if not token:
+        return request.META.get('REMOTE_ADDR') in LOOPBACK_ADDRESSES
+    scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode())
+
+
+class MetricsMiddleware(object):
+    """
+    A middleware that records the latency, status and database queries of each request
+    by the name of its view, e.g. 'chat' or 'token_obtain_pair'.
+
+    Database queries are counted by a QueryCount, which only counts queries, so requests
+    the ServerTimingMiddleware does not sample still have their phases left untimed.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        count = timing.QueryCount()
+        token = timing.start_counting(count)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.stop_counting(token)
+        self._observe(request, response, count, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        count = timing.QueryCount()
+        token = timing.start_counting(count)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.stop_counting(token)
+        self._observe(request, response, count, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _observe(request, response, count, elapsed):
+        """
+        Internal method to record the metrics of a handled request.
+        """
+        match = request.resolver_match
+        view = match.view_name if match else '<unmatched>'
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        DB_QUERIES.labels(view).observe(count.queries)
+        DB_DURATION.labels(view).observe(count.query_seconds)
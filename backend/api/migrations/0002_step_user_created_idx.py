@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 02:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='step',
+            options={'ordering': ('-created_at',)},
+        ),
+        migrations.AlterField(
+            model_name='log',
+            name='sender',
+            field=models.CharField(choices=[('U', 'User'), ('C', 'Chat')], max_length=1),
+        ),
+        migrations.AlterField(
+            model_name='step',
+            name='name',
+            field=models.CharField(choices=[('G', 'Greeting'), ('Q', 'Question'), ('E', 'End')], default='G', max_length=1),
+        ),
+        migrations.AddIndex(
+            model_name='step',
+            index=models.Index(fields=['user', '-created_at'], name='api_step_user_created_idx'),
+        ),
+    ]
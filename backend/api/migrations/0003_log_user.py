@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def set_log_users(apps, schema_editor):
+    """
+    Copy the user of each step to its log entries.
+    """
+    Log = apps.get_model('api', 'Log')
+    Step = apps.get_model('api', 'Step')
+    Log.objects.update(user_id=Subquery(Step.objects.filter(pk=OuterRef('step_id')).values('user_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_step_user_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='log',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(set_log_users, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='log',
+            name='user',
+            field=models.ForeignKey(on_delete=models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='api_log_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_log_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='step',
+            index=models.Index(fields=['name', 'updated_at'], name='api_step_name_updated_idx'),
+        ),
+    ]
@@ -46,6 +46,10 @@ class Step(TimeStampedModel):
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="api_step_user_created_idx"),
+            models.Index(fields=["name", "updated_at"], name="api_step_name_updated_idx"),
+        ]
 
 
 class Log(TimeStampedModel):
@@ -56,6 +60,8 @@ class Log(TimeStampedModel):
     - text (str): The text content of the log entry.
     - sender (str): The sender type ('U' for user, 'C' for chat).
     - step (ForeignKey to Step): The step associated with this log entry.
+    - user (ForeignKey to User): The user of the step, stored on the log entry so the history
+                                 of a user is read from a single index.
     """
     CHOICES = (
         ('U', _('User')),
@@ -64,9 +70,13 @@ class Log(TimeStampedModel):
     text = models.TextField()
     sender = models.CharField(max_length=1, choices=CHOICES)
     step = models.ForeignKey(Step, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="api_log_user_created_idx"),
+        ]
 
     def __str__(self):
         return f'Log Entry ({self.sender}): {self.text} (created at {self.created_at})'
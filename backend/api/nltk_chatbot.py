@@ -1,64 +1,193 @@
-from nltk.chat.util import Chat, reflections
+import logging
+import os
+import threading
+
+from . import metrics
+from .chat_engine import ChatEngine
+from .conf import get_setting
 from .interfaces.chatbot_interface import ChatBotInterface
+from .response_cache import ResponseCache
+from .retrieval_chatbot import RetrievalChatBot
+from .rulebook import DEFAULT_RULEBOOK, RulebookError, compile_rulebook, content_hash, load_pairs, read_source
+
+logger = logging.getLogger(__name__)
+
+# the rules of the bundled rulebook, api/rulebook.json
+pairs = load_pairs()
+
+_engine = None
+_engine_hash = None
+_engine_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_response_cache = None
+_watcher = None
+
+
+def _build_engine():
+    """
+    Internal method to build a ChatEngine from the configured rulebook, returning it
+    with the hash of the rulebook.
+    """
+    artifact = compile_rulebook(get_setting('RULEBOOK_PATH') or DEFAULT_RULEBOOK,
+                                get_setting('RULEBOOK_CACHE_DIR'))
+    engine = ChatEngine(artifact['pairs'], artifact['reflections'],
+                        regex_engine=get_setting('REGEX_ENGINE'),
+                        max_input_length=get_setting('MAX_INPUT_LENGTH'),
+                        time_budget=get_setting('MATCH_TIME_BUDGET'),
+                        analysis=artifact['analysis'])
+    return engine, artifact['hash']
+
+
+def get_engine():
+    """
+    Get the process-wide ChatEngine, compiling the rulebook on first use.
+
+    Calling this before the server forks its workers (e.g. with gunicorn --preload)
+    builds the engine once in the master process. If CHATBOT['RULEBOOK_RELOAD_INTERVAL']
+    is set, the rulebook file is checked for changes in the background, see RulebookWatcher.
+
+    Returns:
+    - ChatEngine: The shared ChatEngine instance.
+    """
+    global _engine, _engine_hash
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine, _engine_hash = _build_engine()
+    return _engine
+
+
+def reload_engine(blocking=True):
+    """
+    Rebuild the process-wide ChatEngine if the content of the rulebook file changed.
+
+    The new engine is built while requests keep using the current one, and then swapped in
+    with a single assignment, so requests in flight finish with the engine they started with.
+    If the new rulebook is invalid, the error is logged and the current engine is kept.
+
+    Parameters:
+    - blocking (bool, optional): Whether to wait for a reload already running in another
+                                 thread, rather than return at once.
+
+    Returns:
+    - bool: True if a new engine was swapped in.
+    """
+    global _engine, _engine_hash
+    if not _reload_lock.acquire(blocking=blocking):
+        return False
+    try:
+        path = get_setting('RULEBOOK_PATH') or DEFAULT_RULEBOOK
+        try:
+            if _engine is not None and content_hash(read_source(path)) == _engine_hash:
+                return False
+            engine, digest = _build_engine()
+        except (RulebookError, ValueError, ImportError):
+            logger.exception("Keeping the current rulebook, %s cannot be loaded", path)
+            return False
+        with _engine_lock:
+            _engine, _engine_hash = engine, digest
+        logger.info("Reloaded the rulebook %s (%s)", path, digest)
+        return True
+    finally:
+        _reload_lock.release()
+
+
+class RulebookWatcher(object):
+    """
+    A daemon thread that reloads the rulebook when its file changes, checking it at a
+    regular interval, so requests never read, hash or compile the rulebook themselves.
+
+    The thread is started on first use in each process, like the SessionSweeper, see
+    start_rulebook_watcher().
+
+    Attributes:
+    - interval (float): The seconds between checks of the rulebook file.
 
-pairs = [
-    [
-        r"my name is (.*)",
-        ["Hello %1, nice to have you here. How can I help you?", ]
-    ],
-    [
-        r"what is your name?",
-        ["My name is Chatty.", ]
-    ],
-    [
-        r"how are you ?",
-        ["Pretty good, thank you! How are you doing?", ]
-    ],
-    [
-        r"I am fine, thank you",
-        ["Great to hear that. How can I help you?", ]
-    ],
-    [
-        r"i'm (.*) doing good",
-        ["That's great to hear! How can I assist you?", ]
-    ],
-    [
-        r"(.*) created you?",
-        ["Ntungufhadzeni created me.", ]
-    ],
-    [
-        r"how is the weather in (.*)",
-        ["The weather in %1 is pretty awesome as always.", ]
-    ],
-    [
-        r"can you help(.*)",
-        ["Of course, I can help you.", ]
-    ],
-    [
-        r"(.*)(location|city)(.*)",
-        ["I am located in Johannesburg, South Africa.", ]
-    ],
-    [
-        r"(which|what) (.*) (sport|game) ?",
-        ["I love soccer.", ]
-    ],
-    [
-        r"thank you so much, that was amazing",
-        ["I am happy to help. No problem, you're welcome.", ]
-    ],
-    [
-        r"what is the meaning of life?",
-        ["The meaning of life is a philosophical question that has different answers for different people.", ]
-    ],
-    [
-        r"tell me a joke",
-        ["Why don't scientists trust atoms? Because they make up everything!", ]
-    ],
-    [
-        r"do you like music?",
-        ["I don't have personal preferences, but I can recommend some music if you'd like.", ]
-    ],
-]
+    Methods:
+    - start(): Start the background thread, if it is not running in this process.
+    - stop(): Stop the background thread.
+    """
+
+    def __init__(self, interval):
+        """
+        Initialize the RulebookWatcher instance.
+
+        Parameters:
+        - interval (float): The seconds between checks of the rulebook file.
+        """
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """
+        Start the background thread, if it is not running in this process.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='rulebook-watcher', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """
+        Stop the background thread, waiting for a reload in progress to finish.
+        """
+        with self._lock:
+            thread, self._thread, self._pid = self._thread, None, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        """
+        Internal method run by the background thread.
+        """
+        while not self._stop.wait(self.interval):
+            try:
+                reload_engine(blocking=False)
+            except Exception:
+                logger.exception("Failed to check the rulebook for changes")
+
+
+def start_rulebook_watcher(**kwargs):
+    """
+    Start the process-wide RulebookWatcher, if CHATBOT['RULEBOOK_RELOAD_INTERVAL'] is set.
+
+    Connected to the request_started signal, so the rulebook is watched in each server
+    process from its first request.
+    """
+    global _watcher
+    if _watcher is None:
+        interval = get_setting('RULEBOOK_RELOAD_INTERVAL')
+        if not interval:
+            return
+        with _engine_lock:
+            if _watcher is None:
+                _watcher = RulebookWatcher(interval)
+    _watcher.start()
+
+
+def get_response_cache():
+    """
+    Get the process-wide ResponseCache, or None if CHATBOT['RESPONSE_CACHE_SIZE'] is 0.
+
+    Returns:
+    - ResponseCache: The shared ResponseCache instance.
+    """
+    global _response_cache
+    if _response_cache is None and get_setting('RESPONSE_CACHE_SIZE') > 0:
+        with _engine_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(get_setting('RESPONSE_CACHE_SIZE'),
+                                                get_setting('RESPONSE_CACHE_POLICY'))
+    return _response_cache
 
 
 class NltkChatBot(ChatBotInterface):
@@ -68,7 +197,9 @@ class NltkChatBot(ChatBotInterface):
     Attributes:
     - _text (str): The input text for which a response is generated.
     - _response (str): The generated response for the input text.
-    - _chat (Chat): The Chat instance used for responding to input.
+    - _engine (ChatEngine): The shared ChatEngine used for responding to input.
+    - _cache (ResponseCache): The shared ResponseCache, or None if caching is disabled.
+    - _fallback (type): The ChatBotInterface class asked when no rule matches, or None.
 
     Methods:
     - get_response(): Get the generated response. If not already set, it is generated using _set_response().
@@ -83,16 +214,22 @@ class NltkChatBot(ChatBotInterface):
     ```
     """
 
-    def __init__(self, text):
+    def __init__(self, text, engine=None, cache=None, fallback=None):
         """
         Initialize the ChatBot instance.
 
         Parameters:
         - text (str): The input text for which a response is generated.
+        - engine (ChatEngine, optional): The engine to respond with. Defaults to the shared engine.
+        - cache (ResponseCache, optional): The cache to respond from. Defaults to the shared cache.
+        - fallback (type, optional): A ChatBotInterface class whose response is used when no rule
+                                     matches. Defaults to RetrievalChatBot if CHATBOT['FAQ_PATH'] is set.
         """
         self._text = text
         self._response = None
-        self._chat = Chat(pairs, reflections)
+        self._engine = engine or get_engine()
+        self._cache = cache or get_response_cache()
+        self._fallback = fallback or (RetrievalChatBot if get_setting('FAQ_PATH') else None)
 
     def get_response(self):
         """
@@ -107,11 +244,25 @@ class NltkChatBot(ChatBotInterface):
     def _set_response(self):
         """
         Internal method to set the response based on the input text.
-        If no response is generated, a default message is set.
+        If no rule matches, the fallback chatbot is asked, and if it has no response either,
+        a default message is set.
         """
-        self._response = self._chat.respond(self._text)
-        if not self._response:
+        if self._cache is not None:
+            found = self._cache.match(self._engine, self._text)
+        else:
+            found = self._engine.match(self._text)
+        if found:
+            self._response = self._engine.reply(*found)
+            metrics.RULE_MATCHES.labels(str(found[0])).inc()
+            return
+
+        if self._fallback is not None:
+            self._response = self._fallback(self._text).get_response()
+        if self._response:
+            metrics.FALLBACK_REPLIES.labels('faq').inc()
+        else:
             self._response = 'Sorry, I did not understand the input. Please try again.'
+            metrics.FALLBACK_REPLIES.labels('default').inc()
 
     @classmethod
     def from_json(cls, json_data):
@@ -0,0 +1,115 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .conf import get_setting
+
+
+class KeysetPagination(BasePagination):
+    """
+    A pagination over (created_at, id), newest first, whose pages start after an opaque cursor
+    holding the position of the last item of the previous page.
+
+    Unlike an offset, the cursor is turned into a range condition, so with an index on
+    (created_at, id), or (user, created_at, id) for a queryset filtered by user, a page deep in
+    the history costs as much as the first one. Items with the same created_at are ordered by id,
+    so none is skipped or repeated between pages, and items added while paging do not shift them.
+
+    Query Parameters:
+    - cursor (str): The cursor of the page, as returned in the 'next' link of the previous one.
+    - limit (int): The number of items per page, CHATBOT['HISTORY_PAGE_SIZE'] by default and
+                   at most CHATBOT['HISTORY_MAX_PAGE_SIZE'].
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Get the items of the requested page.
+
+        Parameters:
+        - queryset (QuerySet): The items, of a model with created_at and id fields.
+        - request (Request): The HTTP request object.
+
+        Returns:
+        - list: The items of the page, newest first.
+
+        Raises:
+        - NotFound: If the cursor is invalid.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by('-created_at', '-id')
+        if position is not None:
+            created_at, pk = position
+            # the first condition alone bounds the index range scan, the second drops the ties before the cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                                       created_at__lte=created_at)
+
+        # one more item than the page tells if there is a next page without a count query
+        items = list(queryset[:self.limit + 1])
+        self.has_next = len(items) > self.limit
+        self.page = items[:self.limit]
+        return self.page
+
+    def get_limit(self, request):
+        """
+        Get the page size from the limit query parameter, or the default page size if it is
+        missing or invalid.
+        """
+        default = get_setting('HISTORY_PAGE_SIZE')
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, default))
+        except ValueError:
+            return default
+        return min(max(limit, 1), get_setting('HISTORY_MAX_PAGE_SIZE'))
+
+    def decode_cursor(self, request):
+        """
+        Get the position in the cursor query parameter.
+
+        Returns:
+        - tuple: The created_at and id of the last item of the previous page, or None for the first page.
+
+        Raises:
+        - NotFound: If the cursor is invalid.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            created_at = parse_datetime(created_at)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None or not isinstance(pk, int) or isinstance(pk, bool):
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    @staticmethod
+    def encode_cursor(item):
+        """
+        Get the cursor of the page starting after an item.
+        """
+        position = json.dumps([item.created_at.isoformat(), item.pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
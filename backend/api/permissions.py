@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from rest_framework import permissions
+
+
+class IsAdminUser(permissions.IsAdminUser):
+    """
+    An IsAdminUser that also admits admins authenticated in stateless mode.
+
+    With CHATBOT['AUTH_STATELESS'], CachedJWTAuthentication builds the user from the token
+    claims, without is_staff, so the admin status of such a user is read from the database.
+    Only the admin-only views pay for that query, and a user who is no longer an admin
+    loses access at once rather than when their token expires.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if getattr(user, 'from_token_claims', False):
+            return get_user_model().objects.filter(pk=user.pk, is_active=True, is_staff=True).exists()
+        return super().has_permission(request, view)
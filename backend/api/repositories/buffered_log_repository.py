@@ -0,0 +1,244 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.db import DatabaseError, DataError, IntegrityError, close_old_connections, connection, transaction
+
+from ..conf import get_setting
+from ..interfaces.log_interface import LogInterface
+from ..models import Log, Step
+
+logger = logging.getLogger(__name__)
+
+# the flushes a batch is kept queued for while the database cannot be written to
+MAX_RETRIES = 3
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+class LogBuffer(object):
+    """
+    An in-memory queue of log entries written to the database in the background.
+
+    Entries are written with a single bulk_create once max_size entries are queued,
+    or every flush_interval seconds, by a daemon thread started on first use in each
+    process, so it is safe to create the buffer before the server forks its workers.
+    Queued entries are flushed when the process exits. Their created_at timestamps are
+    set when they are written, while their ids keep the order they were queued in.
+
+    When a batch cannot be written, its entries are written one at a time, so an invalid
+    entry, e.g. of a deleted step, is the only one lost. If the database is unavailable, the
+    entries left are queued again, for at most MAX_RETRIES flushes in a row.
+
+    Attributes:
+    - max_size (int): The number of queued entries that triggers a flush.
+    - flush_interval (float): The maximum seconds between flushes.
+
+    Methods:
+    - add(logs): Queue unsaved Log instances.
+    - flush(): Write all queued entries now.
+    - stop(): Stop the background thread and flush the queued entries.
+    - metrics(): Get the queue depth and flush statistics.
+    """
+
+    def __init__(self, max_size=500, flush_interval=1.0):
+        """
+        Initialize the LogBuffer instance.
+
+        Parameters:
+        - max_size (int, optional): The number of queued entries that triggers a flush.
+        - flush_interval (float, optional): The maximum seconds between flushes.
+        """
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._queue = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+        self._flushes = 0
+        self._flushed = 0
+        self._failed = 0
+        self._retries = 0
+        self._last_flush_seconds = 0.0
+        self._max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+    def add(self, logs):
+        """
+        Queue unsaved Log instances, starting the background thread if needed.
+
+        Parameters:
+        - logs (list): The Log instances to write.
+        """
+        self._ensure_started()
+        with self._lock:
+            self._queue.extend(logs)
+            full = len(self._queue) >= self.max_size
+        if full:
+            self._wake.set()
+
+    def _ensure_started(self):
+        """
+        Internal method to start the background thread once per process.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # a forked worker inherits the queue of its parent, but not its thread
+            self._queue = []
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='log-buffer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+        atexit.register(self.stop)
+
+    def _run(self):
+        """
+        Internal method run by the background thread.
+        """
+        try:
+            while True:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                if self._stopping:
+                    return
+                # drop a connection broken by a database restart, or older than CONN_MAX_AGE
+                close_old_connections()
+                self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """
+        Write all queued entries with a single bulk_create, or one at a time if it fails.
+
+        Returns:
+        - int: The number of entries written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                logs, self._queue = self._queue, []
+            if not logs:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                # a savepoint, if the flush runs in a transaction, so a failure does not break it
+                with transaction.atomic():
+                    Log.objects.bulk_create(logs)
+                written = len(logs)
+                self._retries = 0
+            except DatabaseError:
+                logger.exception("Failed to flush %d log entries, writing them one at a time", len(logs))
+                written = self._write_each(logs)
+            elapsed = time.perf_counter() - start
+
+            self._flushes += 1
+            self._flushed += written
+            self._last_flush_seconds = elapsed
+            self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+            self._total_flush_seconds += elapsed
+            return written
+
+    def _write_each(self, logs):
+        """
+        Internal method to write entries one at a time, dropping the invalid ones, and queue
+        the entries left again if the database is unavailable.
+        """
+        written = 0
+        for i, log in enumerate(logs):
+            try:
+                with transaction.atomic():
+                    log.save(force_insert=True)
+                written += 1
+            except (IntegrityError, DataError):
+                logger.exception("Dropped an invalid log entry")
+                self._failed += 1
+            except DatabaseError:
+                left = logs[i:]
+                self._retries += 1
+                if self._retries > MAX_RETRIES:
+                    logger.error("Dropped %d log entries after %d failed flushes", len(left), MAX_RETRIES + 1)
+                    self._failed += len(left)
+                    self._retries = 0
+                else:
+                    with self._lock:
+                        self._queue[:0] = left
+                return written
+        self._retries = 0
+        return written
+
+    def stop(self):
+        """
+        Stop the background thread and flush the queued entries in the calling thread.
+        """
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self._thread = None
+        self._pid = None
+        self.flush()
+
+    def metrics(self):
+        """
+        Get the queue depth and flush statistics.
+
+        Returns:
+        - dict: The queue depth, the number of flushes, entries written and entries lost,
+                and the last, maximum and average flush latency in seconds.
+        """
+        with self._lock:
+            depth = len(self._queue)
+        return {
+            'queue_depth': depth,
+            'flushes': self._flushes,
+            'flushed': self._flushed,
+            'failed': self._failed,
+            'last_flush_seconds': self._last_flush_seconds,
+            'max_flush_seconds': self._max_flush_seconds,
+            'avg_flush_seconds': self._total_flush_seconds / self._flushes if self._flushes else 0.0,
+        }
+
+
+def get_log_buffer():
+    """
+    Get the process-wide LogBuffer, configured by the LOG_BUFFER_* chatbot settings.
+
+    Returns:
+    - LogBuffer: The shared LogBuffer instance.
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = LogBuffer(get_setting('LOG_BUFFER_SIZE'), get_setting('LOG_BUFFER_INTERVAL'))
+    return _buffer
+
+
+class BufferedLogRepository(LogInterface):
+    """
+    A LogInterface that queues log entries in a LogBuffer instead of writing them
+    before the response is sent.
+    """
+
+    def __init__(self, buffer: LogBuffer = None):
+        self.buffer = buffer or get_log_buffer()
+
+    def create(self, text: str, sender: str, step: Step):
+        log = Log(text=text, sender=sender, step=step, user_id=step.user_id)
+        self.buffer.add([log])
+        return log
+
+    def bulk_create(self, entries: list):
+        logs = [Log(text=text, sender=sender, step=step, user_id=step.user_id) for text, sender, step in entries]
+        self.buffer.add(logs)
+        return logs
@@ -0,0 +1,75 @@
+from ..interfaces.step_interface import StepInterface
+from ..models import Step
+
+
+class StaleStepError(Exception):
+    """
+    Raised when a cached session was changed by another writer since it was read.
+    """
+
+
+class CachedStepRepository(StepInterface):
+    """
+    A StepInterface that keeps the current session of its user in memory, for
+    long-lived connections such as WebSockets.
+
+    The session is loaded from the wrapped repository once, then kept up to date by
+    create() and update(), so later turns do not query it again. Other writers, e.g.
+    /chat/ or the session sweeper, may still change the session: update() only saves
+    the step if it is unchanged since it was read, and otherwise forgets it and raises
+    a StaleStepError, so the turn can be handled again with the current session.
+    """
+
+    def __init__(self, repository: StepInterface):
+        self.repository = repository
+        self._step = None
+        self._loaded = False
+
+    def get(self):
+        if not self._loaded:
+            self._step = self.repository.get()
+            self._loaded = True
+        return self._step
+
+    def create(self):
+        self._step = self.repository.create()
+        self._loaded = True
+        return self._step
+
+    def build(self):
+        return self.repository.build()
+
+    def bulk_create(self, steps: list):
+        steps = self.repository.bulk_create(steps)
+        if steps:
+            self._step = steps[-1]
+            self._loaded = True
+        return steps
+
+    def update(self, name: str, step: Step):
+        updated = self.update_if_unchanged(name, step)
+        if updated is None:
+            raise StaleStepError(f"The step {step.pk} has changed since it was read.")
+        return updated
+
+    def update_if_unchanged(self, name: str, step: Step):
+        self._step = self.repository.update_if_unchanged(name, step)
+        self._loaded = self._step is not None
+        return self._step
+
+    def bulk_update(self, steps: list):
+        return self.repository.bulk_update(steps)
+
+    def atomic(self):
+        return self.repository.atomic()
+
+    async def aget(self):
+        if not self._loaded:
+            self._step = await self.repository.aget()
+            self._loaded = True
+        return self._step
+
+    async def acreate(self):
+        self._step = await self.repository.acreate()
+        self._loaded = True
+        return self._step
@@ -4,4 +4,13 @@ from ..models import Log, Step
 
 class LogRepository(LogInterface):
     def create(self, text: str, sender: str, step: Step):
-        return Log.objects.create(text=text, sender=sender, step=step)
+        return Log.objects.create(text=text, sender=sender, step=step, user_id=step.user_id)
+
+    def bulk_create(self, entries: list):
+        """
+        Create several log entries with a single INSERT.
+
+        Parameters:
+        - entries (list): A list of (text, sender, step) tuples, in the order they were sent.
+        """
+        return Log.objects.bulk_create([Log(text=text, sender=sender, step=step, user_id=step.user_id) for text, sender, step in entries])
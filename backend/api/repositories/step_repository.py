@@ -1,3 +1,6 @@
+from django.db import transaction
+from django.utils import timezone
+
 from ..interfaces.step_interface import StepInterface
 from ..models import Step
 
@@ -7,12 +10,67 @@ class StepRepository(StepInterface):
         self.user = user
 
     def get(self):
-        return Step.objects.all()[0]
+        return Step.objects.filter(user=self.user).first()
 
     def create(self):
         return Step.objects.create(user=self.user)
 
+    def build(self):
+        """
+        Get a new, unsaved step of the user, to be saved with bulk_create().
+        """
+        return Step(user=self.user)
+
+    def bulk_create(self, steps: list):
+        """
+        Save several new steps with a single INSERT, setting their primary keys.
+
+        Parameters:
+        - steps (list): The unsaved steps.
+        """
+        return Step.objects.bulk_create(steps)
+
     def update(self, name: str, step: Step):
         step.name = name
-        step.save()
+        step.save(update_fields=['name', 'updated_at'])
         return step
+
+    def update_if_unchanged(self, name: str, step: Step):
+        """
+        Save the name of a step with a conditional UPDATE, unless another writer, e.g.
+        /chat/ or the session sweeper, has updated it since it was read.
+
+        Parameters:
+        - name (str): The new name of the step.
+        - step (Step): The step, as it was read.
+
+        Returns:
+        - Step: The updated step, or None if the step has changed since it was read.
+        """
+        now = timezone.now()
+        if not Step.objects.filter(pk=step.pk, updated_at=step.updated_at).update(name=name, updated_at=now):
+            return None
+        step.name, step.updated_at = name, now
+        return step
+
+    def bulk_update(self, steps: list):
+        """
+        Save the names of several steps with a single UPDATE.
+
+        Parameters:
+        - steps (list): The steps whose name has changed.
+        """
+        now = timezone.now()
+        for step in steps:
+            step.updated_at = now
+        Step.objects.bulk_update(steps, ['name', 'updated_at'])
+        return steps
+
+    def atomic(self):
+        return transaction.atomic()
+
+    async def aget(self):
+        return await Step.objects.filter(user=self.user).afirst()
+
+    async def acreate(self):
+        return await Step.objects.acreate(user=self.user)
@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+
+POLICIES = ('lru', 'fifo')
+
+
+class ResponseCache(object):
+    """
+    A bounded, thread-safe cache of the rule matched by an input text.
+
+    Only rules whose responses use no captured text are cached, so the reply depends on
+    the input text alone. The cache stores the index of the matched rule rather than a
+    response, so a hit skips pattern matching but still picks a random response.
+    Entries are keyed on the rulebook version and the normalized input, so a new
+    rulebook never reuses entries of an old one.
+
+    Attributes:
+    - max_size (int): The maximum number of entries.
+    - policy (str): The eviction policy, 'lru' (least recently used) or 'fifo' (oldest first).
+    - hits (int): The number of lookups answered from the cache.
+    - misses (int): The number of lookups that had to match the input.
+    - evictions (int): The number of entries evicted to make room for new ones.
+
+    Methods:
+    - respond(engine, text): Get the response for the input text, using the cache when possible.
+    - match(engine, text): Get the index of the rule matching the input text, using the cache when possible.
+    - stats(): Get the counters and current size of the cache.
+    - clear(): Remove all entries and reset the counters.
+    """
+
+    def __init__(self, max_size=1024, policy='lru'):
+        """
+        Initialize the ResponseCache instance.
+
+        Parameters:
+        - max_size (int, optional): The maximum number of entries.
+        - policy (str, optional): The eviction policy, 'lru' (default) or 'fifo'.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}, expected one of {POLICIES}.")
+        self.max_size = max_size
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text):
+        """
+        Normalize the input text into a cache key.
+
+        Rules match case-insensitively, so ASCII text is lowercased. Other text is kept as
+        is, because case-insensitive matching of non-ASCII text does not agree with str.lower().
+        """
+        return text.lower() if text.isascii() else text
+
+    def respond(self, engine, text):
+        """
+        Get the response for the input text.
+
+        Parameters:
+        - engine (ChatEngine): The engine to match the input with on a cache miss.
+        - text (str): The input text.
+
+        Returns:
+        - str: The response of the first matching rule, or None if no rule matches.
+        """
+        found = self.match(engine, text)
+        if not found:
+            return None
+        return engine.reply(*found)
+
+    def match(self, engine, text):
+        """
+        Find the first rule matching the input text, using the cache when possible.
+
+        Parameters:
+        - engine (ChatEngine): The engine to match the input with on a cache miss.
+        - text (str): The input text.
+
+        Returns:
+        - tuple: The rule index and the match object, which is None on a cache hit,
+                 or None if no rule matches.
+        """
+        key = (engine.version, self.normalize(text))
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self.hits += 1
+                if self.policy == 'lru':
+                    self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+        if index is not None:
+            return index, None
+
+        found = engine.match(text)
+        if found and engine.is_static(found[0]):
+            self._store(key, found[0])
+        return found
+
+    def _store(self, key, index):
+        """
+        Internal method to add an entry, evicting the oldest entries if the cache is full.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Get the counters and current size of the cache.
+
+        Returns:
+        - dict: The hits, misses, evictions and size of the cache.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries)}
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
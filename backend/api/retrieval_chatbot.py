@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+
+from .conf import get_setting
+from .faq_index import TfidfIndex, is_saved_index, read_corpus
+from .interfaces.chatbot_interface import ChatBotInterface
+
+logger = logging.getLogger(__name__)
+
+# the loads of a saved index tried before giving up, e.g. while other processes replace it
+LOAD_ATTEMPTS = 3
+
+_index = None
+_index_error = None
+_index_lock = threading.Lock()
+
+
+def load_faq_index(path, index_dir=None, threshold=0.5):
+    """
+    Get the TfidfIndex of a FAQ corpus, building and saving it unless it is already saved.
+
+    Indexes are saved in index_dir under the hash of the corpus, so a corpus is indexed once,
+    and later processes memory-map the saved index. A saved index that cannot be loaded is
+    built again, unless it is complete, e.g. just replaced by another process, and then loaded
+    again.
+
+    Parameters:
+    - path (str): The path of the corpus file.
+    - index_dir (str, optional): The directory of the saved indexes, or None to not save them.
+    - threshold (float, optional): The minimum cosine similarity of an answered question.
+
+    Returns:
+    - TfidfIndex: The index.
+
+    Raises:
+    - OSError: If the corpus cannot be read, or the index cannot be saved or loaded.
+    - ValueError: If the corpus is invalid.
+    - ImportError: If numpy is not installed.
+    """
+    digest, entries = read_corpus(path)
+    if not index_dir:
+        return TfidfIndex.build(entries, threshold)
+    directory = os.path.join(index_dir, f"faq-{digest}")
+    for attempt in range(LOAD_ATTEMPTS):
+        if not is_saved_index(directory):
+            TfidfIndex.build(entries).save(directory)
+            logger.info("Indexed %d FAQ entries from %s into %s", len(entries), path, directory)
+        try:
+            return TfidfIndex.load(directory, threshold)
+        except (OSError, ValueError):
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise
+            logger.warning("Loading the FAQ index %s again", directory, exc_info=True)
+
+
+def get_faq_index(strict=False):
+    """
+    Get the process-wide TfidfIndex of CHATBOT['FAQ_PATH'], or None if no corpus is configured.
+
+    If the index cannot be loaded, e.g. the corpus is missing or invalid, or numpy is not
+    installed, the error is logged once and the FAQ fallback is disabled in this process, so
+    unmatched messages get the default reply. Call it with strict=True at startup, as the
+    warm-up does, to fail instead.
+
+    Parameters:
+    - strict (bool, optional): Whether to raise the error of a failed load.
+
+    Returns:
+    - TfidfIndex: The shared TfidfIndex instance.
+    """
+    global _index, _index_error
+    if _index is None and _index_error is None and get_setting('FAQ_PATH'):
+        with _index_lock:
+            if _index is None and _index_error is None:
+                try:
+                    _index = load_faq_index(get_setting('FAQ_PATH'), get_setting('FAQ_INDEX_DIR'),
+                                            get_setting('FAQ_THRESHOLD'))
+                except (OSError, ValueError, ImportError) as exc:
+                    if strict:
+                        raise
+                    logger.exception("Disabled the FAQ fallback, %s cannot be loaded", get_setting('FAQ_PATH'))
+                    _index_error = exc
+    return _index
+
+
+class RetrievalChatBot(ChatBotInterface):
+    """
+    A chatbot that answers with the FAQ entry whose question is most similar to the input text.
+
+    Attributes:
+    - _text (str): The input text for which a response is generated.
+    - _index (TfidfIndex): The FAQ index to search.
+
+    Methods:
+    - get_response(): Get the answer of the most similar question, or None if no question is similar enough.
+    """
+
+    def __init__(self, text, index=None):
+        """
+        Initialize the RetrievalChatBot instance.
+
+        Parameters:
+        - text (str): The input text for which a response is generated.
+        - index (TfidfIndex, optional): The index to search. Defaults to the shared index.
+        """
+        self._text = text
+        self._index = index or get_faq_index()
+
+    def get_response(self):
+        """
+        Get the answer of the FAQ question most similar to the input text.
+
+        Returns:
+        - str: The answer, or None if no question is at least CHATBOT['FAQ_THRESHOLD'] similar.
+        """
+        if self._index is None:
+            return None
+        return self._index.respond(self._text)
+
+    def get_text(self):
+        return self._text
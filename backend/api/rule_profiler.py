@@ -0,0 +1,237 @@
+import itertools
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# the text generated for a repeated wildcard, besides the empty text
+FILLER = "some words"
+# a printable character for each character category
+CATEGORY_CHARS = {
+    sre_parse.CATEGORY_DIGIT: '0',
+    sre_parse.CATEGORY_NOT_DIGIT: 'x',
+    sre_parse.CATEGORY_SPACE: ' ',
+    sre_parse.CATEGORY_NOT_SPACE: 'x',
+    sre_parse.CATEGORY_WORD: 'x',
+    sre_parse.CATEGORY_NOT_WORD: ' ',
+}
+
+
+class RuleStats(object):
+    """
+    The matching cost of a rule over the replayed messages.
+
+    Attributes:
+    - index (int): The index of the rule in the rulebook.
+    - pattern (str): The pattern of the rule.
+    - hits (int): The number of messages the rule answered.
+    - attempts (int): The number of messages its regex ran on, hits included.
+    - total_seconds (float): The time spent in its regex.
+    - max_seconds (float): The longest time spent in its regex on one message.
+    - tried_before_hits (int): The number of other regexes run before its hits, summed over its hits.
+    """
+    __slots__ = ('index', 'pattern', 'hits', 'attempts', 'total_seconds', 'max_seconds', 'tried_before_hits')
+
+    def __init__(self, index, pattern):
+        self.index = index
+        self.pattern = pattern
+        self.hits = 0
+        self.attempts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.tried_before_hits = 0
+
+    def as_dict(self):
+        return {
+            'index': self.index,
+            'pattern': self.pattern,
+            'hits': self.hits,
+            'attempts': self.attempts,
+            'total_ms': self.total_seconds * 1e3,
+            'avg_us': self.total_seconds / self.attempts * 1e6 if self.attempts else 0.0,
+            'max_us': self.max_seconds * 1e6,
+            'avg_tried_before_hit': self.tried_before_hits / self.hits if self.hits else None,
+        }
+
+
+class RuleProfiler(object):
+    """
+    Replays messages through a ChatEngine and records the matching cost of each rule.
+
+    Only the statistics of each rule are kept, so the memory used does not grow with the
+    number of messages, and messages can be streamed from any iterable.
+
+    Attributes:
+    - engine (ChatEngine): The engine to replay messages through.
+    - rules (list): The RuleStats of each rule, by index.
+    - messages (int): The number of replayed messages.
+    - unmatched (int): The number of messages no rule matched.
+    - regexes (int): The number of regexes run.
+
+    Methods:
+    - replay(texts): Replay messages.
+    - report(): Get the statistics as a dict.
+    - shadowed(): Find the rules that earlier rules likely shadow.
+    """
+
+    def __init__(self, engine):
+        """
+        Initialize the RuleProfiler instance.
+
+        Parameters:
+        - engine (ChatEngine): The engine to replay messages through.
+        """
+        self.engine = engine
+        self.rules = [RuleStats(i, pattern) for i, (pattern, _) in enumerate(engine.pairs)]
+        self.messages = 0
+        self.unmatched = 0
+        self.regexes = 0
+
+    def replay(self, texts):
+        """
+        Replay messages through the engine.
+
+        Parameters:
+        - texts (iterable): The messages.
+        """
+        for text in texts:
+            tried = self.engine.trace(text)
+            self.messages += 1
+            self.regexes += len(tried)
+            for i, seconds, _ in tried:
+                stats = self.rules[i]
+                stats.attempts += 1
+                stats.total_seconds += seconds
+                if seconds > stats.max_seconds:
+                    stats.max_seconds = seconds
+            if tried and tried[-1][2]:
+                stats = self.rules[tried[-1][0]]
+                stats.hits += 1
+                stats.tried_before_hits += len(tried) - 1
+            else:
+                self.unmatched += 1
+
+    def report(self):
+        """
+        Get the statistics of the replay.
+
+        Returns:
+        - dict: The number of messages, unmatched messages and regexes run, and the
+                statistics of each rule, in rulebook order.
+        """
+        return {
+            'messages': self.messages,
+            'unmatched': self.unmatched,
+            'regexes': self.regexes,
+            'regexes_per_message': self.regexes / self.messages if self.messages else 0.0,
+            'rules': [stats.as_dict() for stats in self.rules],
+        }
+
+    def shadowed(self):
+        """
+        Find the rules that earlier rules likely shadow, i.e. that no input reaches.
+
+        Example inputs are generated from the pattern of each rule, with each alternative
+        and with repeated wildcards empty and filled. A rule is shadowed if every example
+        it matches is answered by an earlier rule. This is a heuristic: a rule it flags may
+        still be reached by an input unlike its examples.
+
+        Returns:
+        - list: A dict per shadowed rule with its 'index' and 'pattern', and the
+                'shadowed_by' indexes of the earlier rules that answer its examples.
+        """
+        shadowed = []
+        for i, (pattern, _) in enumerate(self.engine.pairs):
+            regex = re.compile(pattern, re.IGNORECASE)
+            texts = [text for text in examples(pattern) if regex.match(text)]
+            if not texts:
+                continue
+            earlier = set()
+            for text in texts:
+                found = self.engine.match(text)
+                if not found or found[0] >= i:
+                    break
+                earlier.add(found[0])
+            else:
+                shadowed.append({'index': i, 'pattern': pattern, 'shadowed_by': sorted(earlier)})
+        return shadowed
+
+
+def examples(pattern, limit=16):
+    """
+    Generate example inputs a pattern is meant to match.
+
+    Parameters:
+    - pattern (str): The regex pattern.
+    - limit (int, optional): The maximum number of examples.
+
+    Returns:
+    - list: The examples, or an empty list if the pattern uses a construct that is not supported,
+            e.g. a back reference.
+    """
+    try:
+        texts = _examples(sre_parse.parse(pattern), limit)
+    except (ValueError, KeyError):
+        return []
+    return list(dict.fromkeys(texts))[:limit]
+
+
+def _examples(items, limit):
+    """
+    Internal function to generate the examples of a parsed pattern, item by item.
+    """
+    texts = ['']
+    for op, av in items:
+        options = _item_examples(op, av, limit)
+        texts = [text + option for text, option in itertools.islice(itertools.product(texts, options), limit)]
+    return texts
+
+
+def _item_examples(op, av, limit):
+    """
+    Internal function to generate the texts a single parsed item can match.
+    """
+    if op is sre_parse.LITERAL:
+        return [chr(av)]
+    if op is sre_parse.NOT_LITERAL:
+        return ['x' if av != ord('x') else 'y']
+    if op is sre_parse.ANY:
+        return ['x']
+    if op is sre_parse.IN:
+        return [_in_example(av)]
+    if op is sre_parse.CATEGORY:
+        return [CATEGORY_CHARS[av]]
+    if op is sre_parse.SUBPATTERN:
+        return _examples(av[-1], limit)
+    if op is sre_parse.BRANCH:
+        return [text for branch in av[1] for text in _examples(branch, limit)][:limit]
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)):
+        low, high, item = av
+        texts = []
+        for option in _examples(item, limit):
+            texts.append(option * low)
+            if high > low:
+                # a wildcard like (.*) also gets a few words, as a message would have
+                texts.append(FILLER if option == 'x' and low == 0 else option * (low + 1))
+        return texts[:limit]
+    if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return ['']
+    raise ValueError(f"Unsupported regex construct {op}")
+
+
+def _in_example(items):
+    """
+    Internal function to get a character of a character class.
+    """
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            return 'x'
+        if op is sre_parse.LITERAL:
+            return chr(av)
+        if op is sre_parse.RANGE:
+            return chr(av[0])
+        if op is sre_parse.CATEGORY:
+            return CATEGORY_CHARS[av]
+    raise ValueError("Unsupported character class")
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from nltk.chat.util import reflections as default_reflections
+
+from .chat_engine import ChatEngine, analyze
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULEBOOK = os.path.join(os.path.dirname(__file__), 'rulebook.json')
+
+# bump when the layout of compiled rulebooks or the analysis of the patterns changes
+ARTIFACT_FORMAT = 1
+
+PLACEHOLDER = re.compile(r"%(.?)", re.DOTALL)
+
+
+class RulebookError(ValueError):
+    """
+    Raised when a rulebook file cannot be read or is not a valid rulebook.
+    """
+
+
+def read_source(path):
+    """
+    Read the raw content of a rulebook file.
+
+    Parameters:
+    - path (str): The path of the rulebook file.
+
+    Returns:
+    - bytes: The content of the file.
+    """
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except OSError as exc:
+        raise RulebookError(f"Cannot read the rulebook {path}: {exc}") from exc
+
+
+def content_hash(content):
+    """
+    Get the hash that identifies a rulebook and its compiled artifact.
+
+    Parameters:
+    - content (bytes): The content of the rulebook file.
+
+    Returns:
+    - str: The hex digest of the content and the artifact format.
+    """
+    return hashlib.sha256(b'%d:' % ARTIFACT_FORMAT + content).hexdigest()
+
+
+def parse_rulebook(content, path):
+    """
+    Parse the content of a rulebook file, as YAML if its path ends with .yaml or .yml
+    and as JSON otherwise.
+
+    Parameters:
+    - content (bytes): The content of the rulebook file.
+    - path (str): The path of the rulebook file, used to pick the format and in errors.
+
+    Returns:
+    - The parsed document.
+    """
+    if path.endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise RulebookError(f"Reading the YAML rulebook {path} requires the PyYAML package.")
+        try:
+            return yaml.safe_load(content)
+        except yaml.YAMLError as exc:
+            raise RulebookError(f"Invalid YAML in the rulebook {path}: {exc}") from exc
+    try:
+        return json.loads(content)
+    except ValueError as exc:
+        raise RulebookError(f"Invalid JSON in the rulebook {path}: {exc}") from exc
+
+
+def validate_rulebook(document, path):
+    """
+    Validate a parsed rulebook and get its rules and reflections.
+
+    A rulebook is a mapping with a list of "pairs", each a {"pattern": ..., "responses": [...]}
+    mapping or a [pattern, responses] list as accepted by nltk's Chat, and optional
+    "reflections" that replace nltk's default reflections. Every pattern must compile,
+    and every %1-style placeholder must refer to a group of its pattern.
+
+    Parameters:
+    - document: The parsed rulebook.
+    - path (str): The path of the rulebook file, used in errors.
+
+    Returns:
+    - tuple: The rules as a list of [pattern, responses] lists, and the reflections dict.
+    """
+    if not isinstance(document, dict) or not isinstance(document.get('pairs'), list):
+        raise RulebookError(f"The rulebook {path} must be a mapping with a list of 'pairs'.")
+
+    pairs = []
+    for i, rule in enumerate(document['pairs']):
+        if isinstance(rule, dict):
+            pattern, responses = rule.get('pattern'), rule.get('responses')
+        elif isinstance(rule, list) and len(rule) == 2:
+            pattern, responses = rule
+        else:
+            raise RulebookError(f"Rule {i} of {path} must have a pattern and responses.")
+        if not isinstance(pattern, str):
+            raise RulebookError(f"Rule {i} of {path} must have a string pattern.")
+        if (not isinstance(responses, list) or not responses
+                or not all(isinstance(response, str) for response in responses)):
+            raise RulebookError(f"Rule {i} of {path} must have a non-empty list of string responses.")
+        try:
+            groups = re.compile(pattern, re.IGNORECASE).groups
+        except re.error as exc:
+            raise RulebookError(f"Rule {i} of {path} has an invalid pattern {pattern!r}: {exc}") from exc
+        for response in responses:
+            for placeholder in PLACEHOLDER.finditer(response):
+                num = placeholder.group(1)
+                if not num.isdigit() or int(num) > groups:
+                    raise RulebookError(f"Rule {i} of {path} has a response {response!r} with a "
+                                        f"placeholder %{num} that is not a group of its pattern.")
+        pairs.append([pattern, responses])
+
+    reflections = document.get('reflections', default_reflections)
+    if not isinstance(reflections, dict) or not all(
+            isinstance(key, str) and isinstance(value, str) for key, value in reflections.items()):
+        raise RulebookError(f"The 'reflections' of {path} must map strings to strings.")
+    return pairs, dict(reflections)
+
+
+def artifact_path(cache_dir, digest):
+    """
+    Get the path of the compiled artifact of a rulebook.
+    """
+    return os.path.join(cache_dir, f"rulebook-{digest}.json")
+
+
+def read_artifact(path, digest):
+    """
+    Read a compiled artifact from the rulebook cache.
+
+    Parameters:
+    - path (str): The path of the artifact.
+    - digest (str): The hash of the rulebook it was compiled from.
+
+    Returns:
+    - dict: The artifact, or None if it is missing, unreadable or compiled from another rulebook.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            artifact = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("Ignoring the unreadable compiled rulebook %s", path, exc_info=True)
+        return None
+    if not isinstance(artifact, dict) or artifact.get('hash') != digest or artifact.get('format') != ARTIFACT_FORMAT:
+        logger.warning("Ignoring the compiled rulebook %s, which does not match its source", path)
+        return None
+    return artifact
+
+
+def _write_artifact(path, artifact):
+    """
+    Internal method to write a compiled artifact atomically, so readers never see a partial file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.rulebook-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(artifact, file, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def compile_rulebook(path=None, cache_dir=None, force=False):
+    """
+    Get the compiled artifact of a rulebook: its validated rules and reflections, and the
+    analysis of its patterns used to build the keyword index of a ChatEngine.
+
+    Artifacts are cached in cache_dir under the hash of the rulebook content, so a rulebook
+    is validated and analyzed once, and later processes only read the artifact. Compiled
+    regexes cannot be stored, so the patterns are still compiled by the ChatEngine.
+
+    Parameters:
+    - path (str, optional): The path of the rulebook file. Defaults to the bundled rulebook.
+    - cache_dir (str, optional): The directory of the compiled artifacts, or None to not cache them.
+    - force (bool, optional): Whether to compile the rulebook even if its artifact is cached.
+
+    Returns:
+    - dict: The artifact, with the 'hash', 'format', 'source', 'pairs', 'reflections'
+            and 'analysis' of the rulebook.
+    """
+    path = str(path or DEFAULT_RULEBOOK)
+    content = read_source(path)
+    digest = content_hash(content)
+    cached = artifact_path(cache_dir, digest) if cache_dir else None
+    if cached and not force:
+        artifact = read_artifact(cached, digest)
+        if artifact is not None:
+            return artifact
+
+    pairs, reflections = validate_rulebook(parse_rulebook(content, path), path)
+    artifact = {
+        'hash': digest,
+        'format': ARTIFACT_FORMAT,
+        'source': path,
+        'pairs': pairs,
+        'reflections': reflections,
+        'analysis': analyze(pairs),
+    }
+    if cached:
+        try:
+            _write_artifact(cached, artifact)
+        except OSError:
+            logger.warning("Cannot write the compiled rulebook %s", cached, exc_info=True)
+    return artifact
+
+
+def load_engine(path=None, cache_dir=None, **kwargs):
+    """
+    Build a ChatEngine from a rulebook file, using its compiled artifact when cached.
+
+    Parameters:
+    - path (str, optional): The path of the rulebook file. Defaults to the bundled rulebook.
+    - cache_dir (str, optional): The directory of the compiled artifacts, or None to not cache them.
+    - **kwargs: The other arguments of ChatEngine, e.g. regex_engine.
+
+    Returns:
+    - ChatEngine: The engine.
+    """
+    artifact = compile_rulebook(path, cache_dir)
+    return ChatEngine(artifact['pairs'], artifact['reflections'], analysis=artifact['analysis'], **kwargs)
+
+
+def load_pairs(path=None):
+    """
+    Get the validated rules of a rulebook file.
+
+    Parameters:
+    - path (str, optional): The path of the rulebook file. Defaults to the bundled rulebook.
+
+    Returns:
+    - list: The rules as a list of [pattern, responses] lists.
+    """
+    path = str(path or DEFAULT_RULEBOOK)
+    return validate_rulebook(parse_rulebook(read_source(path), path), path)[0]
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.http import HttpResponse
+from django.urls import get_resolver, get_urlconf
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from drf_yasg.renderers import _SpecRenderer
+
+# the most rendered schemas kept, one per renderer, API version and host
+MAX_ENTRIES = 16
+
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+
+
+class RenderedSchema(object):
+    """
+    A rendered OpenAPI schema.
+
+    Attributes:
+    - resolver (URLResolver): The resolver of the URL conf the schema was generated from.
+    - content (bytes): The rendered schema.
+    - content_type (str): Its content type.
+    - etag (str): Its quoted ETag, a hash of the content.
+    """
+    __slots__ = ('resolver', 'content', 'content_type', 'etag')
+
+    def __init__(self, resolver, content, content_type):
+        self.resolver = resolver
+        self.content = content
+        self.content_type = content_type
+        self.etag = quote_etag(hashlib.sha256(content).hexdigest()[:32])
+
+
+class CachedSchemaMixin(object):
+    """
+    A mixin for a drf_yasg SchemaView that generates and renders the schema once, and then serves it
+    from memory, with an ETag, answering conditional requests with 304 Not Modified.
+
+    Generating the schema introspects every view and serializer, which takes tens of milliseconds.
+    A schema is kept per renderer (JSON, YAML), API version and host, which the schema names, and
+    generated again when the URL conf changes, i.e. when a new URL resolver is built for it.
+
+    Only the schema renderers are cached: the Swagger UI and ReDoc pages show who is logged in, and
+    load the cached schema from the ?format=openapi URL anyway.
+    """
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            return super().get(request, version, format)
+
+        key = (type(renderer), request.version or version or '', request.build_absolute_uri('/'))
+        resolver = get_resolver(get_urlconf())
+        schema = _schemas.get(key)
+        if schema is None or schema.resolver is not resolver:
+            with _schemas_lock:
+                schema = _schemas.get(key)
+                if schema is None or schema.resolver is not resolver:
+                    schema = self._render(request, version, format, resolver)
+                    _schemas[key] = schema
+                    while len(_schemas) > MAX_ENTRIES:
+                        _schemas.popitem(last=False)
+
+        response = HttpResponse(schema.content, content_type=schema.content_type)
+        response['ETag'] = schema.etag
+        # clients may keep the schema, but must check it is current with If-None-Match
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(request, etag=schema.etag, response=response)
+
+    def _render(self, request, version, format, resolver):
+        """
+        Internal method to generate and render the schema for a request.
+        """
+        renderer = request.accepted_renderer
+        data = super().get(request, version, format).data
+        content = renderer.render(data, request.accepted_media_type, self.get_renderer_context())
+        if isinstance(content, str):
+            content = content.encode(renderer.charset or 'utf-8')
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        return RenderedSchema(resolver, content, content_type)
+
+
+def cache_schema_view(schema_view):
+    """
+    Get a SchemaView class, as returned by drf_yasg's get_schema_view(), serving its schema from memory.
+
+    Parameters:
+    - schema_view (type): The SchemaView class.
+
+    Returns:
+    - type: A subclass of it with CachedSchemaMixin.
+    """
+    return type(f"Cached{schema_view.__name__}", (CachedSchemaMixin, schema_view), {})
+
+
+def clear_schema_cache():
+    """
+    Forget the rendered schemas, so they are generated again.
+    """
+    with _schemas_lock:
+        _schemas.clear()
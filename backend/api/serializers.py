@@ -3,6 +3,10 @@ from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from .conf import get_setting
+from .export import FIELDS, FORMATS
+from .models import Log, Step
+
 
 class LogoutSerializer(serializers.Serializer):
     """
@@ -19,9 +23,75 @@ class ChatSerializer(serializers.Serializer):
     Serializer for handling chat-related data.
 
     Attributes:
-    - text (str): The text content of the chat message.
+    - text (str): The text content of the chat message, at most CHATBOT['MAX_INPUT_LENGTH'] characters.
+    """
+    text = serializers.CharField(max_length=get_setting('MAX_INPUT_LENGTH'))
+
+
+class ChatBatchSerializer(serializers.Serializer):
+    """
+    Serializer for handling a batch of chat messages.
+
+    Attributes:
+    - texts (list): The text contents of the chat messages, in the order they were sent.
+    """
+    texts = serializers.ListField(
+        child=serializers.CharField(max_length=get_setting('MAX_INPUT_LENGTH')),
+        allow_empty=False,
+        max_length=get_setting('BATCH_MAX_SIZE'),
+    )
+
+
+class LogSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a log entry of the chat history.
+
+    Fields:
+    - id (int): The id of the log entry.
+    - text (str): The text of the message.
+    - sender (str): 'U' for the user, 'C' for the chatbot.
+    - created_at (datetime): When the message was sent.
+    """
+
+    class Meta:
+        model = Log
+        fields = ('id', 'text', 'sender', 'created_at')
+
+
+class HistoryStepSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a step of the chat history with its log entries of the page.
+
+    Fields:
+    - id (int): The id of the step.
+    - name (str): 'G' for greeting, 'Q' for question, 'E' for end.
+    - created_at (datetime): When the step started.
+    - logs (list): The log entries of the step on the page, newest first.
+    """
+    logs = LogSerializer(many=True, source='page_logs')
+
+    class Meta:
+        model = Step
+        fields = ('id', 'name', 'created_at', 'logs')
+
+
+class ExportSerializer(serializers.Serializer):
+    """
+    Serializer for the query parameters of an export.
+
+    Attributes:
+    - kind (str): 'logs' (default) or 'steps'.
+    - output (str): The file format, 'ndjson' (default) or 'csv'. It is not named 'format', which
+                    DRF reserves to choose the renderer.
+    - start (datetime): Only export rows created at or after this time, optional.
+    - end (datetime): Only export rows created before this time, optional.
+    - user (int): Only export the rows of the user with this id, optional.
     """
-    text = serializers.CharField()
+    kind = serializers.ChoiceField(choices=list(FIELDS), default='logs')
+    output = serializers.ChoiceField(choices=FORMATS, default='ndjson')
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    user = serializers.IntegerField(required=False)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
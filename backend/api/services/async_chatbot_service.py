@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+
+from .. import timing
+from .chatbot_service import ChatBotService
+
+
+class AsyncChatBotService(ChatBotService):
+    """
+    A ChatBotService for async views, which loads the session with Django's async ORM
+    instead of blocking the event loop.
+    """
+
+    async def get_response(self):
+        with timing.measure('step'):
+            self._step = await self._step_repository.aget()  # get session for a user
+
+            if not self._step or self._step.name == 'E':
+                self._step = await self._step_repository.acreate()  # create new session if the previous one has ended
+
+        with timing.measure('match'):
+            self._respond()
+        with timing.measure('save'):
+            await self._save_step_async()
+        return self._response
+
+    async def _save_step_async(self):
+        """
+        Persist the chat turn in a worker thread, since Django's async ORM cannot run
+        queries inside a transaction yet.
+        """
+        await sync_to_async(self._save_step)()
@@ -0,0 +1,53 @@
+from ..interfaces.log_interface import LogInterface
+from ..interfaces.step_interface import StepInterface
+from .chatbot_service import ChatBotService
+
+
+class BatchChatBotService(ChatBotService):
+    """
+    A ChatBotService that answers an ordered list of messages of one user.
+
+    Messages go through the same greeting, question and end transitions as if they were
+    sent one at a time. All replies are computed first, with the sessions the batch starts
+    built in memory, and the batch is then persisted in one short transaction: one INSERT
+    for the new sessions, one INSERT for all log entries, and one UPDATE of the session the
+    batch continued.
+    """
+
+    def __init__(self, chatbots: list, log_repository: LogInterface, step_repository: StepInterface):
+        super().__init__(None, log_repository, step_repository)
+        self._chatbots = chatbots
+
+    def get_responses(self):
+        """
+        Get the responses to all messages, in order.
+
+        Returns:
+        - list: The responses.
+        """
+        responses = []
+        entries = []
+        created = []
+        updated = []
+
+        self._step = self._step_repository.get()  # get session for a user
+        for chatbot in self._chatbots:
+            if not self._step or self._step.name == 'E':
+                self._step = self._step_repository.build()  # start a new session if the previous one has ended
+                created.append(self._step)
+            elif not created and not updated:
+                updated.append(self._step)  # the session the batch continues
+
+            self._chatbot = chatbot
+            self._respond()
+            self._step.name = self._state
+            entries += [(self._text, 'U', self._step), (self._response, 'C', self._step)]
+            responses.append(self._response)
+
+        with self._step_repository.atomic():
+            if created:
+                self._step_repository.bulk_create(created)
+            self._log_repository.bulk_create(entries)
+            if updated:
+                self._step_repository.bulk_update(updated)
+        return responses
@@ -0,0 +1,165 @@
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .conf import get_setting
+from .models import Step
+
+logger = logging.getLogger(__name__)
+
+# the names of the steps of a session that has not ended
+OPEN_STEPS = ('G', 'Q')
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def close_idle_steps(ttl, batch_size=1000, now=None):
+    """
+    End the sessions idle for longer than a TTL, by setting their step to 'E'.
+
+    Idle steps are found on the (name, updated_at) index and ended in batches of at most
+    batch_size rows, each its own UPDATE, so the sweep never scans the whole table nor holds
+    locks on many rows at once. A step is only ended if it is still idle when its batch is
+    updated, so a session that is used during the sweep stays open.
+
+    Parameters:
+    - ttl (float): The seconds since its last update after which a session is idle.
+    - batch_size (int, optional): The most steps ended by one UPDATE.
+    - now (datetime, optional): The time of the sweep, defaults to the current time.
+
+    Returns:
+    - int: The number of steps ended.
+    """
+    now = now or timezone.now()
+    idle = Step.objects.filter(name__in=OPEN_STEPS, updated_at__lt=now - timedelta(seconds=ttl)).order_by()
+    closed = 0
+    while True:
+        ids = list(idle.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return closed
+        closed += idle.filter(id__in=ids).update(name='E', updated_at=now)
+        if len(ids) < batch_size:
+            return closed
+
+
+class SessionSweeper(object):
+    """
+    A daemon thread that ends idle sessions at a regular interval.
+
+    The thread is started on first use in each process, like the LogBuffer, so the sweeper
+    can be created before the server forks its workers, see start_session_sweeper(). Sweeps
+    in several processes are safe, as each UPDATE checks that its steps are still idle.
+
+    Attributes:
+    - interval (float): The seconds between sweeps.
+    - ttl (float): The seconds since its last update after which a session is idle.
+    - batch_size (int): The most steps ended by one UPDATE.
+
+    Methods:
+    - start(): Start the background thread, if it is not running in this process.
+    - stop(): Stop the background thread.
+    - sweep(): End the idle sessions now.
+    """
+
+    def __init__(self, interval, ttl, batch_size=1000):
+        """
+        Initialize the SessionSweeper instance.
+
+        Parameters:
+        - interval (float): The seconds between sweeps.
+        - ttl (float): The seconds since its last update after which a session is idle.
+        - batch_size (int, optional): The most steps ended by one UPDATE.
+        """
+        self.interval = interval
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """
+        Start the background thread, if it is not running in this process.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='session-sweeper', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """
+        Stop the background thread, waiting for a sweep in progress to finish.
+        """
+        with self._lock:
+            thread, self._thread, self._pid = self._thread, None, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    def sweep(self):
+        """
+        End the idle sessions now.
+
+        Returns:
+        - int: The number of steps ended.
+        """
+        closed = close_idle_steps(self.ttl, self.batch_size)
+        if closed:
+            logger.info("Ended %d sessions idle for over %ss", closed, self.ttl)
+        return closed
+
+    def _run(self):
+        """
+        Internal method run by the background thread.
+        """
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    # drop a connection broken by a database restart, or older than CONN_MAX_AGE
+                    close_old_connections()
+                    self.sweep()
+                except Exception:
+                    logger.exception("Failed to end the idle sessions")
+        finally:
+            connection.close()
+
+
+def get_session_sweeper():
+    """
+    Get the process-wide SessionSweeper, configured by CHATBOT['SESSION_TTL'],
+    CHATBOT['SESSION_SWEEP_INTERVAL'] and CHATBOT['SESSION_SWEEP_BATCH_SIZE'].
+
+    Returns:
+    - SessionSweeper: The shared SessionSweeper instance.
+    """
+    global _sweeper
+    if _sweeper is None:
+        with _sweeper_lock:
+            if _sweeper is None:
+                _sweeper = SessionSweeper(get_setting('SESSION_SWEEP_INTERVAL'), get_setting('SESSION_TTL'),
+                                          get_setting('SESSION_SWEEP_BATCH_SIZE'))
+    return _sweeper
+
+
+def start_session_sweeper(**kwargs):
+    """
+    Start the process-wide SessionSweeper, if CHATBOT['SESSION_SWEEP_INTERVAL'] is set.
+
+    Connected to the request_started signal, so the sweeper runs in each server process from
+    its first request, whether the app is served through WSGI or ASGI, by gunicorn, uvicorn
+    or daphne.
+    """
+    sweeper = get_session_sweeper()
+    if sweeper.interval > 0:
+        sweeper.start()
@@ -1,11 +1,62 @@
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipIf, skipUnless
+
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.urls import reverse
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+from drf_yasg.generators import OpenAPISchemaGenerator
+from nltk.chat.util import Chat, reflections
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend.asgi import application
+
+from . import nltk_chatbot, retrieval_chatbot, timing
+from .archive import archive_logs, delete_logs, read_archive, restore_logs
+from .authentication import user_cache
+from .chat_engine import ChatEngine, compile_template, re2
+from .conf import get_setting
+from .export import FIELDS, export
+from .faq_index import TfidfIndex, np
+from .intents import DEFAULT_INTENTS, IntentClassifier
+from .metrics import MULTIPROCESS_DIR, REGISTRY, get_registry
+from .models import Log, Step
+from .nltk_chatbot import NltkChatBot, RulebookWatcher, get_engine, pairs, reload_engine
+from .repositories.buffered_log_repository import MAX_RETRIES, BufferedLogRepository, LogBuffer
+from .repositories.step_repository import StepRepository
+from .response_cache import ResponseCache
+from .retrieval_chatbot import RetrievalChatBot, get_faq_index, load_faq_index
+from .rule_profiler import RuleProfiler, examples
+from .rulebook import RulebookError, artifact_path, compile_rulebook, load_engine
+from .schema import clear_schema_cache
+from .session_sweeper import SessionSweeper, close_idle_steps
+from .warmup import warm_up
 
 
 class TestSetUp(APITestCase):
     def setUp(self):
+        user_cache.clear()
         user = User.objects.create_user(username='user', email='user@foo.com', password='password')
         user.save()
         self.access_token_url = reverse('token_obtain_pair')
@@ -55,3 +106,1293 @@ class TestChat(TestSetUp):
         resp = self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
         self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
         self.assertEqual(resp.json(), {'text': 'Hello, I am Chatty. Ask me some questions.'})
+
+    def test_chat_post_query_count(self):
+        user = User.objects.get(username='user')
+        Step.objects.create(user=user, name='Q')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        # user, step, savepoint, log insert, step update, release savepoint
+        with self.assertNumQueries(6):
+            resp = self.client.post(reverse('chat'), {'text': 'tell me a joke'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        logs = Log.objects.order_by('id')
+        self.assertEqual([(log.sender, log.text) for log in logs],
+                         [('U', 'tell me a joke'), ('C', resp.json()['text'])])
+
+    def test_chat_post_with_goodbye_phrase(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
+        resp = self.client.post(reverse('chat'), {'text': 'see you later'}, format='json')
+        self.assertEqual(resp.json(), {'text': 'Bye. Have a nice day!'})
+        self.assertEqual(Step.objects.get().name, 'E')
+
+    def test_chat_post_with_too_long_text(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        text = 'a' * (get_setting('MAX_INPUT_LENGTH') + 1)
+        resp = self.client.post(reverse('chat'), {'text': text}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestChatBatch(TestSetUp):
+    def setUp(self):
+        super().setUp()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+
+    def test_chat_batch(self):
+        texts = ['hello', 'tell me a joke', 'bye', 'what is your name?', 'what is your name?']
+        # user, step, savepoint, step insert, log insert, release savepoint
+        with self.assertNumQueries(6):
+            resp = self.client.post(reverse('chat_batch'), {'texts': texts}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.json(), {'texts': [
+            'Hello, I am Chatty. Ask me some questions.',
+            "Why don't scientists trust atoms? Because they make up everything!",
+            'Bye. Have a nice day!',
+            'Hello, I am Chatty. Ask me some questions.',
+            'My name is Chatty.',
+        ]})
+        self.assertEqual(list(Step.objects.order_by('id').values_list('name', flat=True)), ['E', 'Q'])
+        logs = Log.objects.order_by('id')
+        self.assertEqual([log.text for log in logs if log.sender == 'U'], texts)
+        self.assertEqual([log.step.name for log in logs], ['E'] * 6 + ['Q'] * 4)
+
+    def test_chat_batch_continues_the_session(self):
+        self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
+        step = Step.objects.get()
+        texts = ['what is your name?', 'bye', 'hi', 'bye', 'hello']
+        # step, savepoint, step insert, log insert, step update, release savepoint; the user is cached
+        with self.assertNumQueries(6):
+            resp = self.client.post(reverse('chat_batch'), {'texts': texts}, format='json')
+        self.assertEqual(resp.json()['texts'][:2], ['My name is Chatty.', 'Bye. Have a nice day!'])
+        self.assertEqual(list(Step.objects.order_by('id').values_list('id', 'name')),
+                         [(step.id, 'E'), (step.id + 1, 'E'), (step.id + 2, 'Q')])
+        self.assertEqual(list(Log.objects.order_by('id').values_list('step_id', flat=True)[2:]),
+                         [step.id] * 4 + [step.id + 1] * 4 + [step.id + 2] * 2)
+
+    def test_chat_batch_matches_single_messages(self):
+        texts = ['hi', 'my name is Thabo', 'see ya', 'yo', 'how are you ?']
+        batch = self.client.post(reverse('chat_batch'), {'texts': texts}, format='json').json()['texts']
+        Log.objects.all().delete()
+        Step.objects.all().delete()
+        single = [self.client.post(reverse('chat'), {'text': text}, format='json').json()['text'] for text in texts]
+        self.assertEqual(batch, single)
+
+    def test_chat_batch_with_invalid_data(self):
+        for data in ({'texts': []}, {'texts': 'hello'}, {'text': 'hello'}):
+            resp = self.client.post(reverse('chat_batch'), data, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestHistory(TestSetUp):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.get(username='user')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+
+    def seed(self, user, steps, logs_per_step):
+        """
+        Seed a history in bulk; the logs of each bulk insert share their created_at.
+        """
+        created = Step.objects.bulk_create([Step(user=user, name='Q') for _ in range(steps)])
+        for step in created:
+            Log.objects.bulk_create([Log(text=f"message {i}", sender='UC'[i % 2], step=step, user=user)
+                                     for i in range(logs_per_step)])
+        return created
+
+    def walk(self, limit):
+        """
+        Read every page of the history, returning the log ids and the queries of each page.
+        """
+        ids, queries = [], []
+        url = f"{reverse('history')}?limit={limit}"
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            queries.append(len(captured))
+            ids.extend(log['id'] for step in resp.json()['results'] for log in step['logs'])
+            url = resp.json()['next']
+        return ids, queries
+
+    def test_history_requires_authentication(self):
+        self.client.credentials()
+        resp = self.client.get(reverse('history'))
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_history_groups_logs_by_step(self):
+        self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
+        self.client.post(reverse('chat'), {'text': 'tell me a joke'}, format='json')
+        self.client.post(reverse('chat'), {'text': 'bye'}, format='json')
+        self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
+        resp = self.client.get(reverse('history'))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        steps = resp.json()['results']
+        self.assertEqual([step['name'] for step in steps], ['Q', 'E'])
+        self.assertEqual([log['text'] for log in steps[0]['logs']],
+                         ['Hello, I am Chatty. Ask me some questions.', 'hello'])
+        self.assertEqual([log['sender'] for log in steps[1]['logs']], ['C', 'U'] * 3)
+        self.assertIsNone(resp.json()['next'])
+
+    def test_history_is_scoped_to_user(self):
+        other = User.objects.create_user(username='other', password='password')
+        self.seed(other, 2, 5)
+        self.seed(self.user, 1, 3)
+        ids, _ = self.walk(2)
+        self.assertEqual(sorted(ids), sorted(Log.objects.filter(user=self.user).values_list('id', flat=True)))
+
+    def test_history_pages_through_large_history(self):
+        self.seed(self.user, 40, 100)
+        expected = list(Log.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.client.get(reverse('history'))  # caches the user
+        ids, queries = self.walk(150)
+        # every log once, in order, although the logs of each step share their created_at
+        self.assertEqual(ids, expected)
+        # a single query per page, at any depth
+        self.assertEqual(len(queries), 27)
+        self.assertEqual(set(queries), {1})
+
+    def test_history_limit_is_bounded(self):
+        self.seed(self.user, 1, get_setting('HISTORY_MAX_PAGE_SIZE') + 1)
+        resp = self.client.get(reverse('history'), {'limit': 10 ** 6})
+        self.assertEqual(len(resp.json()['results'][0]['logs']), get_setting('HISTORY_MAX_PAGE_SIZE'))
+        resp = self.client.get(reverse('history'), {'limit': 'all'})
+        self.assertEqual(len(resp.json()['results'][0]['logs']), get_setting('HISTORY_PAGE_SIZE'))
+
+    def test_history_with_invalid_cursor(self):
+        cursors = ['not-a-cursor', 'W10=', 'WyJub3QgYSBkYXRlIiwxXQ==']
+        for pk in ('1e400', '1.9', 'true', '"1"', 'null'):
+            position = f'["2024-01-01T00:00:00+00:00",{pk}]'
+            cursors.append(base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii'))
+        for cursor in cursors:
+            resp = self.client.get(reverse('history'), {'cursor': cursor})
+            self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    @skipUnless(connection.vendor == 'sqlite', "query plans of small tables differ between databases")
+    def test_history_uses_user_created_index(self):
+        self.seed(self.user, 1, 1)
+        log = Log.objects.get()
+        queryset = Log.objects.filter(user=self.user).order_by('-created_at', '-id').filter(
+            created_at__lte=log.created_at)[:51]
+        self.assertIn('api_log_user_created_idx', queryset.explain())
+
+
+class TestSchema(APITestCase):
+    def setUp(self):
+        clear_schema_cache()
+        self.addCleanup(clear_schema_cache)
+        get_schema = OpenAPISchemaGenerator.get_schema
+        patcher = mock.patch.object(OpenAPISchemaGenerator, 'get_schema', autospec=True, side_effect=get_schema)
+        self.get_schema = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_schema_is_generated_once(self):
+        url = reverse('schema-json', kwargs={'format': '.json'})
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first['Content-Type'], 'application/json; charset=utf-8')
+        self.assertIn('/chat/', json.loads(first.content)['paths'])
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.get_schema.call_count, 1)
+
+        # each format is rendered once
+        yaml_url = reverse('schema-json', kwargs={'format': '.yaml'})
+        self.assertEqual(self.client.get(yaml_url)['Content-Type'], 'application/yaml; charset=utf-8')
+        self.assertNotEqual(self.client.get(yaml_url)['ETag'], first['ETag'])
+        self.assertEqual(self.get_schema.call_count, 2)
+
+    def test_schema_conditional_get(self):
+        url = reverse('schema-json', kwargs={'format': '.json'})
+        etag = self.client.get(url)['ETag']
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(resp.content, b'')
+        self.assertEqual(resp['ETag'], etag)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_schema_is_generated_again_when_urls_change(self):
+        url = reverse('schema-json', kwargs={'format': '.json'})
+        self.client.get(url)
+        clear_url_caches()
+        self.client.get(url)
+        self.assertEqual(self.get_schema.call_count, 2)
+
+    def test_ui_pages_are_not_cached(self):
+        for name in ('schema-swagger-ui', 'schema-redoc'):
+            resp = self.client.get(reverse(name))
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertNotIn('ETag', resp)
+        resp = self.client.get(reverse('schema-swagger-ui'), {'format': 'openapi'})
+        self.assertIn('ETag', resp)
+
+
+class TestCachedJWTAuthentication(TestSetUp):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.get(username='user')
+        Step.objects.create(user=self.user, name='Q')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+
+    def chat(self):
+        return self.client.post(reverse('chat'), {'text': 'tell me a joke'}, format='json')
+
+    def test_cached_user_skips_user_query(self):
+        with self.assertNumQueries(6):
+            self.chat()
+        # step, savepoint, log insert, step update, release savepoint
+        with self.assertNumQueries(5):
+            self.assertEqual(self.chat().status_code, status.HTTP_201_CREATED)
+
+    def test_saved_user_is_invalidated(self):
+        self.chat()
+        self.user.email = 'new@foo.com'
+        self.user.save()
+        with self.assertNumQueries(6):
+            self.chat()
+
+    def test_deactivated_user_is_rejected(self):
+        self.chat()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.chat().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stateless_mode_skips_user_query(self):
+        with override_settings(CHATBOT={**settings.CHATBOT, 'AUTH_STATELESS': True}):
+            with self.assertNumQueries(5):
+                resp = self.chat()
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Log.objects.filter(step__user=self.user).count(), 2)
+
+
+class TestAsyncChat(TestSetUp):
+    async def test_async_chat_post_with_valid_data(self):
+        headers = {'Authorization': 'Bearer ' + self.token}
+        resp = await self.async_client.post(reverse('chat_async'), {'text': 'hello'},
+                                            content_type='application/json', headers=headers)
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.json(), {'text': 'Hello, I am Chatty. Ask me some questions.'})
+
+        resp = await self.async_client.post(reverse('chat_async'), {'text': 'tell me a joke'},
+                                            content_type='application/json', headers=headers)
+        self.assertEqual(resp.json(), {'text': "Why don't scientists trust atoms? Because they make up everything!"})
+        self.assertEqual(await Log.objects.acount(), 4)
+        self.assertEqual((await Step.objects.afirst()).name, 'Q')
+
+    async def test_async_chat_post_with_invalid_data(self):
+        resp = await self.async_client.post(reverse('chat_async'), {'data': 'hello'}, content_type='application/json',
+                                            headers={'Authorization': 'Bearer ' + self.token})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_chat_post_without_credentials(self):
+        resp = await self.async_client.post(reverse('chat_async'), {'text': 'hello'}, content_type='application/json')
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_async_chat_post_with_invalid_token(self):
+        resp = await self.async_client.post(reverse('chat_async'), {'text': 'hello'}, content_type='application/json',
+                                            headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TestServerTiming(TestSetUp):
+    timing_header = re.compile(r'auth;dur=[\d.]+, step;dur=[\d.]+, match;dur=[\d.]+, save;dur=[\d.]+, '
+                               r'db;dur=[\d.]+;desc="(\d+) queries", total;dur=[\d.]+')
+
+    def setUp(self):
+        super().setUp()
+        # the sample rate is read when the middleware is loaded
+        with override_settings(CHATBOT={**settings.CHATBOT, 'TIMING_SAMPLE_RATE': 1.0}):
+            self.client = APIClient()
+            self.client.handler.load_middleware()
+            self.async_client = AsyncClient()
+            self.async_client.handler.load_middleware(is_async=True)
+
+    def test_chat_timing_header(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertLogs('api.timing', 'INFO') as logs:
+                resp = self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        timing = self.timing_header.fullmatch(resp['Server-Timing'])
+        self.assertIsNotNone(timing, resp['Server-Timing'])
+        self.assertEqual(int(timing.group(1)), len(queries))
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['method'], line['path'], line['status']), ('POST', '/chat/', 201))
+        self.assertEqual(line['db_queries'], len(queries))
+        self.assertEqual(set(line), {'method', 'path', 'status', 'total_ms', 'db_queries', 'db_ms',
+                                     'auth_ms', 'step_ms', 'match_ms', 'save_ms'})
+
+    async def test_async_chat_timing_header(self):
+        resp = await self.async_client.post(reverse('chat_async'), {'text': 'hello'}, content_type='application/json',
+                                            headers={'Authorization': 'Bearer ' + self.token})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertRegex(resp['Server-Timing'], r'^auth;dur=[\d.]+, step;dur=[\d.]+, match;dur=[\d.]+, '
+                                                r'save;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_header_without_chat(self):
+        resp = self.client.post(self.access_token_url, {'username': 'user', 'password': 'password'}, format='json')
+        self.assertRegex(resp['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", total;dur=[\d.]+$')
+
+    def test_no_header_when_sampling_is_off(self):
+        resp = APIClient().post(self.access_token_url, {'username': 'user', 'password': 'password'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', resp)
+
+
+class TestMetrics(TestSetUp):
+    def setUp(self):
+        super().setUp()
+        # the index of the 'tell me a joke' rule in the rulebook
+        self.joke_rule = str(next(i for i, (pattern, _) in enumerate(get_engine().pairs) if pattern == 'tell me a joke'))
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_exposition_format(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        joke = self.sample('chatbot_rule_matches_total', rule=self.joke_rule)
+        default = self.sample('chatbot_fallback_replies_total', reply='default')
+        greetings = self.sample('chatbot_intents_total', intent='greeting')
+        chats = self.sample('chatbot_request_duration_seconds_count', view='chat', method='POST')
+        for text in ('hello', 'tell me a joke', 'something unknown'):
+            self.client.post(reverse('chat'), {'text': text}, format='json')
+
+        self.assertEqual(self.sample('chatbot_rule_matches_total', rule=self.joke_rule), joke + 1)
+        self.assertEqual(self.sample('chatbot_fallback_replies_total', reply='default'), default + 1)
+        self.assertEqual(self.sample('chatbot_intents_total', intent='greeting'), greetings + 1)
+        self.assertEqual(self.sample('chatbot_request_duration_seconds_count', view='chat', method='POST'), chats + 3)
+
+        resp = self.client.get('/metrics')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = resp.content.decode()
+        self.assertIn('# TYPE chatbot_request_duration_seconds histogram', body)
+        self.assertRegex(body, r'chatbot_request_duration_seconds_bucket\{le="\+Inf",method="POST",view="chat"\} \d+')
+        self.assertRegex(body, r'chatbot_db_queries_per_request_bucket\{le="6\.0",view="chat"\} [1-9]')
+        self.assertRegex(body, r'chatbot_requests_total\{method="POST",status="200",view="token_obtain_pair"\} [1-9]')
+        self.assertIn(f'chatbot_rule_matches_total{{rule="{self.joke_rule}"}}', body)
+
+    def test_queries_are_counted_without_timing_the_request(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        queries = self.sample('chatbot_db_queries_per_request_sum', view='chat')
+        with mock.patch.object(timing, 'RequestTimer') as timer:
+            resp = self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        timer.assert_not_called()
+        self.assertNotIn('Server-Timing', resp)
+        self.assertGreater(self.sample('chatbot_db_queries_per_request_sum', view='chat'), queries)
+
+    def test_metrics_are_only_served_to_loopback_clients_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_200_OK)
+        resp = self.client.get('/metrics', REMOTE_ADDR='172.18.0.5')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_require_the_token(self):
+        with override_settings(CHATBOT={**settings.CHATBOT, 'METRICS_TOKEN': 'secret'}):
+            self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+            resp = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+            self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+            resp = self.client.get('/metrics', REMOTE_ADDR='172.18.0.5', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_multiprocess_aggregation(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        script = ("from api import metrics; "
+                  "metrics.RULE_MATCHES.labels('12').inc(3); "
+                  "metrics.REQUEST_LATENCY.labels('chat', 'POST').observe(0.02)")
+        env = {**os.environ, MULTIPROCESS_DIR: tmp.name}
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', script], env=env, cwd=settings.BASE_DIR, check=True)
+
+        with mock.patch.dict(os.environ, {MULTIPROCESS_DIR: tmp.name}):
+            registry = get_registry()
+            self.assertEqual(registry.get_sample_value('chatbot_rule_matches_total',
+                                                       {'rule': '12'}), 6)
+            self.assertEqual(registry.get_sample_value('chatbot_request_duration_seconds_bucket',
+                                                       {'view': 'chat', 'method': 'POST', 'le': '0.025'}), 2)
+            resp = self.client.get('/metrics')
+        self.assertIn('chatbot_rule_matches_total{rule="12"} 6.0', resp.content.decode())
+
+
+class TestWebSocketChat(TestSetUp):
+    def communicator(self, token, path='/ws/chat/'):
+        return WebsocketCommunicator(application, path, headers=[(b'origin', b'http://localhost')],
+                                     subprotocols=['bearer', token] if token else None)
+
+    async def test_websocket_chat(self):
+        communicator = self.communicator(self.token)
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, 'bearer')
+
+        await communicator.send_json_to({'text': 'hello'})
+        self.assertEqual(await communicator.receive_json_from(), {'text': 'Hello, I am Chatty. Ask me some questions.'})
+        await communicator.send_json_to({'text': 'what is your name?'})
+        self.assertEqual(await communicator.receive_json_from(), {'text': 'My name is Chatty.'})
+        await communicator.send_json_to({'text': 'bye'})
+        self.assertEqual(await communicator.receive_json_from(), {'text': 'Bye. Have a nice day!'})
+        await communicator.send_json_to({'text': 'what is your name?'})
+        self.assertEqual(await communicator.receive_json_from(), {'text': 'Hello, I am Chatty. Ask me some questions.'})
+        await communicator.disconnect()
+
+        self.assertEqual(await Log.objects.acount(), 8)
+        self.assertEqual(await Step.objects.acount(), 2)
+
+    async def test_websocket_chat_with_invalid_message(self):
+        communicator = self.communicator(self.token)
+        await communicator.connect()
+        await communicator.send_json_to({'data': 'hello'})
+        self.assertIn('errors', await communicator.receive_json_from())
+        await communicator.send_to(text_data='not json')
+        self.assertIn('errors', await communicator.receive_json_from())
+        await communicator.disconnect()
+
+    async def test_websocket_chat_with_invalid_token(self):
+        connected, code = await self.communicator('invalid').connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_token_in_query_string_is_refused(self):
+        connected, code = await self.communicator(None, f'/ws/chat/?token={self.token}').connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_connection_is_closed_when_the_token_expires(self):
+        user = await User.objects.aget(username='user')
+        token = AccessToken.for_user(user)
+        token.set_exp(lifetime=timedelta(seconds=2))
+        communicator = self.communicator(str(token))
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_output(timeout=4), {'type': 'websocket.close', 'code': 4401})
+
+    async def test_session_ended_by_another_writer_is_not_reopened(self):
+        communicator = self.communicator(self.token)
+        await communicator.connect()
+        await communicator.send_json_to({'text': 'hello'})
+        await communicator.receive_json_from()
+        ended = await Step.objects.aget()
+        ended.name = 'E'
+        await ended.asave()  # e.g. ended by the session sweeper
+
+        await communicator.send_json_to({'text': 'what is your name?'})
+        self.assertEqual(await communicator.receive_json_from(), {'text': 'Hello, I am Chatty. Ask me some questions.'})
+        await communicator.disconnect()
+
+        await ended.arefresh_from_db()
+        self.assertEqual(ended.name, 'E')
+        self.assertEqual(await Step.objects.acount(), 2)
+        self.assertEqual(await Log.objects.filter(step=ended).acount(), 2)
+
+
+class TestStepRepository(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+
+    def test_get_without_steps(self):
+        self.assertIsNone(StepRepository(self.user).get())
+
+    def test_get_is_scoped_to_user(self):
+        first = Step.objects.create(user=self.user)
+        latest = Step.objects.create(user=self.user)
+        Step.objects.create(user=self.other)
+        self.assertEqual(StepRepository(self.user).get(), latest)
+        self.assertNotEqual(first, latest)
+
+    @skipUnless(connection.vendor == 'sqlite', "query plans of small tables differ between databases")
+    def test_get_uses_user_created_index(self):
+        queryset = Step.objects.filter(user=self.user)[:1]
+        self.assertIn('api_step_user_created_idx', queryset.explain())
+
+
+class TestSessionSweeper(TestSetUp):
+    def seed(self, users, steps_per_user):
+        """
+        Seed a mix of greeting, question and ended steps, half of them last updated over a day ago.
+        """
+        users = User.objects.bulk_create([User(username=f"sweep{i}") for i in range(users)])
+        Step.objects.bulk_create([Step(user=user, name='GQE'[i % 3]) for user in users for i in range(steps_per_user)])
+        now = timezone.now()
+        ids = list(Step.objects.order_by('id').values_list('id', flat=True))
+        ages = (timedelta(minutes=10), timedelta(days=2), timedelta(hours=23), timedelta(days=30))
+        for i, age in enumerate(ages):
+            Step.objects.filter(id__in=ids[i::len(ages)]).update(updated_at=now - age)
+        return now
+
+    def idle_steps(self, now):
+        return set(Step.objects.filter(name__in='GQ', updated_at__lt=now - timedelta(days=1)).values_list('id', flat=True))
+
+    def test_close_idle_steps(self):
+        now = self.seed(100, 60)
+        day = timedelta(days=1)
+        idle = self.idle_steps(now)
+        others = dict(Step.objects.exclude(id__in=idle).values_list('id', 'updated_at'))
+        self.assertEqual(len(idle), 2000)
+
+        with CaptureQueriesContext(connection) as captured:
+            closed = close_idle_steps(day.total_seconds(), batch_size=300, now=now)
+        self.assertEqual(closed, len(idle))
+        # a SELECT and an UPDATE per batch of at most 300 steps
+        self.assertEqual(len(captured), 2 * 7)
+        self.assertEqual(set(Step.objects.filter(id__in=idle).values_list('name', flat=True)), {'E'})
+        self.assertEqual(dict(Step.objects.exclude(id__in=idle).values_list('id', 'updated_at')), others)
+        self.assertEqual(close_idle_steps(day.total_seconds(), batch_size=300, now=now), 0)
+
+    @skipUnless(connection.vendor == 'sqlite', "query plans of small tables differ between databases")
+    def test_idle_steps_use_name_updated_index(self):
+        queryset = Step.objects.filter(name__in='GQ', updated_at__lt=timezone.now()).order_by().values('id')[:10]
+        self.assertIn('api_step_name_updated_idx', queryset.explain())
+
+    def test_idle_session_is_not_continued(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        self.client.post(reverse('chat'), {'text': 'hello'}, format='json')
+        Step.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        call_command('close_idle_sessions', ttl=24 * 60 * 60, stdout=io.StringIO())
+        resp = self.client.post(reverse('chat'), {'text': 'tell me a joke'}, format='json')
+        self.assertEqual(resp.json(), {'text': 'Hello, I am Chatty. Ask me some questions.'})
+        self.assertEqual(list(Step.objects.order_by('id').values_list('name', flat=True)), ['E', 'Q'])
+
+    def test_close_idle_sessions_command(self):
+        idle = self.idle_steps(self.seed(2, 12))
+        out = io.StringIO()
+        call_command('close_idle_sessions', ttl=24 * 60 * 60, batch_size=2, stdout=out)
+        self.assertEqual(out.getvalue().strip(), f"Ended {len(idle)} sessions idle for over 86400 seconds.")
+        self.assertEqual(len(idle), 8)
+        with self.assertRaises(CommandError):
+            call_command('close_idle_sessions', batch_size=-1, stdout=out)
+
+    def test_sweeper_thread(self):
+        swept = threading.Event()
+        sweeper = SessionSweeper(interval=0.01, ttl=60)
+        with mock.patch('api.session_sweeper.close_idle_steps', side_effect=lambda *args: swept.set() or 0) as sweep, \
+                mock.patch('api.session_sweeper.close_old_connections') as close:
+            sweeper.start()
+            sweeper.start()
+            self.assertTrue(swept.wait(5))
+            sweeper.stop()
+        sweep.assert_called_with(60, 1000)
+        close.assert_called()
+        self.assertIsNone(sweeper._thread)
+
+    def test_sweeper_starts_with_the_first_request(self):
+        for interval, started in ((0, False), (60, True)):
+            sweeper = SessionSweeper(interval=interval, ttl=60)
+            with mock.patch('api.session_sweeper.get_session_sweeper', return_value=sweeper), \
+                    mock.patch.object(sweeper, 'start') as start:
+                self.client.get(reverse('home'))
+            self.assertEqual(start.called, started)
+
+
+class TestBufferedLogRepository(APITestCase):
+    def setUp(self):
+        self.step = Step.objects.create(user=User.objects.create_user(username='user', password='password'))
+        self.buffer = LogBuffer(max_size=100, flush_interval=60)
+        self.repository = BufferedLogRepository(self.buffer)
+
+    def tearDown(self):
+        self.buffer.stop()
+
+    def test_logs_are_queued_until_flushed(self):
+        self.repository.bulk_create([('hello', 'U', self.step), ('Hello, I am Chatty.', 'C', self.step)])
+        self.assertEqual(Log.objects.count(), 0)
+        self.assertEqual(self.buffer.metrics()['queue_depth'], 2)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.buffer.flush(), 2)
+        # a single INSERT, in a savepoint of the test transaction
+        self.assertEqual([query['sql'].split()[0] for query in captured], ['SAVEPOINT', 'INSERT', 'RELEASE'])
+        self.assertEqual(list(Log.objects.order_by('id').values_list('sender', flat=True)), ['U', 'C'])
+        metrics = self.buffer.metrics()
+        self.assertEqual((metrics['queue_depth'], metrics['flushes'], metrics['flushed']), (0, 1, 2))
+
+    def test_stop_flushes_queued_logs(self):
+        self.repository.create('bye', 'U', self.step)
+        self.buffer.stop()
+        self.assertEqual(Log.objects.count(), 1)
+
+    def test_full_queue_wakes_the_flusher(self):
+        flushed = threading.Event()
+        with mock.patch.object(self.buffer, 'flush', side_effect=flushed.set), \
+                mock.patch('api.repositories.buffered_log_repository.close_old_connections') as close:
+            self.repository.bulk_create([('hello', 'U', self.step)] * 100)
+            self.assertTrue(flushed.wait(5))
+        close.assert_called()
+
+    def test_invalid_entry_is_the_only_one_lost(self):
+        self.repository.bulk_create([('hello', 'U', self.step), (None, 'C', self.step), ('bye', 'U', self.step)])
+        with self.assertLogs('api.repositories.buffered_log_repository', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(list(Log.objects.order_by('id').values_list('text', flat=True)), ['hello', 'bye'])
+        metrics = self.buffer.metrics()
+        self.assertEqual((metrics['queue_depth'], metrics['flushed'], metrics['failed']), (0, 2, 1))
+
+    def test_entries_are_kept_while_the_database_is_unavailable(self):
+        self.repository.bulk_create([('hello', 'U', self.step), ('Hello, I am Chatty.', 'C', self.step)])
+        unavailable = OperationalError("the database system is starting up")
+        with mock.patch.object(Log.objects, 'bulk_create', side_effect=unavailable), \
+                mock.patch.object(Log, 'save', side_effect=unavailable), \
+                self.assertLogs('api.repositories.buffered_log_repository', 'ERROR'):
+            for _ in range(MAX_RETRIES):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.repository.create('bye', 'U', self.step)
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(list(Log.objects.order_by('id').values_list('text', flat=True)),
+                         ['hello', 'Hello, I am Chatty.', 'bye'])
+
+        self.repository.create('lost', 'U', self.step)
+        with mock.patch.object(Log.objects, 'bulk_create', side_effect=unavailable), \
+                mock.patch.object(Log, 'save', side_effect=unavailable), \
+                self.assertLogs('api.repositories.buffered_log_repository', 'ERROR') as logs:
+            for _ in range(MAX_RETRIES + 1):
+                self.buffer.flush()
+        self.assertIn(f"Dropped 1 log entries after {MAX_RETRIES + 1} failed flushes", logs.output[-1])
+        self.assertEqual(self.buffer.metrics()['queue_depth'], 0)
+        self.assertEqual(self.buffer.metrics()['failed'], 1)
+
+
+class TestChatEngine(SimpleTestCase):
+    messages = ("my name is Thabo", "what is your name?", "who created you?", "how is the weather in Durban",
+                "what is your favourite sport", "my city", "tell me a joke", "something unknown",
+                "I'm really doing good", "CAN YOU HELP me", "what is your naME", "héllo my location")
+
+    def test_engine_is_shared(self):
+        self.assertIs(get_engine(), get_engine())
+        self.assertIs(NltkChatBot('hello')._engine, NltkChatBot('bye')._engine)
+
+    def test_engine_matches_nltk_chat(self):
+        chat = Chat(pairs, reflections)
+        for text in self.messages:
+            self.assertEqual(get_engine().respond(text), chat.respond(text))
+
+    def test_first_matching_rule_wins(self):
+        engine = ChatEngine([[r"(.*) help (.*)", ["broad"]], [r"please help (.*)", ["narrow %1"]]], reflections)
+        self.assertEqual(engine.respond("please help me"), "broad")
+        engine = ChatEngine([[r"please help (.*)", ["narrow %1"]], [r"(.*) help (.*)", ["broad"]]], reflections)
+        self.assertEqual(engine.respond("please help me"), "narrow you")
+
+    def test_large_rulebook_matches_nltk_chat(self):
+        rulebook = [[rf"tell me about topic{i} (.*)", [f"Topic {i}: %1"]] for i in range(200)]
+        rulebook += [[rf"(.*) keyword{i}(.*)", [f"Keyword {i}."]] for i in range(200)]
+        engine = ChatEngine(rulebook, reflections)
+        chat = Chat(rulebook, reflections)
+        for text in ("tell me about topic7 my car", "Tell Me About Topic199 you", "say keyword42 now",
+                     "a keyword3x", "tell me about topic7", "nothing here", "tëll me about topic1 x"):
+            self.assertEqual(engine.respond(text), chat.respond(text))
+
+    def test_input_longer_than_limit_is_not_matched(self):
+        engine = ChatEngine(pairs, reflections, max_input_length=20)
+        self.assertIsNotNone(engine.respond("tell me a joke"))
+        self.assertIsNone(engine.respond("tell me a joke" + " please" * 10))
+
+    def test_spent_time_budget_is_not_matched(self):
+        engine = ChatEngine(pairs, reflections, time_budget=0)
+        self.assertIsNone(engine.respond("tell me a joke"))
+
+    @skipIf(re2 is None, "google-re2 is not installed")
+    def test_re2_engine_matches_nltk_chat(self):
+        engine = ChatEngine(pairs, reflections, regex_engine='re2')
+        chat = Chat(pairs, reflections)
+        for text in self.messages:
+            self.assertEqual(engine.respond(text), chat.respond(text))
+
+    def test_unknown_regex_engine(self):
+        with self.assertRaises(ValueError):
+            ChatEngine(pairs, reflections, regex_engine='pcre')
+
+    def test_compile_template(self):
+        self.assertEqual(compile_template("Hello %1, how are you?"), ("Hello ", 1, ", how are you?"))
+        self.assertEqual(compile_template("%2%1 and %0"), (2, 1, " and ", 0))
+        self.assertEqual(compile_template("100% sure%"), ("100% sure%",))
+        self.assertEqual(compile_template(""), ())
+
+    def test_reflections_match_nltk_chat(self):
+        engine = ChatEngine(pairs, reflections)
+        chat = Chat(pairs, reflections)
+        words = list(reflections) + ["I", "Your", "YOU'RE", "it", "mine", "myself", "i2", "my_car", "me's", "are"]
+        separators = [" ", "  ", ", ", "'", "-", ".", "?", "_", "\t"]
+        rng = random.Random(42)
+        texts = ["I am sure you were there", "i'm, I'd and i've", "you are you, me and my yours", "i'd've",
+                 "I AM YOUR I", "iam youare", "", "...i...", "you'll you'lly", "héllo i am"]
+        for _ in range(2000):
+            texts.append("".join(rng.choice(words) + rng.choice(separators) for _ in range(rng.randint(1, 8))))
+        for text in texts:
+            self.assertEqual(engine._substitute(text), chat._substitute(text), text)
+
+    def test_custom_reflections_match_nltk_chat(self):
+        custom = {"dr.": "doctor", "i": "you", "'s": " is"}
+        engine = ChatEngine(pairs, custom)
+        chat = Chat(pairs, custom)
+        for text in ("dr. who is i", "it's dr.no", "i's dr. i"):
+            self.assertEqual(engine._substitute(text), chat._substitute(text), text)
+
+    def test_templated_replies_match_nltk_chat(self):
+        rulebook = [[r"(.*) and (.*) or (.*)", ["%3 or %2 and %1", "%1%2%3?", "All: %0."]],
+                    [r"my name is (.*)", ["Hello %1, How are you today ?", "Nice to meet you, %1?."]]]
+        engine = ChatEngine(rulebook, reflections)
+        chat = Chat(rulebook, reflections)
+        for text in ("I and you or my cat", "me and I'm or you were", "My name is I am Thabo", "my name is "):
+            for seed in range(6):
+                random.seed(seed)
+                expected = chat.respond(text)
+                random.seed(seed)
+                self.assertEqual(engine.respond(text), expected)
+
+    def test_captured_percent_sign(self):
+        # nltk would read the captured % as a placeholder and fail
+        engine = ChatEngine([[r"my name is (.*)", ["Hello %1!"]]], reflections)
+        self.assertEqual(engine.respond("my name is 100% %1"), "Hello 100% %1!")
+
+
+class TestIntentClassifier(SimpleTestCase):
+    def setUp(self):
+        self.classifier = IntentClassifier(DEFAULT_INTENTS)
+
+    def test_single_words(self):
+        self.assertEqual(self.classifier.classify("Hello there"), {'greeting'})
+        self.assertEqual(self.classifier.classify("ok BYE"), {'goodbye'})
+        self.assertEqual(self.classifier.classify("hi and bye"), {'greeting', 'goodbye'})
+        self.assertEqual(self.classifier.classify("this is high"), set())
+
+    def test_phrases(self):
+        self.assertEqual(self.classifier.classify("What’s up"), {'greeting'})
+        self.assertEqual(self.classifier.classify("ok see you tomorrow"), {'goodbye'})
+        self.assertEqual(self.classifier.classify("see see ya"), {'goodbye'})
+        self.assertEqual(self.classifier.classify("I see what you mean"), set())
+        self.assertEqual(self.classifier.classify("see"), set())
+
+    def test_overlapping_phrases(self):
+        classifier = IntentClassifier({'a': ("one two three",), 'b': ("two three four",), 'c': ("three",)})
+        self.assertEqual(classifier.classify("one two three four"), {'a', 'b', 'c'})
+        self.assertEqual(classifier.classify("one two two three four"), {'b', 'c'})
+
+
+class TestResponseCache(SimpleTestCase):
+    def setUp(self):
+        self.engine = ChatEngine(pairs, reflections)
+
+    def test_static_rule_is_cached(self):
+        cache = ResponseCache(max_size=8)
+        first = cache.respond(self.engine, "Tell me a joke")
+        self.assertEqual(cache.respond(self.engine, "tell me a JOKE"), first)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1})
+
+    def test_templated_rule_is_not_cached(self):
+        cache = ResponseCache(max_size=8)
+        self.assertEqual(cache.respond(self.engine, "my name is Thabo"),
+                         "Hello thabo, nice to have you here. How can I help you?")
+        self.assertEqual(cache.respond(self.engine, "my name is Thabo"),
+                         "Hello thabo, nice to have you here. How can I help you?")
+        self.assertEqual(cache.stats()['hits'], 0)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_hit_picks_a_random_response(self):
+        engine = ChatEngine([[r"hello", ["one", "two", "three"]]], reflections)
+        cache = ResponseCache(max_size=8)
+        responses = {cache.respond(engine, "hello") for _ in range(200)}
+        self.assertEqual(responses, {"one", "two", "three"})
+        self.assertEqual(cache.stats()['hits'], 199)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_size=2, policy='lru')
+        for text in ("tell me a joke", "do you like music?", "tell me a joke", "what is your name?"):
+            cache.respond(self.engine, text)
+        cache.respond(self.engine, "tell me a joke")
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 3, 'evictions': 1, 'size': 2})
+
+    def test_fifo_eviction(self):
+        cache = ResponseCache(max_size=2, policy='fifo')
+        for text in ("tell me a joke", "do you like music?", "tell me a joke", "what is your name?"):
+            cache.respond(self.engine, text)
+        cache.respond(self.engine, "tell me a joke")
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 4, 'evictions': 2, 'size': 2})
+
+    def test_new_rulebook_version_misses(self):
+        cache = ResponseCache(max_size=8)
+        cache.respond(self.engine, "tell me a joke")
+        engine = ChatEngine([[r"tell me a joke", ["No jokes today."]]], reflections)
+        self.assertEqual(cache.respond(engine, "tell me a joke"), "No jokes today.")
+        self.assertEqual(cache.stats()['hits'], 0)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            ResponseCache(policy='random')
+
+
+class TestRulebook(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = os.path.join(tmp.name, 'cache')
+        self.path = os.path.join(tmp.name, 'rulebook.json')
+        self.write_rulebook([{"pattern": "tell me a joke", "responses": ["No jokes today."]}])
+
+    def write_rulebook(self, rules, **extra):
+        with open(self.path, 'w') as file:
+            json.dump({'pairs': rules, **extra}, file)
+
+    def test_bundled_rulebook_matches_nltk_chat(self):
+        engine = load_engine()
+        chat = Chat(pairs, reflections)
+        for text in TestChatEngine.messages:
+            self.assertEqual(engine.respond(text), chat.respond(text))
+
+    def test_invalid_rulebooks(self):
+        for rules in ([{"pattern": "(unclosed", "responses": ["x"]}],
+                      [{"pattern": "hello", "responses": []}],
+                      [{"pattern": 42, "responses": ["x"]}],
+                      [{"pattern": "my name is (.*)", "responses": ["Hello %2"]}],
+                      [{"pattern": "hello", "responses": ["100%"]}],
+                      ["hello"]):
+            self.write_rulebook(rules)
+            with self.assertRaises(RulebookError):
+                compile_rulebook(self.path)
+        with open(self.path, 'w') as file:
+            file.write("{not json")
+        with self.assertRaises(RulebookError):
+            compile_rulebook(self.path)
+
+    def test_artifact_is_cached_by_content(self):
+        artifact = compile_rulebook(self.path, self.cache_dir)
+        self.assertTrue(os.path.exists(artifact_path(self.cache_dir, artifact['hash'])))
+        with mock.patch('api.rulebook.validate_rulebook') as validate:
+            self.assertEqual(compile_rulebook(self.path, self.cache_dir), artifact)
+        validate.assert_not_called()
+
+        self.write_rulebook([["tell me a joke", ["Knock knock."]]], reflections={"i": "you"})
+        changed = compile_rulebook(self.path, self.cache_dir)
+        self.assertNotEqual(changed['hash'], artifact['hash'])
+        self.assertEqual(changed['reflections'], {"i": "you"})
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_reload_swaps_engine(self):
+        self.addCleanup(setattr, nltk_chatbot, '_engine', nltk_chatbot._engine)
+        self.addCleanup(setattr, nltk_chatbot, '_engine_hash', nltk_chatbot._engine_hash)
+        with override_settings(CHATBOT={'RULEBOOK_PATH': self.path, 'RULEBOOK_CACHE_DIR': self.cache_dir}):
+            self.assertTrue(reload_engine())
+            in_flight = NltkChatBot("tell me a joke", cache=ResponseCache())
+            self.assertFalse(reload_engine())
+
+            self.write_rulebook([{"pattern": "tell me a joke", "responses": ["Knock knock."]}])
+            self.assertTrue(reload_engine())
+            self.assertEqual(in_flight.get_response(), "No jokes today.")
+            self.assertEqual(NltkChatBot("tell me a joke").get_response(), "Knock knock.")
+
+            self.write_rulebook([{"pattern": "(unclosed", "responses": ["x"]}])
+            with self.assertLogs('api.nltk_chatbot', 'ERROR'):
+                self.assertFalse(reload_engine())
+            self.assertEqual(NltkChatBot("tell me a joke").get_response(), "Knock knock.")
+
+    def test_engine_is_reloaded_in_the_background(self):
+        self.addCleanup(setattr, nltk_chatbot, '_engine', nltk_chatbot._engine)
+        self.addCleanup(setattr, nltk_chatbot, '_engine_hash', nltk_chatbot._engine_hash)
+        with override_settings(CHATBOT={'RULEBOOK_PATH': self.path}):
+            reload_engine()
+            engine = get_engine()
+            self.write_rulebook([{"pattern": "tell me a joke", "responses": ["Knock knock."]}])
+            # requests only read the current engine
+            with mock.patch('api.nltk_chatbot.read_source') as read:
+                self.assertIs(get_engine(), engine)
+            read.assert_not_called()
+
+            watcher = RulebookWatcher(interval=0.01)
+            watcher.start()
+            self.addCleanup(watcher.stop)
+            for _ in range(500):
+                if get_engine() is not engine:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(NltkChatBot("tell me a joke").get_response(), "Knock knock.")
+
+    def test_rulebook_watcher_starts_with_the_first_request(self):
+        self.addCleanup(setattr, nltk_chatbot, '_watcher', nltk_chatbot._watcher)
+        nltk_chatbot._watcher = None
+        with mock.patch.object(RulebookWatcher, 'start') as start:
+            self.client.get(reverse('home'))
+            start.assert_not_called()
+            with override_settings(CHATBOT={'RULEBOOK_RELOAD_INTERVAL': 60}):
+                self.client.get(reverse('home'))
+        start.assert_called_once_with()
+        self.assertEqual(nltk_chatbot._watcher.interval, 60)
+
+    def test_build_rulebook_command(self):
+        call_command('build_rulebook', path=self.path, cache_dir=self.cache_dir, stdout=io.StringIO())
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.write_rulebook([{"pattern": "hello", "responses": ["Hi %1"]}])
+        with self.assertRaises(CommandError):
+            call_command('build_rulebook', path=self.path, cache_dir=self.cache_dir)
+
+
+class TestWarmUp(SimpleTestCase):
+    def test_warm_up(self):
+        with mock.patch('gc.freeze') as freeze:
+            timings = warm_up()
+        freeze.assert_called_once_with()
+        self.assertEqual(list(timings), ['imports', 'urls', 'rulebook', 'faq', 'intents', 'freeze'])
+        self.assertIsNotNone(nltk_chatbot._engine)
+        self.assertIn('api.services.chatbot_service', sys.modules)
+
+    def test_warm_up_without_freeze(self):
+        with mock.patch('gc.freeze') as freeze:
+            self.assertNotIn('freeze', warm_up(freeze=False))
+        freeze.assert_not_called()
+
+    def test_gunicorn_config(self):
+        path = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        for value, preload in (('1', True), ('0', False)):
+            with mock.patch.dict(os.environ, {'CHATBOT_WARMUP': value}):
+                config = {}
+                with open(path) as file:
+                    exec(compile(file.read(), path, 'exec'), config)
+            self.assertIs(config['preload_app'], preload)
+
+
+@skipIf(np is None, "numpy is not installed")
+class TestFaqFallback(SimpleTestCase):
+    faqs = [("How do I reset my password?", "Use the reset link on the login page."),
+            ("What are your opening hours?", "We are open from 9 to 5."),
+            ("How do I delete my account?", "Go to the settings and choose delete.")]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.index_dir = os.path.join(tmp.name, 'index')
+        self.path = os.path.join(tmp.name, 'faq.json')
+        with open(self.path, 'w') as file:
+            json.dump({'faqs': [{'question': q, 'answer': a} for q, a in self.faqs]}, file)
+        self.index = TfidfIndex.build(self.faqs)
+
+    def test_most_similar_question_above_threshold(self):
+        self.assertEqual(self.index.respond("how can I reset the password"), "Use the reset link on the login page.")
+        self.assertEqual(self.index.respond("Opening hours?"), "We are open from 9 to 5.")
+        self.assertIsNone(self.index.respond("do you like bananas"))
+
+    def test_scores_are_cosine_similarities(self):
+        self.assertAlmostEqual(self.index.search("What are your opening hours?")[1], 1.0, places=5)
+        self.assertIsNone(self.index.search("bananas"))
+
+    def test_saved_index_is_memory_mapped(self):
+        index = load_faq_index(self.path, self.index_dir)
+        self.assertIsInstance(index._weight, np.memmap)
+        self.assertEqual(len(os.listdir(self.index_dir)), 1)
+        for text in ("how can I reset the password", "delete my account", "bananas"):
+            self.assertEqual(index.search(text), self.index.search(text))
+        with mock.patch('api.retrieval_chatbot.TfidfIndex.build') as build:
+            load_faq_index(self.path, self.index_dir)
+        build.assert_not_called()
+
+    def test_save_replaces_or_keeps_a_saved_index(self):
+        directory = os.path.join(self.index_dir, 'faq')
+        TfidfIndex.build(self.faqs[:1]).save(directory)
+        self.index.save(directory)
+        self.assertEqual(TfidfIndex.load(directory).respond("opening hours"), "We are open from 9 to 5.")
+
+        # another worker saves the same index between the check for a saved index and the rename
+        other = TfidfIndex.build(self.faqs[:1])
+        isdir = os.path.isdir
+        with mock.patch('api.faq_index.os.path.isdir', side_effect=lambda path: path != directory and isdir(path)):
+            other.save(directory)
+        self.assertEqual(TfidfIndex.load(directory).respond("opening hours"), "We are open from 9 to 5.")
+        self.assertEqual(os.listdir(self.index_dir), ['faq'])
+
+    def test_corrupt_index_is_built_again(self):
+        load_faq_index(self.path, self.index_dir)
+        directory = os.path.join(self.index_dir, os.listdir(self.index_dir)[0])
+        with open(os.path.join(directory, 'index.json'), 'w') as file:
+            file.write('{"format": 1, "vocab')
+        with self.assertLogs('api.retrieval_chatbot', 'INFO') as logs:
+            index = load_faq_index(self.path, self.index_dir)
+        self.assertIn("Indexed 3 FAQ entries", logs.output[0])
+        self.assertEqual(index.respond("opening hours"), "We are open from 9 to 5.")
+
+    def test_index_replaced_while_loaded_is_loaded_again(self):
+        load_faq_index(self.path, self.index_dir)
+        load = TfidfIndex.load
+        with mock.patch('api.retrieval_chatbot.TfidfIndex.load', side_effect=[FileNotFoundError(), load]) as loads, \
+                mock.patch('api.retrieval_chatbot.TfidfIndex.build') as build, \
+                self.assertLogs('api.retrieval_chatbot', 'WARNING'):
+            load_faq_index(self.path, self.index_dir)
+        self.assertEqual(loads.call_count, 2)
+        build.assert_not_called()
+
+    def test_load_error_disables_the_fallback(self):
+        self.addCleanup(setattr, retrieval_chatbot, '_index', retrieval_chatbot._index)
+        self.addCleanup(setattr, retrieval_chatbot, '_index_error', retrieval_chatbot._index_error)
+        retrieval_chatbot._index = retrieval_chatbot._index_error = None
+        missing = os.path.join(self.index_dir, 'missing.json')
+        with override_settings(CHATBOT={**settings.CHATBOT, 'FAQ_PATH': missing, 'FAQ_INDEX_DIR': self.index_dir}):
+            with self.assertRaises(FileNotFoundError):
+                warm_up(freeze=False)
+            with self.assertLogs('api.retrieval_chatbot', 'ERROR'):
+                self.assertIsNone(get_faq_index())
+            with mock.patch('api.retrieval_chatbot.load_faq_index') as load:
+                self.assertEqual(NltkChatBot("bananas").get_response(),
+                                 'Sorry, I did not understand the input. Please try again.')
+            load.assert_not_called()
+
+    def test_chatbot_falls_back_to_faq(self):
+        fallback = lambda text: RetrievalChatBot(text, index=self.index)  # noqa: E731
+        self.assertEqual(NltkChatBot("opening hours", fallback=fallback).get_response(), "We are open from 9 to 5.")
+        self.assertEqual(NltkChatBot("what is your name?", fallback=fallback).get_response(), "My name is Chatty.")
+        self.assertEqual(NltkChatBot("bananas", fallback=fallback).get_response(),
+                         'Sorry, I did not understand the input. Please try again.')
+
+
+class TestRuleProfiler(SimpleTestCase):
+    def setUp(self):
+        self.engine = ChatEngine([[r"(.*)(location|city)(.*)", ["Durban."]],
+                                  [r"tell me a joke", ["No."]],
+                                  [r"what is your city", ["Shadowed."]],
+                                  [r"(hi|hello) there", ["Hi %1."]],
+                                  [r"hi there friend", ["Shadowed too."]],
+                                  [r"my (.*) city", ["Shadowed as well."]]], reflections)
+
+    def test_replay_statistics(self):
+        profiler = RuleProfiler(self.engine)
+        profiler.replay(text for text in ("tell me a joke", "my city", "nothing", "hello there") * 5)
+        report = profiler.report()
+        self.assertEqual((report['messages'], report['unmatched']), (20, 5))
+        rules = report['rules']
+        self.assertEqual([rule['hits'] for rule in rules], [5, 5, 0, 5, 0, 0])
+        # the unindexed broad rule is tried before every other rule
+        self.assertEqual(rules[0]['attempts'], 20)
+        self.assertEqual(rules[1]['avg_tried_before_hit'], 1.0)
+        self.assertGreater(rules[0]['max_us'], 0)
+
+    def test_examples(self):
+        self.assertEqual(examples(r"(hi|hello) there"), ["hi there", "hello there"])
+        self.assertEqual(examples(r"my name is (.*)"), ["my name is ", "my name is some words"])
+        self.assertEqual(examples(r"(a)\1"), [])
+
+    def test_shadowed_rules(self):
+        shadowed = RuleProfiler(self.engine).shadowed()
+        self.assertEqual(shadowed, [{'index': 2, 'pattern': "what is your city", 'shadowed_by': [0]},
+                                    {'index': 4, 'pattern': "hi there friend", 'shadowed_by': [3]},
+                                    {'index': 5, 'pattern': "my (.*) city", 'shadowed_by': [0]}])
+        self.assertEqual(RuleProfiler(get_engine()).shadowed(), [])
+
+
+class TestProfileRulesCommand(TestSetUp):
+    def test_replay_logs(self):
+        step = Step.objects.create(user=User.objects.get(username='user'), name='Q')
+        for text in ("tell me a joke", "my city", "nothing at all"):
+            Log.objects.create(text=text, sender='U', step=step, user=step.user)
+            Log.objects.create(text="my city is not a question", sender='C', step=step, user=step.user)
+        out = io.StringIO()
+        call_command('profile_rules', json=True, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual((report['messages'], report['unmatched']), (3, 1))
+        self.assertEqual(report['shadowed'], [])
+
+    def test_replay_ndjson(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'logs.ndjson.gz')
+        with gzip.open(path, 'wt') as file:
+            for line in ('"tell me a joke"', '{"text": "do you like music?", "sender": "U"}',
+                         '{"text": "my city", "sender": "C"}', ''):
+                file.write(line + "\n")
+        out = io.StringIO()
+        call_command('profile_rules', file=path, stdout=out)
+        self.assertIn("Replayed 2 messages: 2 matched, 0 unmatched", out.getvalue())
+        self.assertIn("No rule is shadowed by earlier rules.", out.getvalue())
+
+
+class TestExport(TestSetUp):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.get(username='user')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.steps = Step.objects.bulk_create([Step(user=self.user, name='Q'), Step(user=self.other, name='E')])
+        Log.objects.bulk_create([Log(text=f"héllo, \"{i}\"\nagain", sender='UC'[i % 2], step=step, user=step.user)
+                                 for step in self.steps for i in range(4)])
+        # the first half of the logs is from January
+        first = list(Log.objects.order_by('id').values_list('id', flat=True)[:4])
+        Log.objects.filter(id__in=first).update(created_at=datetime(2024, 1, 15, tzinfo=dt_timezone.utc))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def read_ndjson(self, data):
+        return [json.loads(line) for line in gzip.decompress(data).decode('utf-8').splitlines()]
+
+    def test_export_ndjson(self):
+        rows = self.read_ndjson(b''.join(export('logs')))
+        logs = Log.objects.order_by('id')
+        self.assertEqual([row['id'] for row in rows], [log.id for log in logs])
+        self.assertEqual(rows[1], {'id': logs[1].id, 'created_at': logs[1].created_at.isoformat(),
+                                   'updated_at': logs[1].updated_at.isoformat(), 'text': logs[1].text,
+                                   'sender': 'C', 'step_id': self.steps[0].id, 'user_id': self.user.id})
+
+    def test_export_csv(self):
+        lines = gzip.decompress(b''.join(export('steps', 'csv'))).decode('utf-8')
+        rows = list(csv.reader(io.StringIO(lines)))
+        self.assertEqual(rows[0], ['id', 'created_at', 'updated_at', 'name', 'user_id'])
+        self.assertEqual([row[3] for row in rows[1:]], ['Q', 'E'])
+        logs = list(csv.DictReader(io.StringIO(gzip.decompress(b''.join(export('logs', 'csv'))).decode('utf-8'))))
+        self.assertEqual([log['text'] for log in logs], list(Log.objects.order_by('id').values_list('text', flat=True)))
+
+    def test_export_filters(self):
+        january = {'start': datetime(2024, 1, 1, tzinfo=dt_timezone.utc),
+                   'end': datetime(2024, 2, 1, tzinfo=dt_timezone.utc)}
+        self.assertEqual(len(self.read_ndjson(b''.join(export('logs', **january)))), 4)
+        rows = self.read_ndjson(b''.join(export('logs', user_id=self.other.id)))
+        self.assertEqual({row['user_id'] for row in rows}, {self.other.id})
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(self.read_ndjson(b''.join(export('logs', user_id=self.other.id, **january))), [])
+
+    def test_export_memory_is_bounded(self):
+        step = self.steps[0]
+        text = "x" * 500
+        for _ in range(10):
+            Log.objects.bulk_create([Log(text=text, sender='U', step=step, user=self.user) for _ in range(1000)])
+        tracemalloc.start()
+        try:
+            size = sum(len(chunk) for chunk in export('logs', chunk_size=500))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # the 5 MB of text are read and compressed a chunk at a time
+        self.assertGreater(size, 0)
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+    def test_export_endpoint(self):
+        self.user.is_staff = True
+        self.user.save()
+        user_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        resp = self.client.get(reverse('export'), {'user': self.other.id, 'start': '2024-02-01'})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Type'], 'application/gzip')
+        self.assertEqual(resp['Content-Disposition'], 'attachment; filename="logs.ndjson.gz"')
+        rows = self.read_ndjson(b''.join(resp.streaming_content))
+        self.assertEqual([row['id'] for row in rows],
+                         list(Log.objects.filter(user=self.other).order_by('id').values_list('id', flat=True)))
+
+        resp = self.client.get(reverse('export'), {'kind': 'steps', 'output': 'csv'})
+        self.assertEqual(resp['Content-Disposition'], 'attachment; filename="steps.csv.gz"')
+        self.assertEqual(len(gzip.decompress(b''.join(resp.streaming_content)).splitlines()), 3)
+
+        resp = self.client.get(reverse('export'), {'kind': 'users', 'start': 'yesterday'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(resp.json()['errors']), {'kind', 'start'})
+
+    def test_export_endpoint_in_stateless_mode(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        with override_settings(CHATBOT={**settings.CHATBOT, 'AUTH_STATELESS': True}):
+            self.assertEqual(self.client.get(reverse('export')).status_code, status.HTTP_403_FORBIDDEN)
+            # the token has no admin claim, and the user is read from the database
+            User.objects.filter(pk=self.user.pk).update(is_staff=True)
+            resp = self.client.get(reverse('export'))
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(self.read_ndjson(b''.join(resp.streaming_content))), Log.objects.count())
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            self.assertEqual(self.client.get(reverse('export')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_endpoint_requires_admin(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        resp = self.client.get(reverse('export'))
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        path = os.path.join(self.tmp.name, 'logs.ndjson.gz')
+        call_command('export_logs', user='other', start='2024-02-01', output=path)
+        with open(path, 'rb') as file:
+            rows = self.read_ndjson(file.read())
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['user_id'] for row in rows}, {self.other.id})
+        with self.assertRaises(CommandError):
+            call_command('export_logs', user='nobody', output=path)
+        with self.assertRaises(CommandError):
+            call_command('export_logs', start='last week', output=path)
+
+
+class TestArchive(TestSetUp):
+    NOW = datetime(2024, 3, 10, 12, tzinfo=dt_timezone.utc)
+    # the logs before March 9 are archived when 1 day is kept, the first two around midnight
+    TIMES = (datetime(2024, 3, 1, 23, 59, tzinfo=dt_timezone.utc), datetime(2024, 3, 2, 0, 1, tzinfo=dt_timezone.utc),
+             datetime(2024, 3, 9, 0, 1, tzinfo=dt_timezone.utc), datetime(2024, 3, 10, 11, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.get(username='user')
+        self.other = User.objects.create_user(username='other', password='password')
+        self.steps = Step.objects.bulk_create([Step(user=self.user, name='Q'), Step(user=self.other, name='Q')])
+        for created_at in self.TIMES:
+            self.add_logs(3, created_at)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def add_logs(self, count, created_at):
+        logs = Log.objects.bulk_create([Log(text=f"héllo {created_at:%d %H:%M} \"{i}\"\n", sender='UC'[i % 2], step=step,
+                                            user=step.user) for step in self.steps for i in range(count)])
+        Log.objects.filter(id__in=[log.id for log in logs]).update(created_at=created_at, updated_at=created_at)
+
+    def logs(self, **filters):
+        return list(Log.objects.filter(**filters).order_by('id').values(*FIELDS['logs']))
+
+    def test_archive_and_restore(self):
+        before = self.logs(created_at__lt=self.TIMES[2])
+        kept = self.logs(created_at__gte=self.TIMES[2])
+        archived, shards = archive_logs(1, self.tmp.name, now=self.NOW)
+        self.assertEqual(archived, len(before))
+        self.assertEqual(shards, [os.path.join(self.tmp.name, '2024', '2024-03-01.ndjson.gz'),
+                                  os.path.join(self.tmp.name, '2024', '2024-03-02.ndjson.gz')])
+        self.assertEqual(self.logs(), kept)
+        self.assertEqual(list(read_archive(self.tmp.name, date(2024, 3, 1), date(2024, 3, 2))), before)
+        self.assertEqual(list(read_archive(self.tmp.name, date(2024, 3, 2), user_id=self.other.id)),
+                         [log for log in before[6:] if log['user_id'] == self.other.id])
+
+        self.assertEqual(restore_logs(self.tmp.name, date(2024, 3, 2), user_id=self.other.id), 3)
+        restored = [log for log in before[6:] if log['user_id'] == self.other.id]
+        self.assertEqual(self.logs(created_at__lt=self.TIMES[2]), restored)
+        self.assertEqual(restore_logs(self.tmp.name, date(2024, 3, 2), user_id=self.other.id), 0)
+
+        # logs archived again go to a new part, and are read once
+        self.assertEqual(archive_logs(1, self.tmp.name, now=self.NOW)[1],
+                         [os.path.join(self.tmp.name, '2024', '2024-03-02.1.ndjson.gz')])
+        self.assertEqual(list(read_archive(self.tmp.name, date(2024, 3, 2))), before[6:])
+        self.assertEqual(restore_logs(self.tmp.name, date(2024, 3, 1), date(2024, 3, 5)), len(before))
+        self.assertEqual(self.logs(), before + kept)
+
+    def test_archive_deletes_in_batches(self):
+        self.add_logs(1250, self.TIMES[0])
+        old = Log.objects.filter(created_at__lt=self.TIMES[2]).count()
+        with CaptureQueriesContext(connection) as captured:
+            archived, _ = archive_logs(1, self.tmp.name, batch_size=1000, now=self.NOW)
+        self.assertEqual(archived, old)
+        deletes = [query['sql'] for query in captured if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), -(-old // 1000))
+        self.assertEqual(Log.objects.filter(created_at__lt=self.TIMES[2]).count(), 0)
+        self.assertEqual(len(list(read_archive(self.tmp.name, date(2024, 3, 1)))), 2 * 1253)
+
+    def test_delete_logs(self):
+        self.add_logs(500, self.TIMES[0])
+        ids = list(Log.objects.filter(created_at__lt=self.TIMES[2]).order_by('id').values_list('id', flat=True))
+        cutoff = datetime(2024, 3, 9, tzinfo=dt_timezone.utc)
+        with CaptureQueriesContext(connection) as captured:
+            deleted = delete_logs(cutoff, ids[-101], batch_size=100)
+        self.assertEqual(deleted, len(ids) - 100)
+        # a SELECT and a DELETE per batch of at most 100 logs
+        self.assertEqual(len(captured), 2 * -(-deleted // 100))
+        self.assertEqual(list(Log.objects.filter(created_at__lt=cutoff).order_by('id').values_list('id', flat=True)),
+                         ids[-100:])
+        self.assertEqual(Log.objects.filter(created_at__gte=cutoff).count(), 12)
+
+    def test_archive_and_restore_commands(self):
+        out = io.StringIO()
+        call_command('archive_logs', days=0, directory=self.tmp.name, batch_size=5, stdout=out)
+        self.assertRegex(out.getvalue(), r"^Archived 24 logs created before \d{4}-\d\d-\d\d into 4 files in ")
+        self.assertEqual(Log.objects.count(), 0)
+
+        call_command('restore_logs', start='2024-03-09', end='2024-03-10', user='other',
+                     directory=self.tmp.name, stdout=out)
+        self.assertIn("Restored 6 logs.", out.getvalue())
+        self.assertEqual(set(Log.objects.values_list('user_id', flat=True)), {self.other.id})
+        with self.assertRaises(CommandError):
+            call_command('restore_logs', start='March 9', directory=self.tmp.name)
+        with self.assertRaises(CommandError):
+            call_command('archive_logs', days=-1, directory=self.tmp.name)
@@ -0,0 +1,252 @@
+import contextvars
+import json
+import logging
+import random
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+_timer = contextvars.ContextVar('request_timer', default=None)
+_query_count = contextvars.ContextVar('query_count', default=None)
+_untimed = nullcontext()
+
+
+class RequestTimer(object):
+    """
+    The timing breakdown of a request: the time spent in named phases, e.g. 'auth' or
+    'match', and the number and time of its database queries.
+
+    Attributes:
+    - durations (dict): The seconds spent in each phase, in the order they were first measured.
+    - queries (int): The number of database queries.
+    - query_seconds (float): The seconds spent in database queries.
+
+    Methods:
+    - measure(name): Get a context manager adding the time spent in it to a phase.
+    - header(total): Get the Server-Timing header value.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def measure(self, name):
+        return _Phase(self, name)
+
+    def header(self, total):
+        """
+        Get the Server-Timing header value, with durations in milliseconds.
+
+        Parameters:
+        - total (float): The seconds spent handling the request.
+
+        Returns:
+        - str: e.g. 'auth;dur=0.41, match;dur=0.05, db;dur=1.20;desc="5 queries", total;dur=3.10'.
+        """
+        metrics = [f"{name};dur={seconds * 1e3:.2f}" for name, seconds in self.durations.items()]
+        metrics.append(f'db;dur={self.query_seconds * 1e3:.2f};desc="{self.queries} queries"')
+        metrics.append(f"total;dur={total * 1e3:.2f}")
+        return ", ".join(metrics)
+
+
+class QueryCount(object):
+    """
+    The number and time of the database queries of a request, counted without timing
+    its phases, e.g. for the metrics of every request.
+
+    Attributes:
+    - queries (int): The number of database queries.
+    - query_seconds (float): The seconds spent in database queries.
+    """
+    __slots__ = ('queries', 'query_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class _Phase(object):
+    """
+    Internal context manager adding the time spent in it to a phase of a RequestTimer.
+    """
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        durations = self.timer.durations
+        durations[self.name] = durations.get(self.name, 0.0) + time.perf_counter() - self.start
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    A database execute wrapper adding the time of each query to the RequestTimer and the
+    QueryCount of the current request, installed on every connection when it is opened.
+
+    Queries of async views run in worker threads with their own connections, so the
+    request is found through context variables, which those threads inherit.
+    """
+    timer, count = _timer.get(), _query_count.get()
+    if timer is None and count is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for counter in (timer, count):
+            if counter is not None:
+                counter.queries += 1
+                counter.query_seconds += elapsed
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    """
+    Install time_query() on a new database connection.
+    """
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def current_timer():
+    """
+    Get the RequestTimer of the current request, or None if the request is not timed.
+    """
+    return _timer.get()
+
+
+def start_timer(timer):
+    """
+    Time the current request with a RequestTimer.
+
+    Returns:
+    - Token: The token to pass to stop_timer() once the request is handled.
+    """
+    return _timer.set(timer)
+
+
+def stop_timer(token):
+    """
+    Stop timing the current request with the timer set by start_timer().
+    """
+    _timer.reset(token)
+
+
+def start_counting(count):
+    """
+    Count the database queries of the current request with a QueryCount.
+
+    Returns:
+    - Token: The token to pass to stop_counting() once the request is handled.
+    """
+    return _query_count.set(count)
+
+
+def stop_counting(token):
+    """
+    Stop counting the database queries of the current request with the QueryCount set by start_counting().
+    """
+    _query_count.reset(token)
+
+
+def measure(name):
+    """
+    Get a context manager adding the time spent in it to a phase of the current request,
+    which does nothing when the request is not sampled.
+
+    Parameters:
+    - name (str): The name of the phase, e.g. 'match'.
+
+    Usage Example:
+    ```
+    with timing.measure('match'):
+        response = chatbot.get_response()
+    ```
+    """
+    timer = _timer.get()
+    if timer is None:
+        return _untimed
+    return _Phase(timer, name)
+
+
+class ServerTimingMiddleware(object):
+    """
+    A middleware that records the timing breakdown of a sampled share of the requests,
+    and reports it in a Server-Timing response header and a JSON log line.
+
+    Requests are sampled with the probability CHATBOT['TIMING_SAMPLE_RATE'], read once
+    when the middleware is loaded. Unsampled requests are passed through untouched, so
+    the cost of the instrumentation is a random number per request, or nothing if the
+    rate is 0, and a context variable lookup per measured phase and database query.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = get_setting('TIMING_SAMPLE_RATE')
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        timer = RequestTimer()
+        token = start_timer(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timer(token)
+        return self._report(request, response, timer, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        timer = RequestTimer()
+        token = start_timer(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timer(token)
+        return self._report(request, response, timer, time.perf_counter() - start)
+
+    @staticmethod
+    def _report(request, response, timer, total):
+        """
+        Internal method to add the Server-Timing header to the response and log the timing.
+        """
+        response['Server-Timing'] = timer.header(total)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1e3, 3),
+            'db_queries': timer.queries,
+            'db_ms': round(timer.query_seconds * 1e3, 3),
+            **{f"{name}_ms": round(seconds * 1e3, 3) for name, seconds in timer.durations.items()},
+        }))
+        return response
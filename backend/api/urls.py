@@ -1,9 +1,16 @@
 from django.urls import path
 from . import views
+from .conf import get_setting
+from .metrics import metrics_view
 
 urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
-    path('chat/', views.ChatView.as_view(), name='chat'),
+    path('chat/', (views.AsyncChatView if get_setting('ASYNC_VIEWS') else views.ChatView).as_view(), name='chat'),
+    path('chat/async/', views.AsyncChatView.as_view(), name='chat_async'),
+    path('chat/batch/', views.ChatBatchView.as_view(), name='chat_batch'),
+    path('export/', views.ExportView.as_view(), name='export'),
+    path('history/', views.HistoryView.as_view(), name='history'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
     path('register/', views.RegisterView.as_view(), name='register'),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -1,19 +1,33 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
-from rest_framework import status, generics
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status, generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .conf import get_setting
+from .export import export
+from .models import Log
 from .nltk_chatbot import NltkChatBot
+from .repositories.buffered_log_repository import BufferedLogRepository
 from .repositories.log_repository import LogRepository
 from .repositories.step_repository import StepRepository
-from .serializers import ChatSerializer, RegisterSerializer, LogoutSerializer
+from .pagination import KeysetPagination
+from .permissions import IsAdminUser
+from .serializers import (ChatBatchSerializer, ChatSerializer, ExportSerializer, HistoryStepSerializer,
+                          RegisterSerializer, LogoutSerializer)
+from .services.async_chatbot_service import AsyncChatBotService
+from .services.batch_chatbot_service import BatchChatBotService
 from .services.chatbot_service import ChatBotService
 
-GREETING = ("hello", "hi", "greetings", "sup", "what’s up", "hey", "yo")
-GOODBYE = ("goodbye", "bye", "farewell", "see you", "adios", "see ya")
-
 
 class HomeView(APIView):
     """
@@ -76,7 +90,7 @@ class ChatView(generics.GenericAPIView):
             user = request.user
 
             step_repository = StepRepository(user)
-            log_repository = LogRepository()
+            log_repository = BufferedLogRepository() if get_setting('LOG_BUFFER_ENABLED') else LogRepository()
             chat_bot = NltkChatBot.from_json(data)
 
             chatbot_service = ChatBotService(chat_bot, log_repository, step_repository)
@@ -88,6 +102,240 @@ class ChatView(generics.GenericAPIView):
             return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ChatBatchView(generics.GenericAPIView):
+    """
+    API view for replaying an ordered batch of chat messages with a ChatBot.
+
+    The messages are processed in order, as if they were posted to /chat/ one at a time,
+    and all resulting logs and session changes are saved with a few bulk statements.
+
+    HTTP Methods:
+    - POST: Handles a list of user inputs and returns the ChatBot's responses in the same order.
+
+    Permissions:
+    - Requires authentication using the `IsAuthenticated` permission class.
+
+    Example Usage:
+    ```python
+    # Example POST request with a batch of user inputs
+    # curl -X POST -H "Authorization: Bearer <your_access_token>" -H "Content-Type: application/json" \
+    #      -d '{"texts": ["hello", "tell me a joke", "bye"]}' http://your-api-domain/chat/batch/
+    ```
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = ChatBatchSerializer
+
+    def post(self, request):
+        """
+        Handle POST requests by processing a batch of user inputs and returning the ChatBot's responses.
+
+        Parameters:
+        - request (Request): The HTTP request object.
+
+        Returns:
+        - Response: A Response object containing the generated responses or errors with appropriate status codes.
+        """
+        serializer = self.serializer_class(data=request.data)
+        if serializer.is_valid():
+            step_repository = StepRepository(request.user)
+            log_repository = BufferedLogRepository() if get_setting('LOG_BUFFER_ENABLED') else LogRepository()
+            chat_bots = [NltkChatBot(text) for text in serializer.validated_data['texts']]
+
+            chatbot_service = BatchChatBotService(chat_bots, log_repository, step_repository)
+            data = {'texts': chatbot_service.get_responses()}
+
+            return Response(data, status=status.HTTP_201_CREATED)
+        else:
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class HistoryView(generics.GenericAPIView):
+    """
+    API view for reading the chat history of the authenticated user.
+
+    The log entries are paginated newest first with a keyset cursor, so every page costs a single
+    query on the (user, created_at, id) index of the logs, at any depth. The entries of a page are
+    grouped by their step, whose fields are read in the same query; a step whose entries span two
+    pages is returned on both, with the entries of each page.
+
+    HTTP Methods:
+    - GET: Returns a page of steps with their log entries, and the link to the next page.
+
+    Permissions:
+    - Requires authentication using the `IsAuthenticated` permission class.
+
+    Example Usage:
+    ```python
+    # Example GET request for the first page, then the next one
+    # curl -H "Authorization: Bearer <your_access_token>" "http://your-api-domain/history/?limit=100"
+    # curl -H "Authorization: Bearer <your_access_token>" "<the next link of the previous page>"
+    ```
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = HistoryStepSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return Log.objects.filter(user=self.request.user).select_related('step')
+
+    def get(self, request):
+        """
+        Handle GET requests by returning a page of the user's chat history.
+
+        Parameters:
+        - request (Request): The HTTP request object.
+
+        Returns:
+        - Response: A Response object with the 'results', a list of steps with their 'logs',
+                    and the 'next' page link, or None on the last page.
+        """
+        logs = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(group_by_step(logs), many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+def group_by_step(logs):
+    """
+    Group consecutive log entries by their step.
+
+    Parameters:
+    - logs (list): Log entries with their step selected.
+
+    Returns:
+    - list: The steps in the order of their first entry, each with its entries in `page_logs`.
+    """
+    steps = []
+    for log in logs:
+        if not steps or steps[-1].pk != log.step_id:
+            step = log.step
+            step.page_logs = []
+            steps.append(step)
+        steps[-1].page_logs.append(log)
+    return steps
+
+
+class ExportView(generics.GenericAPIView):
+    """
+    API view for downloading the Log or Step table as a gzip-compressed NDJSON or CSV file.
+
+    The rows are streamed from a server-side cursor, a chunk at a time, and compressed as
+    they are sent, so the memory used does not grow with the size of the export.
+
+    HTTP Methods:
+    - GET: Streams the rows matching the kind, date range and user query parameters.
+
+    Permissions:
+    - Requires an admin user, using the `IsAdminUser` permission class.
+
+    Example Usage:
+    ```python
+    # Example GET request for the logs of a user in January, as CSV
+    # curl -H "Authorization: Bearer <your_access_token>" -o logs.csv.gz \
+    #      "http://your-api-domain/export/?kind=logs&output=csv&user=1&start=2024-01-01&end=2024-02-01"
+    ```
+    """
+    permission_classes = (IsAdminUser,)
+    serializer_class = ExportSerializer
+
+    def get(self, request):
+        """
+        Handle GET requests by streaming the export.
+
+        Parameters:
+        - request (Request): The HTTP request object.
+
+        Returns:
+        - StreamingHttpResponse: The gzip-compressed file, or a Response with the errors of
+                                 the query parameters and a status of 400.
+        """
+        serializer = self.serializer_class(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        chunks = export(params['kind'], params['output'], start=params.get('start'), end=params.get('end'),
+                        user_id=params.get('user'))
+        response = StreamingHttpResponse(chunks, content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="{params["kind"]}.{params["output"]}.gz"'
+        return response
+
+
+async def authenticate(request):
+    """
+    Authenticate a Django request with the DRF default authentication classes.
+
+    Parameters:
+    - request (HttpRequest): The HTTP request object.
+
+    Returns:
+    - User: The authenticated user, or None if no credentials were provided.
+
+    Raises:
+    - AuthenticationFailed: If the credentials are invalid.
+    """
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = await sync_to_async(authentication_class().authenticate)(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatView(View):
+    """
+    Async API view for handling chat interactions with a ChatBot.
+
+    It behaves like ChatView, but loads the session with Django's async ORM, so a
+    single ASGI worker can serve many chat turns concurrently. It is served at /chat/
+    when CHATBOT['ASYNC_VIEWS'] is enabled, which the ASGI deployment profile does.
+
+    HTTP Methods:
+    - POST: Handles user input, processes it with a ChatBot, and returns the generated response.
+
+    Permissions:
+    - Requires authentication with the DRF default authentication classes.
+    """
+
+    async def post(self, request):
+        """
+        Handle POST requests by processing user input and returning the ChatBot's response.
+
+        Parameters:
+        - request (HttpRequest): The HTTP request object.
+
+        Returns:
+        - JsonResponse: The generated response or errors with appropriate status codes.
+        """
+        try:
+            user = await authenticate(request)
+        except exceptions.APIException as exc:
+            return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+        if user is None or not user.is_active:
+            return JsonResponse({'detail': exceptions.NotAuthenticated.default_detail},
+                                status=status.HTTP_401_UNAUTHORIZED)
+
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({'detail': exceptions.ParseError.default_detail},
+                                    status=status.HTTP_400_BAD_REQUEST)
+        else:
+            data = request.POST
+
+        serializer = ChatSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        step_repository = StepRepository(user)
+        log_repository = BufferedLogRepository() if get_setting('LOG_BUFFER_ENABLED') else LogRepository()
+        chat_bot = NltkChatBot.from_json(serializer.validated_data)
+
+        chatbot_service = AsyncChatBotService(chat_bot, log_repository, step_repository)
+        response = await chatbot_service.get_response()
+        return JsonResponse({'text': response}, status=status.HTTP_201_CREATED)
+
+
 class LogoutView(generics.GenericAPIView):
     """
     API view for handling user logout by blacklisting refresh tokens.
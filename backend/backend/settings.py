@@ -34,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.timing.ServerTimingMiddleware',
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -46,7 +48,7 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
 }
@@ -58,6 +60,38 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True
 }
 
+CHATBOT = {
+    'MAX_INPUT_LENGTH': int(os.getenv('CHATBOT_MAX_INPUT_LENGTH', 1000)),
+    'REGEX_ENGINE': os.getenv('CHATBOT_REGEX_ENGINE', 're'),  # 're' or 're2' (requires google-re2)
+    'MATCH_TIME_BUDGET': float(os.getenv('CHATBOT_MATCH_TIME_BUDGET', 0.05)),  # seconds
+    'BATCH_MAX_SIZE': int(os.getenv('CHATBOT_BATCH_MAX_SIZE', 1000)),  # messages per /chat/batch/ request
+    'INTENTS': None,  # {'greeting': (...), 'goodbye': (...)} phrases, defaults to api.intents.DEFAULT_INTENTS
+    'RESPONSE_CACHE_SIZE': int(os.getenv('CHATBOT_RESPONSE_CACHE_SIZE', 1024)),  # 0 disables the cache
+    'RESPONSE_CACHE_POLICY': os.getenv('CHATBOT_RESPONSE_CACHE_POLICY', 'lru'),  # 'lru' or 'fifo'
+    'LOG_BUFFER_ENABLED': bool(int(os.getenv('CHATBOT_LOG_BUFFER_ENABLED', 0))),
+    'LOG_BUFFER_SIZE': int(os.getenv('CHATBOT_LOG_BUFFER_SIZE', 500)),
+    'LOG_BUFFER_INTERVAL': float(os.getenv('CHATBOT_LOG_BUFFER_INTERVAL', 1.0)),  # seconds
+    'ASYNC_VIEWS': bool(int(os.getenv('CHATBOT_ASYNC_VIEWS', 0))),  # serve /chat/ with AsyncChatView
+    'AUTH_USER_CACHE_TTL': int(os.getenv('CHATBOT_AUTH_USER_CACHE_TTL', 60)),  # seconds
+    'AUTH_STATELESS': bool(int(os.getenv('CHATBOT_AUTH_STATELESS', 0))),  # build users from token claims
+    'RULEBOOK_PATH': os.getenv('CHATBOT_RULEBOOK_PATH'),  # .json or .yaml, defaults to api/rulebook.json
+    'RULEBOOK_CACHE_DIR': os.getenv('CHATBOT_RULEBOOK_CACHE_DIR', BASE_DIR / '.cache' / 'rulebook'),
+    'RULEBOOK_RELOAD_INTERVAL': float(os.getenv('CHATBOT_RULEBOOK_RELOAD_INTERVAL', 0)),  # seconds, 0 disables
+    'FAQ_PATH': os.getenv('CHATBOT_FAQ_PATH'),  # FAQ corpus answering unmatched messages, requires numpy
+    'FAQ_INDEX_DIR': os.getenv('CHATBOT_FAQ_INDEX_DIR', BASE_DIR / '.cache' / 'faq'),
+    'FAQ_THRESHOLD': float(os.getenv('CHATBOT_FAQ_THRESHOLD', 0.5)),  # minimum cosine similarity
+    'TIMING_SAMPLE_RATE': float(os.getenv('CHATBOT_TIMING_SAMPLE_RATE', 0)),  # share of requests timed, 0 to 1
+    'METRICS_TOKEN': os.getenv('CHATBOT_METRICS_TOKEN'),  # bearer token of /metrics, loopback only if unset
+    'HISTORY_PAGE_SIZE': int(os.getenv('CHATBOT_HISTORY_PAGE_SIZE', 50)),  # logs per /history/ page
+    'HISTORY_MAX_PAGE_SIZE': int(os.getenv('CHATBOT_HISTORY_MAX_PAGE_SIZE', 200)),  # largest ?limit= accepted
+    'SESSION_TTL': float(os.getenv('CHATBOT_SESSION_TTL', 24 * 60 * 60)),  # seconds before an idle session ends
+    'SESSION_SWEEP_INTERVAL': float(os.getenv('CHATBOT_SESSION_SWEEP_INTERVAL', 0)),  # seconds, 0 disables
+    'SESSION_SWEEP_BATCH_SIZE': int(os.getenv('CHATBOT_SESSION_SWEEP_BATCH_SIZE', 1000)),  # steps per UPDATE
+    'LOG_RETENTION_DAYS': int(os.getenv('CHATBOT_LOG_RETENTION_DAYS', 90)),  # days of logs before archive_logs
+    'LOG_ARCHIVE_DIR': os.getenv('CHATBOT_LOG_ARCHIVE_DIR', BASE_DIR / 'archive' / 'logs'),  # gzip NDJSON per day
+    'LOG_ARCHIVE_BATCH_SIZE': int(os.getenv('CHATBOT_LOG_ARCHIVE_BATCH_SIZE', 1000)),  # logs per DELETE
+}
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         "Auth Token eg [Bearer (JWT)]": {
@@ -0,0 +1,45 @@
+"""
+Micro-benchmarks for the chat API.
+
+Run a benchmark from the backend directory, e.g. ``python -m benchmarks.engine``.
+"""
+import os
+import time
+
+
+def setup_django():
+    """
+    Configure Django so benchmarks can import models, views and settings.
+    """
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+def setup_test_database():
+    """
+    Create a fresh test database, so benchmarks never touch the configured one.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def timeit(func, number):
+    """
+    Time a function over a number of calls.
+
+    Parameters:
+    - func (callable): The function to call.
+    - number (int): The number of calls.
+
+    Returns:
+    - float: The mean time per call in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number * 1e6
@@ -0,0 +1,56 @@
+"""
+Latency percentiles of matching adversarial inputs against the shipped rulebook,
+with and without the input length limit, for each available regex engine.
+"""
+import time
+
+from nltk.chat.util import reflections
+
+from api.chat_engine import ChatEngine, re2
+from api.nltk_chatbot import pairs
+
+MAX_INPUT_LENGTH = 1000
+ADVERSARIAL = (
+    "a" * 100000,
+    " " * 100000,
+    "what " + "x " * 50000,
+    "i'm " + "so " * 50000,
+    "location " * 10000 + "!",
+    "which " + "sport " * 20000,
+    "my name is " + "a" * 100000,
+)
+
+
+def percentile(timings, p):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * p / 100))]
+
+
+def run(engine, inputs, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        for text in inputs:
+            start = time.perf_counter()
+            engine.respond(text)
+            timings.append((time.perf_counter() - start) * 1e3)
+    return timings
+
+
+def main():
+    engines = ['re'] + (['re2'] if re2 is not None else [])
+    truncated = tuple(text[:MAX_INPUT_LENGTH] for text in ADVERSARIAL)
+    print(f"{'engine':>6} {'inputs':>24} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for regex_engine in engines:
+        unguarded = ChatEngine(pairs, reflections, regex_engine=regex_engine)
+        guarded = ChatEngine(pairs, reflections, regex_engine=regex_engine,
+                             max_input_length=MAX_INPUT_LENGTH, time_budget=0.05)
+        for label, engine, inputs in (("100k chars, no guard", unguarded, ADVERSARIAL),
+                                      ("100k chars, guarded", guarded, ADVERSARIAL),
+                                      (f"{MAX_INPUT_LENGTH} chars, guarded", guarded, truncated)):
+            timings = run(engine, inputs)
+            print(f"{regex_engine:>6} {label:>24} {percentile(timings, 50):>10.3f} "
+                  f"{percentile(timings, 99):>10.3f} {max(timings):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Time to replay 1,000 messages posted one at a time to /chat/ versus in one
+/chat/batch/ request, driven in-process against a test database.
+"""
+import time
+
+from . import setup_django, setup_test_database
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+MESSAGES = ("hello", "what is your name?", "tell me a joke", "how is the weather in Durban", "bye")
+NUMBER = 1000
+
+
+def client_for(username):
+    client = APIClient()
+    token = AccessToken.for_user(User.objects.create_user(username=username, password=username))
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+def main():
+    setup_test_database()
+    texts = [MESSAGES[i % len(MESSAGES)] for i in range(NUMBER)]
+
+    client = client_for('single')
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for text in texts:
+            client.post('/chat/', {'text': text}, format='json')
+        single = time.perf_counter() - start
+    single_queries = len(queries)
+
+    client = client_for('batch')
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        client.post('/chat/batch/', {'texts': texts}, format='json')
+        batch = time.perf_counter() - start
+
+    print(f"one at a time: {single * 1e3:9.1f} ms, {single_queries} queries")
+    print(f"one batch:     {batch * 1e3:9.1f} ms, {len(queries)} queries")
+    print(f"speed-up:      {single / batch:9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Per-request cost of building a new nltk Chat versus using the shared ChatEngine.
+"""
+from nltk.chat.util import Chat, reflections
+
+from . import setup_django, timeit
+
+setup_django()
+
+from api.nltk_chatbot import NltkChatBot, get_engine, pairs  # noqa: E402
+
+MESSAGES = ("what is your name?", "my name is Thabo", "tell me a joke", "something unknown")
+NUMBER = 2000
+
+
+def per_request_chat():
+    for text in MESSAGES:
+        Chat(pairs, reflections).respond(text)
+
+
+def shared_engine():
+    for text in MESSAGES:
+        NltkChatBot(text).get_response()
+
+
+def main():
+    get_engine()
+    before = timeit(per_request_chat, NUMBER) / len(MESSAGES)
+    after = timeit(shared_engine, NUMBER) / len(MESSAGES)
+    print(f"Chat per request: {before:8.1f} us/message")
+    print(f"shared engine:    {after:8.1f} us/message")
+    print(f"speed-up:         {before / after:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
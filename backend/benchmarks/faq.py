@@ -0,0 +1,62 @@
+"""
+Size and lookup latency of the FAQ TF-IDF index as the corpus grows, for an index
+built in memory and a saved, memory-mapped one. Requires numpy.
+"""
+import os
+import random
+import tempfile
+import time
+
+from api.faq_index import TfidfIndex
+from . import timeit
+
+SIZES = (1000, 10000, 100000)
+VOCABULARY = [f"word{i}" for i in range(20000)]
+# a Zipf-like word distribution, so some terms appear in most questions
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def make_entries(size, rng):
+    entries = []
+    for i in range(size):
+        words = rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(6, 12))
+        entries.append((" ".join(words), f"Answer {i}."))
+    return entries
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'entries':>8} {'build s':>8} {'size MB':>8} {'load ms':>8} "
+          f"{'memory us':>10} {'mmap us':>10} {'common us':>10}  (per lookup)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            entries = make_entries(size, rng)
+            start = time.perf_counter()
+            index = TfidfIndex.build(entries)
+            build = time.perf_counter() - start
+
+            directory = os.path.join(tmp, f"faq-{size}")
+            index.save(directory)
+            start = time.perf_counter()
+            mapped = TfidfIndex.load(directory)
+            load = time.perf_counter() - start
+
+            queries = [" ".join(question.split()[:-1]) for question, _ in rng.sample(entries, 100)]
+            common = " ".join(VOCABULARY[:5])
+            number = 1000
+
+            def lookup(index):
+                return lambda: [index.respond(query) for query in queries]
+
+            print(f"{size:>8} {build:>8.2f} {directory_size(directory) / 1e6:>8.1f} {load * 1000:>8.1f} "
+                  f"{timeit(lookup(index), number // 100) / 100:>10.1f} "
+                  f"{timeit(lookup(mapped), number // 100) / 100:>10.1f} "
+                  f"{timeit(lambda: mapped.respond(common), number):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
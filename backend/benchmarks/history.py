@@ -0,0 +1,69 @@
+"""
+Cost of reading a page of a user's chat history at increasing depths, for the keyset
+pagination of /history/ and an offset pagination of the same query.
+"""
+from datetime import timedelta
+
+from . import setup_django, setup_test_database, timeit
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+
+from api.models import Log, Step  # noqa: E402
+from api.pagination import KeysetPagination  # noqa: E402
+
+LOGS = 1000000
+USERS = 10
+LOGS_PER_STEP = 10
+LIMIT = 50
+DEPTHS = (0, 1000, 10000, 50000, 90000)  # of the LOGS // USERS logs of the user
+BATCH = 100000
+
+
+def seed(user_ids):
+    now = timezone.now()
+    steps = Step.objects.bulk_create([Step(user_id=user_ids[i % len(user_ids)], name='Q')
+                                      for i in range(LOGS // LOGS_PER_STEP)])
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(0, LOGS, BATCH):
+            rows = []
+            for i in range(offset, min(offset + BATCH, LOGS)):
+                step = steps[i // LOGS_PER_STEP]
+                # pairs of messages share their created_at, as the user and chat logs of a turn may
+                created_at = now - timedelta(seconds=i // 2)
+                rows.append((created_at, created_at, f"message {i}", 'UC'[i % 2], step.pk, step.user_id))
+            cursor.executemany(
+                f"INSERT INTO {Log._meta.db_table} (created_at, updated_at, text, sender, step_id, user_id) "
+                f"VALUES (%s, %s, %s, %s, %s, %s)", rows)
+
+
+def main():
+    setup_test_database()
+    User.objects.bulk_create([User(username=f"user{i}") for i in range(USERS)])
+    user_ids = list(User.objects.values_list('id', flat=True))
+    seed(user_ids)
+    user = User.objects.get(id=user_ids[0])
+    queryset = Log.objects.filter(user=user).select_related('step').order_by('-created_at', '-id')
+    factory = RequestFactory()
+
+    print(f"{'depth':>9} {'keyset us':>10} {'offset us':>10}")
+    for depth in DEPTHS:
+        # the cursor of the page at this depth, as the previous page would link to it
+        last = queryset[depth - 1] if depth else None
+        params = {'limit': LIMIT}
+        if last:
+            params['cursor'] = KeysetPagination.encode_cursor(last)
+        request = Request(factory.get('/history/', params))
+
+        keyset = timeit(lambda: KeysetPagination().paginate_queryset(queryset, request), 20)
+        offset = timeit(lambda: list(queryset[depth:depth + LIMIT]), 20)
+        print(f"{depth:>9} {keyset:>10.1f} {offset:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Throughput of greeting and goodbye detection with the previous word scan over the
+GREETING and GOODBYE tuples and with the compiled IntentClassifier, as the number of
+phrases grows.
+"""
+from api.intents import DEFAULT_INTENTS, GOODBYE, GREETING, IntentClassifier
+from . import timeit
+
+MESSAGES = ("hello there", "what is the weather in Durban like today?", "ok see you later", "tell me a joke")
+NUMBER = 5000
+
+
+def make_intents(size):
+    intents = {intent: list(phrases) for intent, phrases in DEFAULT_INTENTS.items()}
+    for i in range(size):
+        intents[GREETING].append(f"greeting{i}")
+        intents[GOODBYE].append(f"see you in {i} days")
+    return intents
+
+
+def word_scan(intents):
+    greeting, goodbye = tuple(intents[GREETING]), tuple(intents[GOODBYE])
+
+    def classify():
+        for text in MESSAGES:
+            any(word.lower() in greeting for word in text.split())
+            any(word.lower() in goodbye for word in text.split())
+    return classify
+
+
+def compiled(intents):
+    classifier = IntentClassifier(intents)
+
+    def classify():
+        for text in MESSAGES:
+            classifier.classify(text)
+    return classify
+
+
+def main():
+    print(f"{'phrases':>8} {'word scan':>14} {'classifier':>14}  (messages/s)")
+    for size in (0, 100, 1000):
+        intents = make_intents(size)
+        phrases = sum(len(phrases) for phrases in intents.values())
+        scan = len(MESSAGES) / timeit(word_scan(intents), NUMBER) * 1e6
+        classifier = len(MESSAGES) / timeit(compiled(intents), NUMBER) * 1e6
+        print(f"{phrases:>8} {scan:>14,.0f} {classifier:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
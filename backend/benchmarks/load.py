@@ -0,0 +1,81 @@
+"""
+HTTP load test of /chat/ against a running server, e.g. to compare the WSGI and ASGI
+deployments with the same number of workers:
+
+    gunicorn backend.wsgi:application --workers 1 --bind 127.0.0.1:8000
+    CHATBOT_ASYNC_VIEWS=1 gunicorn backend.asgi:application --workers 1 -k uvicorn.workers.UvicornWorker \\
+        --bind 127.0.0.1:8000
+
+    python -m benchmarks.load --url http://127.0.0.1:8000 --concurrency 50 --requests 2000
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+MESSAGES = ("hello", "what is your name?", "tell me a joke", "how is the weather in Durban", "do you like music?")
+
+
+def post(url, data, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    with urlopen(Request(url, json.dumps(data).encode(), headers), timeout=60) as resp:
+        return json.loads(resp.read() or b'{}')
+
+
+def login(base_url):
+    username = f"load-{uuid.uuid4().hex[:12]}"
+    password = uuid.uuid4().hex
+    post(f"{base_url}/register/", {'username': username, 'email': f"{username}@example.com",
+                                   'password': password, 'password2': password})
+    return post(f"{base_url}/token/", {'username': username, 'password': password})['access']
+
+
+def percentile(timings, p):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(len(timings) * p / 100))]
+
+
+def run(base_url, concurrency, requests):
+    tokens = [login(base_url) for _ in range(concurrency)]
+    local = threading.local()
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def turn(i):
+        if not hasattr(local, 'token'):
+            with lock:
+                local.token = tokens.pop()
+        start = time.perf_counter()
+        post(f"{base_url}/chat/", {'text': MESSAGES[i % len(MESSAGES)]}, local.token)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        timings = list(executor.map(turn, counter))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'rps': requests / elapsed,
+        'p50_ms': percentile(timings, 50) * 1e3,
+        'p95_ms': percentile(timings, 95) * 1e3,
+        'p99_ms': percentile(timings, 99) * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.url.rstrip('/'), args.concurrency, args.requests), indent=2))
+
+
+if __name__ == '__main__':
+    main()
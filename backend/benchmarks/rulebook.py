@@ -0,0 +1,40 @@
+"""
+Cost of a miss and of a hit on the last rule as the rulebook grows, for nltk's
+sequential Chat.respond and the single-pass ChatEngine.
+"""
+from nltk.chat.util import Chat, reflections
+
+from api.chat_engine import ChatEngine
+from . import timeit
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def make_pairs(size):
+    pairs = []
+    for i in range(size):
+        if i % 2:
+            pairs.append([rf"tell me about topic{i} (.*)", [f"Topic {i}: %1"]])
+        else:
+            pairs.append([rf"(.*) keyword{i} (.*)", [f"Keyword {i}."]])
+    return pairs
+
+
+def main():
+    print(f"{'rules':>6} {'nltk miss':>12} {'engine miss':>12} {'nltk hit':>12} {'engine hit':>12}  (us/message)")
+    for size in SIZES:
+        pairs = make_pairs(size)
+        chat = Chat(pairs, reflections)
+        engine = ChatEngine(pairs, reflections)
+        miss = "this message matches no rule at all"
+        hit = f"tell me about topic{size - 1} cats"
+        number = max(10, 20000 // size)
+        print(f"{size:>6} "
+              f"{timeit(lambda: chat.respond(miss), number):>12.1f} "
+              f"{timeit(lambda: engine.respond(miss), number):>12.1f} "
+              f"{timeit(lambda: chat.respond(hit), number):>12.1f} "
+              f"{timeit(lambda: engine.respond(hit), number):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Time to build a ChatEngine from a rulebook file as the rulebook grows, when the rulebook
+is validated and analyzed, and when its compiled artifact is read from the cache.
+"""
+import json
+import os
+import tempfile
+
+from api.rulebook import compile_rulebook, load_engine
+from . import timeit
+from .rulebook import make_pairs
+
+SIZES = (100, 1000, 10000)
+
+
+def main():
+    print(f"{'rules':>6} {'uncached':>12} {'cached':>12}  (ms/load)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            path = os.path.join(tmp, f"rulebook-{size}.json")
+            with open(path, 'w') as file:
+                json.dump({'pairs': make_pairs(size)}, file)
+            cache_dir = os.path.join(tmp, 'cache')
+            compile_rulebook(path, cache_dir)
+            number = max(1, 1000 // size)
+            print(f"{size:>6} "
+                  f"{timeit(lambda: load_engine(path), number) / 1000:>12.1f} "
+                  f"{timeit(lambda: load_engine(path, cache_dir), number) / 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
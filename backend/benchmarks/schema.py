@@ -0,0 +1,39 @@
+"""
+Latency of the OpenAPI schema endpoints, served from memory, revalidated with If-None-Match,
+and generated on every request as drf_yasg does without a cache.
+"""
+from . import setup_django, timeit
+
+setup_django()
+
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from api.schema import clear_schema_cache  # noqa: E402
+
+CALLS = 200
+
+
+def main():
+    setup_test_environment()
+    client = Client()
+    print(f"{'endpoint':<28} {'generated us':>13} {'cached us':>10} {'304 us':>8}")
+    for name, kwargs, params in (('schema-json', {'format': '.json'}, {}),
+                                 ('schema-json', {'format': '.yaml'}, {}),
+                                 ('schema-swagger-ui', {}, {'format': 'openapi'})):
+        url = reverse(name, kwargs=kwargs)
+
+        def generated():
+            clear_schema_cache()
+            client.get(url, params)
+
+        etag = client.get(url, params)['ETag']
+        label = url + (f"?format={params['format']}" if params else '')
+        print(f"{label:<28} {timeit(generated, CALLS // 10):>13.1f} "
+              f"{timeit(lambda: client.get(url, params), CALLS):>10.1f} "
+              f"{timeit(lambda: client.get(url, params, HTTP_IF_NONE_MATCH=etag), CALLS):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
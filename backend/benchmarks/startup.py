@@ -0,0 +1,153 @@
+"""
+Startup cost of gunicorn workers with and without the pre-fork warm-up of gunicorn.conf.py:
+the time until the server answers its first chat message, the latency of the first chat
+message of each worker, and the memory of each worker once it has answered.
+
+Memory is read from /proc, so this benchmark runs on Linux only. RSS counts the pages a
+worker shares with the others, PSS splits them between the processes sharing them, and
+USS counts the pages only the worker uses, i.e. those it would free by exiting.
+
+    python -m benchmarks.startup --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'Bench-mark-42'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def chat(url, token, text="hello"):
+    request = Request(f"{url}/chat/", json.dumps({'text': text}).encode(),
+                      {'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'})
+    with urlopen(request, timeout=60) as resp:
+        return json.loads(resp.read())
+
+
+def memory(pid):
+    """
+    Get the RSS, PSS and USS of a process in MB.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                values[name] = int(rest.split()[0]) / 1024
+    return {'rss_mb': values['Rss'], 'pss_mb': values['Pss'],
+            'uss_mb': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def children(pid):
+    """
+    Get the ids of the child processes of a process.
+    """
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file:
+                # the parent id follows the command, which is in parentheses and may contain spaces
+                if int(file.read().rsplit(')', 1)[1].split()[1]) == pid:
+                    pids.append(int(entry))
+        except (OSError, IndexError):
+            continue
+    return pids
+
+
+def run(warmup, workers, env, tokens):
+    """
+    Start gunicorn, send each worker its first chat message, and stop it.
+    """
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'backend.wsgi:application', '--workers', str(workers),
+         '--bind', f"127.0.0.1:{port}", '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env={**env, 'CHATBOT_WARMUP': '1' if warmup else '0'})
+    try:
+        while True:
+            try:
+                chat(url, tokens[0])
+                break
+            except (URLError, ConnectionError):
+                if server.poll() is not None:
+                    raise RuntimeError("gunicorn exited")
+                time.sleep(0.01)
+        first_response = time.perf_counter() - start
+        # the first message may be answered before every worker is forked
+        while len(children(server.pid)) < workers:
+            time.sleep(0.01)
+
+        # the other workers answer their first message concurrently, while the first one is busy
+        def timed(token):
+            call_start = time.perf_counter()
+            chat(url, token)
+            return time.perf_counter() - call_start
+
+        with ThreadPoolExecutor(workers) as executor:
+            latencies = list(executor.map(timed, tokens[1:workers * 2]))
+        pids = children(server.pid)
+        per_worker = [memory(pid) for pid in pids]
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        'first_response_s': first_response,
+        'first_message_ms': {'mean': sum(latencies) / len(latencies) * 1e3, 'max': max(latencies) * 1e3},
+        **{name: sum(worker[name] for worker in per_worker) / len(per_worker) for name in per_worker[0]},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help="The number of gunicorn workers.")
+    parser.add_argument('--rounds', type=int, default=3, help="The number of starts of each mode.")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    env = {**os.environ, 'SQL_DATABASE': os.path.join(tmp.name, 'db.sqlite3'),
+           'CHATBOT_RULEBOOK_CACHE_DIR': os.path.join(tmp.name, 'rulebook')}
+    os.environ.update(env)
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=BACKEND_DIR, env=env,
+                   check=True, stdin=subprocess.DEVNULL)
+
+    from . import setup_django
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    users = [User.objects.create_user(f"startup-{i}", password=PASSWORD) for i in range(args.workers * 2)]
+    tokens = [str(AccessToken.for_user(user)) for user in users]
+
+    results = {}
+    for warmup in (False, True):
+        rounds = [run(warmup, args.workers, env, tokens) for _ in range(args.rounds)]
+        results['warm-up' if warmup else 'no warm-up'] = {
+            name: (min(r[name] for r in rounds) if not isinstance(rounds[0][name], dict)
+                   else {key: min(r[name][key] for r in rounds) for key in rounds[0][name]})
+            for name in rounds[0]
+        }  # the best of the rounds
+    print(json.dumps(results, indent=2))
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Cost of looking up the current session of a user as the Step table grows, for the
+per-user indexed lookup and the previous unscoped Step.objects.all()[0].
+"""
+from datetime import timedelta
+
+from . import setup_django, setup_test_database, timeit
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from api.models import Step  # noqa: E402
+from api.repositories.step_repository import StepRepository  # noqa: E402
+
+SIZES = (10000, 100000, 1000000, 3000000)
+USERS = 10000
+BATCH = 100000
+
+
+def seed(start, stop, user_ids):
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for offset in range(start, stop, BATCH):
+            rows = []
+            for i in range(offset, min(offset + BATCH, stop)):
+                created_at = now - timedelta(seconds=i)
+                rows.append((created_at, created_at, 'Q', user_ids[i % len(user_ids)]))
+            cursor.executemany(
+                f"INSERT INTO {Step._meta.db_table} (created_at, updated_at, name, user_id) VALUES (%s, %s, %s, %s)",
+                rows)
+
+
+def main():
+    setup_test_database()
+    User.objects.bulk_create([User(username=f"user{i}") for i in range(USERS)])
+    user_ids = list(User.objects.values_list('id', flat=True))
+    repository = StepRepository(User.objects.get(id=user_ids[USERS // 2]))
+
+    print(f"{'steps':>9} {'per-user us':>12} {'all()[0] us':>12}")
+    seeded = 0
+    for size in SIZES:
+        seed(seeded, size, user_ids)
+        seeded = size
+        print(f"{size:>9} {timeit(repository.get, 1000):>12.1f} "
+              f"{timeit(lambda: Step.objects.all()[0], 5):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
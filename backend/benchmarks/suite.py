@@ -0,0 +1,192 @@
+"""
+Latency, throughput and database queries of the chat API, driven in-process against
+a test database, with results saved as JSON to compare them between commits:
+
+    python -m benchmarks.suite --output before.json
+    git checkout my-branch
+    python -m benchmarks.suite --output after.json --compare before.json
+
+Scenarios:
+- matching: NltkChatBot on its own, without HTTP or the database.
+- register: POST /register/ for new users.
+- token: POST /token/ for the seeded users.
+- chat: multi-turn conversations of the seeded users through POST /chat/, taking turns
+  like concurrent sessions would.
+
+The test database is SQLite by default, or Postgres with the SQL_* environment variables
+of backend/settings.py, e.g. SQL_ENGINE=django.db.backends.postgresql.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from . import setup_django, setup_test_database
+from .load import percentile
+
+setup_django()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api.conf import get_setting  # noqa: E402
+from api.nltk_chatbot import NltkChatBot  # noqa: E402
+
+CONVERSATIONS = (
+    ("hello", "my name is Thabo", "what is your name?", "tell me a joke", "bye"),
+    ("hi", "how is the weather in Durban", "what is your favourite sport", "do you like music?", "goodbye"),
+    ("hey", "who created you?", "something the bot does not know", "can you help me", "see you"),
+    ("greetings", "I'm really doing good", "my city", "what is your name?", "farewell"),
+)
+PASSWORD = 'Bench-mark-42'
+
+
+def measure(func, calls):
+    """
+    Call a function a number of times, timing each call and counting its queries.
+
+    Returns:
+    - dict: The number of calls, the p50/p95/p99 latency in ms, the calls per second,
+            and the mean and maximum number of queries per call.
+    """
+    timings = []
+    queries = []
+    start = time.perf_counter()
+    for i in range(calls):
+        with CaptureQueriesContext(connection) as captured:
+            call_start = time.perf_counter()
+            func(i)
+            timings.append(time.perf_counter() - call_start)
+        queries.append(len(captured))
+    elapsed = time.perf_counter() - start
+    return {
+        'calls': calls,
+        'p50_ms': percentile(timings, 50) * 1e3,
+        'p95_ms': percentile(timings, 95) * 1e3,
+        'p99_ms': percentile(timings, 99) * 1e3,
+        'rps': calls / elapsed,
+        'queries_per_call': sum(queries) / calls,
+        'max_queries': max(queries),
+    }
+
+
+def bench_matching(turns):
+    texts = [text for conversation in CONVERSATIONS for text in conversation]
+    NltkChatBot(texts[0]).get_response()
+    return measure(lambda i: NltkChatBot(texts[i % len(texts)]).get_response(), turns)
+
+
+def bench_register(users):
+    client = APIClient()
+
+    def register(i):
+        username = f"bench-{i}"
+        response = client.post('/register/', {'username': username, 'email': f"{username}@example.com",
+                                              'password': PASSWORD, 'password2': PASSWORD}, format='json')
+        assert response.status_code == 201, response.content
+
+    return measure(register, users)
+
+
+def bench_token(users):
+    client = APIClient()
+    tokens = []
+
+    def token(i):
+        response = client.post('/token/', {'username': f"bench-{i}", 'password': PASSWORD}, format='json')
+        assert response.status_code == 200, response.content
+        tokens.append(response.json()['access'])
+
+    return measure(token, users), tokens
+
+
+def bench_chat(tokens, turns):
+    clients = []
+    for token in tokens:
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        clients.append(client)
+    script = [text for conversation in CONVERSATIONS for text in conversation]
+
+    def chat(i):
+        # each user advances through the conversations one turn per round
+        user, turn = i % len(clients), i // len(clients)
+        response = clients[user].post('/chat/', {'text': script[(turn + user) % len(script)]}, format='json')
+        assert response.status_code == 201, response.content
+
+    return measure(chat, turns)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the change of each metric against a baseline, and return the regressions: the metrics
+    that changed in their bad direction by more than the tolerance, a fraction of the baseline.
+    """
+    regressions = []
+    print(f"{'scenario':<10} {'metric':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metrics in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'rps', 'queries_per_call'):
+            old, new = before[metric], metrics[metric]
+            change = (new - old) / old if old else float(new > old)
+            worse = -change if metric == 'rps' else change
+            flag = ' !' if worse > tolerance else ''
+            if flag:
+                regressions.append((name, metric))
+            print(f"{name:<10} {metric:<18} {old:>10.2f} {new:>10.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help="The number of users to seed.")
+    parser.add_argument('--turns', type=int, default=2000, help="The number of chat turns.")
+    parser.add_argument('--output', help="Save the results to this JSON file.")
+    parser.add_argument('--compare', help="Compare the results with a JSON file saved by --output, "
+                                          "and exit with status 1 if a metric regressed.")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="The relative change of a metric reported as a regression.")
+    args = parser.parse_args()
+
+    setup_test_database()
+    scenarios = {'matching': bench_matching(args.turns), 'register': bench_register(args.users)}
+    scenarios['token'], tokens = bench_token(args.users)
+    scenarios['chat'] = bench_chat(tokens, args.turns)
+    results = {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'users': User.objects.count(),
+        'settings': {name: get_setting(name) for name in ('ASYNC_VIEWS', 'LOG_BUFFER_ENABLED', 'REGEX_ENGINE',
+                                                          'RESPONSE_CACHE_SIZE', 'AUTH_STATELESS')},
+        'scenarios': scenarios,
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(results, json.load(file), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
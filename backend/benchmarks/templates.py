@@ -0,0 +1,39 @@
+"""
+Cost of building a templated reply, e.g. to "my name is ...", as the captured text grows:
+nltk's Chat, which substitutes placeholders and reflections with string replacement and
+a regex per call, versus the compiled templates and single-pass reflections of ChatEngine.
+"""
+import re
+
+from nltk.chat.util import Chat, reflections
+
+from . import timeit
+from api.chat_engine import ChatEngine
+
+RULE = r"my name is (.*)"
+PAIRS = [[RULE, ["Hello %1, How are you today ?"]]]
+# a capture mixing reflected words, e.g. "i am", with other words
+WORDS = "i am sure that my friend and you were right about your car when i'm late".split()
+LENGTHS = (10, 100, 1000, 10000)
+
+
+def main():
+    chat = Chat(PAIRS, reflections)
+    engine = ChatEngine(PAIRS, reflections)
+    regex = re.compile(RULE, re.IGNORECASE)
+
+    print(f"{'capture chars':>13} {'nltk us':>9} {'engine us':>10} {'speed-up':>9}")
+    for length in LENGTHS:
+        words = (WORDS * (length // len(" ".join(WORDS)) + 1))
+        capture = " ".join(words)[:length]
+        match = regex.match(f"my name is {capture}")
+        assert engine.reply(0, match) == chat._wildcards(PAIRS[0][1][0], match)
+
+        number = max(10, 100000 // length)
+        before = timeit(lambda: chat._wildcards(PAIRS[0][1][0], match), number)
+        after = timeit(lambda: engine.reply(0, match), number)
+        print(f"{length:>13} {before:>9.1f} {after:>10.1f} {before / after:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Per-message cost of a chat turn over HTTP (/chat/ and /chat/async/) and over the
+WebSocket channel, driven in-process against a test database.
+"""
+import asyncio
+import time
+
+from . import setup_django, setup_test_database
+
+setup_django()
+
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import AsyncClient  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from backend.asgi import application  # noqa: E402
+
+MESSAGES = ("hello", "what is your name?", "tell me a joke", "how is the weather in Durban")
+NUMBER = 500
+
+
+def http(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    start = time.perf_counter()
+    for i in range(NUMBER):
+        client.post('/chat/', {'text': MESSAGES[i % len(MESSAGES)]}, format='json')
+    return (time.perf_counter() - start) / NUMBER * 1e6
+
+
+async def async_http(token):
+    client = AsyncClient()
+    headers = {'Authorization': f'Bearer {token}'}
+    start = time.perf_counter()
+    for i in range(NUMBER):
+        await client.post('/chat/async/', {'text': MESSAGES[i % len(MESSAGES)]}, content_type='application/json',
+                          headers=headers)
+    return (time.perf_counter() - start) / NUMBER * 1e6
+
+
+async def websocket(token):
+    communicator = WebsocketCommunicator(application, '/ws/chat/', headers=[(b'origin', b'http://localhost')],
+                                         subprotocols=['bearer', token])
+    await communicator.connect()
+    start = time.perf_counter()
+    for i in range(NUMBER):
+        await communicator.send_json_to({'text': MESSAGES[i % len(MESSAGES)]})
+        await communicator.receive_json_from()
+    elapsed = time.perf_counter() - start
+    await communicator.disconnect()
+    return elapsed / NUMBER * 1e6
+
+
+def main():
+    setup_test_database()
+    token = str(AccessToken.for_user(User.objects.create_user(username='bench', password='bench')))
+    print(f"HTTP /chat/:       {http(token):8.1f} us/message")
+    print(f"HTTP /chat/async/: {asyncio.run(async_http(token)):8.1f} us/message")
+    print(f"WebSocket:         {asyncio.run(websocket(token)):8.1f} us/message")
+
+
+if __name__ == '__main__':
+    main()
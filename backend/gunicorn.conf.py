@@ -0,0 +1,39 @@
+"""
+Gunicorn settings, read from the working directory when gunicorn starts.
+
+When PROMETHEUS_MULTIPROC_DIR is set, each worker writes its metrics to files in that
+directory, and /metrics sums them across workers.
+
+Unless CHATBOT_WARMUP is 0, the app is loaded in the master process and warmed up before
+the workers are forked, see api/warmup.py, so they share the compiled rulebook and indexes
+and answer their first request without building them.
+"""
+import os
+import shutil
+
+warmup = os.environ.get('CHATBOT_WARMUP', '1') != '0'
+preload_app = warmup
+
+
+def on_starting(server):
+    # start from empty metrics, as the files of a previous run would be summed in
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    # runs in the master process once the app is loaded, before the workers are forked
+    if warmup:
+        from api.warmup import warm_up
+
+        warm_up()
+